@@ -0,0 +1,48 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from typing import Optional
+import os
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+# The schema Base.metadata.create_all built before migrations existed.
+BASELINE_REVISION = "0001"
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    return config
+
+def without_statement_timeout(connection: Connection):
+    """Lift the app's statement_timeout (DB_STATEMENT_TIMEOUT_MS) for this transaction.
+
+    Migrations copy whole tables and build indexes in single statements that may take longer.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SET LOCAL statement_timeout = 0"))
+
+def adopt_legacy_schema(bind: Engine):
+    """Bring a database created by create_all (and the ad-hoc column upgraders) to the baseline and stamp it."""
+    # Imported here: the services import db.database, which runs migrations through this module.
+    from models.base import Base
+    from services.image_service import ensure_image_schema
+    from services.rating_service import ensure_rating_schema
+
+    ensure_image_schema(bind)
+    ensure_rating_schema(bind)  # Also adds the recipe version columns.
+    # Tables added to the models since the database was created.
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as connection:
+        without_statement_timeout(connection)
+        command.stamp(alembic_config(connection), BASELINE_REVISION)
+    print(f"Existing schema adopted at migration {BASELINE_REVISION}")
+
+def upgrade_database(bind: Engine, revision: str = "head"):
+    """Apply pending migrations; empty databases are built from the baseline migration."""
+    tables = set(inspect(bind).get_table_names())
+    if "alembic_version" not in tables and "recipes" in tables:
+        adopt_legacy_schema(bind)
+    with bind.begin() as connection:
+        without_statement_timeout(connection)
+        command.upgrade(alembic_config(connection), revision)
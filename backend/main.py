@@ -1,45 +1,78 @@
 
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Header
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Form, Header, Query, Request, Response
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Literal, Optional
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials,OAuth2PasswordBearer
 from models.notification_model import Notification
 from models.security import verify_password, create_access_token
 from jose import jwt 
 import json
-import shutil
 import os
 from passlib.context import CryptContext
 from models.recipe_model import (Comment, Recipe, Ingredient, NutritionalInfo, SharedRecipe,Rating, CookingTimer)
 from models.user_model import User
-from pydantic import BaseModel, EmailStr, field_validator
-from services.ai_service import setup_ai_routes
-from db.database import engine, get_db, init_db, SessionLocal, Base
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from services.ai_service import nutrition_client, setup_ai_routes
+from db.database import engine, get_db, get_read_db, get_sync_db, init_db, pin_reads_to_primary, SessionLocal, sync_engine_for
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from models.recipe_model import Comment
-from fastapi.staticfiles import StaticFiles
-from services.ai_service import calculate_nutritional_info
-from services.notification_service import create_notification
+from services.static_files import AssetFiles
+from services.notification_service import (add_unread, encode_notification_cursor, enqueue_notification, get_user_notifications, mark_notifications_as_read, publish_unread, schedule_notification_dispatch, serialize_notification)
+from services.notification_retention import schedule_notification_retention
+from services.notification_push import NOTIFICATION_STREAM_HEARTBEAT, format_sse, notification_broker
 from datetime import datetime, timedelta, timezone
 from services.seed_data import load_seed_data
+from services.recipe_service import (SUMMARY_FIELDS, encode_cursor, enqueue_nutrition_job, get_recipe_listing, parse_listing_fields, serialize_recipe_listing)
+from services.job_queue import job_queue
+from services.recipe_import import IMPORT_BATCH_SIZE, import_recipe_file
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from services.search_service import recipe_search
+from services.pantry_service import recipe_pantry
+from services.rating_service import apply_rating, schedule_rating_reconciliation
+from services.ranking_service import backfill_rankings, refresh_ranking, schedule_ranking_rebuild
+from services.tag_service import backfill_recipe_tags, facet_counts, sync_recipe_tags
+from services.recipe_version import bump_recipe_version, recipe_validators
+from services.image_service import DEFAULT_IMAGE_URL, backfill_image_variants, enqueue_image_job, image_srcset, release_image
+from services.image_store import reconcile_image_references, schedule_image_gc
+from services.upload_service import save_upload
+from services.comment_service import COMMENT_MAX_DEPTH, get_comment_replies, get_comment_threads, insert_comment
+from services.response_cache import LISTING_TAG, is_not_modified, recipe_tag, response_cache
+from services.timer_service import timer_engine
 
-Base.metadata.create_all(bind=engine)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("📢 Initializing database...")
-    init_db()  # ✅ יצירת כל הטבלאות במסד הנתונים
+    init_db()  # Apply pending schema migrations (migrations/versions).
     print("✅ Database initialized successfully!")
 
     db = SessionLocal()
     load_seed_data(db)  # ✅ טעינת נתוני ברירת המחדל אחרי יצירת הטבלאות
+    backfill_recipe_tags(db)  # Normalize categories/tags of recipes created before the tags table.
+    backfill_rankings(db)  # Rank recipes created before the leaderboard.
+    recipe_search.backfill(db)  # Index recipes that predate the search documents.
+    reconcile_image_references(db, STATIC_DIR)
     db.close()
+    schedule_rating_reconciliation(engine)  # Nightly repair of rating aggregate drift.
+    schedule_ranking_rebuild(engine)
+    job_queue.enqueue("images:backfill", backfill_image_variants, engine, key="images:backfill")  # Resize images that predate the pipeline.
+    schedule_image_gc(engine, STATIC_DIR)  # Periodic sweep of unreferenced image files.
+    schedule_notification_dispatch(engine)  # Deliver the notification outbox in batches.
+    schedule_notification_retention(engine)  # Purge expired notifications (and rotate partitions).
+    timer_engine.start_scheduler()  # Fire cooking timer expiry into the notification streams.
 
     yield
 
+    timer_engine.stop_scheduler()
+    job_queue.shutdown()
+    notification_broker.close()
+    await nutrition_client.aclose()
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -52,7 +85,16 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # A client that has just written reads from the primary until the replica catches up.
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        pin_reads_to_primary(response)
+    return response
+
+# Content-hashed images are cached for a year; STATIC_OFFLOAD hands transfers to the front proxy.
+app.mount("/static", AssetFiles(directory="static"), name="static")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -112,6 +154,11 @@ class RecipeCreate(BaseModel):
     ingredients: List[IngredientCreate] = []
     timers: List[TimerCreate] = []
 
+class PantryRequest(BaseModel):
+    ingredients: List[str]
+    max_missing: float = Field(2, ge=0, le=10)
+    limit: int = Field(20, ge=1, le=100)
+
 class UserRegister(BaseModel):
     username: str
     first_name: str  
@@ -133,6 +180,12 @@ class RatingRequest(BaseModel):
     user_id: int
     score: int
 
+class MarkReadRequest(BaseModel):
+    ids: Optional[List[int]] = None
+
+class CookingSessionRequest(BaseModel):
+    recipe_id: int
+
 class CommentRequest(BaseModel):
     user_id: int
     username: str
@@ -140,6 +193,18 @@ class CommentRequest(BaseModel):
     parent_id: Optional[int] = None
 
 
+# Blocking service calls of the recipe handlers, run through AsyncSession.run_sync.
+def index_recipe(db: Session, recipe: Recipe):
+    recipe_search.index_recipe(db, recipe)
+    recipe_pantry.index_recipes(db, [recipe.id])
+
+def unindex_recipe(db: Session, recipe: Recipe):
+    # Drops the search document and image references; commit together with the recipe's deletion.
+    recipe_search.remove_recipe(db, recipe.id)
+    recipe_pantry.remove_recipe(db, recipe.id)
+    release_image(db, recipe)
+
+
 # Recipe endpoints
 STATIC_DIR = "static"
 os.makedirs(STATIC_DIR, exist_ok=True)  
@@ -159,7 +224,7 @@ async def create_recipe(
     ingredients: str = Form(...),
     timers: Optional[str] = Form("[]"),
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Convert creator_id and servings to integers; raise error if conversion fails.
     try:
@@ -173,14 +238,8 @@ async def create_recipe(
     timers_list = json.loads(timers)
     print("Received timers:", timers_list) 
 
-    # Set default image URL; if an image is provided, save it and update image_url.
-    image_url = "/static/default-recipe.jpg"
-    if image:
-        image_filename = f"{name.replace(' ', '_')}_{os.urandom(8).hex()}.{image.filename.split('.')[-1]}"
-        image_path = os.path.join("static", image_filename)
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        image_url = f"/static/{image_filename}"
+    # Stage the uploaded image; it replaces the default image once a background job has resized it.
+    staged_image = await save_upload(image) if image else None
 
     # Create and store the new recipe.
     new_recipe = Recipe(
@@ -191,11 +250,11 @@ async def create_recipe(
         categories=categories,
         tags=tags,
         creator_id=creator_id,
-        image_url=image_url
+        image_url=DEFAULT_IMAGE_URL
     )
     db.add(new_recipe)
-    db.commit()
-    db.refresh(new_recipe)
+    await db.run_sync(sync_recipe_tags, new_recipe)
+    await db.commit()
 
     # Add each ingredient to the database.
     for ingredient in ingredients_list:
@@ -206,26 +265,8 @@ async def create_recipe(
             recipe_id=new_recipe.id
         )
         db.add(new_ingredient)
-    db.commit()
-
-    # Calculate nutritional information using provided ingredients.
-    print(f"Calling calculate_nutritional_info with ingredients: {ingredients_list}")
-    nutrition_data = calculate_nutritional_info(ingredients_list, servings)
-    print(f"Nutrition data received: {nutrition_data}")
+    await db.commit()
 
-    # Save nutritional information if available.
-    if nutrition_data:
-        new_nutritional_info = NutritionalInfo(
-            recipe_id=new_recipe.id,
-            calories=nutrition_data["calories"],
-            protein=nutrition_data["protein"],
-            carbs=nutrition_data["carbs"],
-            fats=nutrition_data["fats"],
-        )
-        db.add(new_nutritional_info)
-        db.commit()
-        db.refresh(new_nutritional_info)
-        
     # Add cooking timers to the recipe.
     for timer in timers_list:
         new_timer = CookingTimer(
@@ -235,36 +276,162 @@ async def create_recipe(
             label=timer.get("label", f"Step {timer['step_number']}")
         )
         db.add(new_timer)
-    db.commit()
+    await db.run_sync(refresh_ranking, new_recipe.id)
+    await db.commit()
+    await db.run_sync(index_recipe, new_recipe)
+    response_cache.invalidate_recipe(new_recipe.id)
+
+    # Calculate nutritional information and image variants in the background; the recipe is already saved.
+    bind = sync_engine_for(db.get_bind())
+    nutrition_job = enqueue_nutrition_job(bind, new_recipe.id, ingredients_list, servings)
+    image_job = enqueue_image_job(bind, new_recipe.id, staged_image) if staged_image else None
 
     return {
         "message": "Recipe created successfully",
         "recipe_id": new_recipe.id,
-        "image_url": new_recipe.image_url
+        "image_url": new_recipe.image_url,
+        "images": image_srcset(new_recipe.image_variants),
+        "nutrition_job_id": nutrition_job.id,
+        "image_job_id": image_job.id if image_job else None
     }
 
+@app.post("/recipes/import")
+async def import_recipes_file(
+    file: UploadFile = File(...),
+    creator_id: Optional[int] = Form(None),
+    batch_size: int = Form(IMPORT_BATCH_SIZE),
+    db: Session = Depends(get_sync_db)
+):
+    # Stream a JSONL/CSV file into batched inserts off the event loop; bad rows are reported, not fatal.
+    if not file.filename or not file.filename.lower().endswith((".jsonl", ".json", ".csv")):
+        raise HTTPException(status_code=400, detail="Upload a .jsonl or .csv file")
+    report = await run_in_threadpool(import_recipe_file, db, file.file, file.filename, creator_id, batch_size)
+    return report.to_dict()
+
 @app.get("/recipes/")
 async def get_recipes(
+    request: Request,
     category: Optional[str] = None,
     tag: Optional[str] = None,
-    sort_by: str = "rating",
-    db: Session = Depends(get_db)
+    sort_by: str = "score",
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Build query with optional filtering by category and tag.
-    query = db.query(Recipe)
-    if category:
-        query = query.filter(Recipe.categories.contains(category))
-    if tag:
-        query = query.filter(Recipe.tags.contains(tag))
-    if sort_by == "rating":
-        query = query.order_by(Recipe.rating.desc())
-    recipes = query.all()
-
-    # Return recipe details, including ingredients, nutritional info, and timers.
+    # Resolve the requested projection; the summary view is the card-sized shape.
+    if view == "summary" and fields:
+        raise HTTPException(status_code=400, detail="fields cannot be combined with view=summary")
+    try:
+        requested_fields = SUMMARY_FIELDS if view == "summary" else parse_listing_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def build(session):
+        # Fetch one extra row to know whether another page follows.
+        try:
+            recipes = get_recipe_listing(
+                session,
+                category=category,
+                tag=tag,
+                sort_by=sort_by,
+                limit=limit + 1 if limit else None,
+                cursor=cursor,
+                fields=requested_fields
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Expose the keyset position of the last recipe so clients can request the next page.
+        headers = {}
+        if limit and len(recipes) > limit:
+            recipes = recipes[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(recipes[-1], sort_by)
+        return [serialize_recipe_listing(r, requested_fields) for r in recipes], headers
+
+    # Served from the response cache until any recipe changes.
+    key = response_cache.key_for(request)
+    entry = await db.run_sync(lambda session: response_cache.fetch(key, [LISTING_TAG], lambda: build(session)))
+    return response_cache.respond(request, entry)
+
+@app.get("/recipes/facets")
+async def get_recipe_facets(category: Optional[str] = None, tag: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    # Recipe counts per category and tag, within the recipes matching the current filters.
+    return await db.run_sync(facet_counts, category=category, tag=tag)
+
+@app.post("/recipes/pantry")
+def match_pantry(request: PantryRequest, db: Session = Depends(get_sync_db)):
+    # Recipes that can be made from the given ingredients, fewest (weighted) missing first.
+    matches = recipe_pantry.match(db, request.ingredients, max_missing=request.max_missing, limit=request.limit)
+    if not matches:
+        return []
+    recipes = {r.id: r for r in get_recipe_listing(db, fields=SUMMARY_FIELDS, ids=[m["recipe_id"] for m in matches])}
     return [
-        {
-            "id": r.id,
-            "name": r.name,
+        {**serialize_recipe_listing(recipes[m["recipe_id"]], SUMMARY_FIELDS), **{k: v for k, v in m.items() if k != "recipe_id"}}
+        for m in matches
+        if m["recipe_id"] in recipes
+    ]
+
+@app.get("/recipes/search")
+def search_recipes(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_sync_db)  # Primary: the in-memory index follows its writes and backfills on first use.
+):
+    # Rank recipes by name, ingredient and preparation text matches (Hebrew prefixes are handled).
+    ranked = recipe_search.search(db, q, limit=limit, offset=offset)
+    if not ranked:
+        return []
+    recipes = {r.id: r for r in get_recipe_listing(db, fields=SUMMARY_FIELDS, ids=[recipe_id for recipe_id, _ in ranked])}
+    return [
+        {**serialize_recipe_listing(recipes[recipe_id], SUMMARY_FIELDS), "score": round(score, 4)}
+        for recipe_id, score in ranked
+        if recipe_id in recipes
+    ]
+
+
+@app.get("/recipes/{recipe_id}")
+async def get_recipe(recipe_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    # Answer revalidations from the version columns alone, before loading the recipe.
+    validators = await db.run_sync(recipe_validators, recipe_id)
+    if validators is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if is_not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    def build(session):
+        # Retrieve a specific recipe by ID.
+        recipe = session.query(Recipe).filter(Recipe.id == recipe_id).first()
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+
+        rating = recipe.rating if recipe.rating is not None else 0.0
+        image_url = recipe.image_url if recipe.image_url else DEFAULT_IMAGE_URL
+        timers = session.query(CookingTimer).filter(CookingTimer.recipe_id == recipe_id).all()
+
+        # Retrieve nutritional information.
+        nutritional_info = session.query(NutritionalInfo).filter(NutritionalInfo.recipe_id == recipe_id).first()
+        nutrition_data = {
+            "calories": nutritional_info.calories if nutritional_info else 0,
+            "protein": nutritional_info.protein if nutritional_info else 0,
+            "carbs": nutritional_info.carbs if nutritional_info else 0,
+            "fats": nutritional_info.fats if nutritional_info else 0,
+        }
+        print("Nutritional info:", recipe.nutritional_info)
+
+        return {
+            "id": recipe.id,
+            "name": recipe.name,
+            "preparation_steps": recipe.preparation_steps or "",
+            "cooking_time": recipe.cooking_time,
+            "servings": recipe.servings,
+            "categories": recipe.categories,
+            "tags": recipe.tags,
+            "image_url": image_url,        
+            "images": image_srcset(recipe.image_variants),
+            "rating": rating,
             "ingredients": [
                 {
                     "id": ing.id,
@@ -272,83 +439,23 @@ async def get_recipes(
                     "quantity": ing.quantity,
                     "unit": ing.unit
                 }
-                for ing in r.ingredients
-            ] if r.ingredients else [],
-            "preparation_steps": r.preparation_steps,
-            "cooking_time": r.cooking_time,
-            "categories": r.categories,
-            "rating": r.rating,
-            "tags": r.tags,
-            "creator_id": r.creator_id,
-            "image_url": r.image_url,
-            "nutritional_info": {
-                "calories": r.nutritional_info.calories if r.nutritional_info else 0,
-                "protein": r.nutritional_info.protein if r.nutritional_info else 0,
-                "carbs": r.nutritional_info.carbs if r.nutritional_info else 0,
-                "fats": r.nutritional_info.fats if r.nutritional_info else 0,
-            } if r.nutritional_info else None,
+                for ing in session.query(Ingredient).filter(Ingredient.recipe_id == recipe_id).all()
+            ],
+            "nutritional_info": nutrition_data,  
             "timers": [
                 {
                     "step_number": timer.step_number,
                     "duration": timer.duration,
                     "label": timer.label
                 }
-                for timer in db.query(CookingTimer).filter(CookingTimer.recipe_id == r.id).all()
-            ]
-        }
-        for r in recipes
-    ]    
+                for timer in timers
+            ] if timers else []
+        }, {}
 
-@app.get("/recipes/{recipe_id}")
-async def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    # Retrieve a specific recipe by ID.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-
-    rating = recipe.rating if recipe.rating is not None else 0.0
-    image_url = recipe.image_url if recipe.image_url else "/static/default-recipe.jpg"
-    timers = db.query(CookingTimer).filter(CookingTimer.recipe_id == recipe_id).all()
-
-    # Retrieve nutritional information.
-    nutritional_info = db.query(NutritionalInfo).filter(NutritionalInfo.recipe_id == recipe_id).first()
-    nutrition_data = {
-        "calories": nutritional_info.calories if nutritional_info else 0,
-        "protein": nutritional_info.protein if nutritional_info else 0,
-        "carbs": nutritional_info.carbs if nutritional_info else 0,
-        "fats": nutritional_info.fats if nutritional_info else 0,
-    }
-    print("Nutritional info:", recipe.nutritional_info)
-
-    return {
-        "id": recipe.id,
-        "name": recipe.name,
-        "preparation_steps": recipe.preparation_steps or "",
-        "cooking_time": recipe.cooking_time,
-        "servings": recipe.servings,
-        "categories": recipe.categories,
-        "tags": recipe.tags,
-        "image_url": image_url,        
-        "rating": rating,
-        "ingredients": [
-            {
-                "id": ing.id,
-                "name": ing.name,
-                "quantity": ing.quantity,
-                "unit": ing.unit
-            }
-            for ing in db.query(Ingredient).filter(Ingredient.recipe_id == recipe_id).all()
-        ],
-        "nutritional_info": nutrition_data,  
-        "timers": [
-            {
-                "step_number": timer.step_number,
-                "duration": timer.duration,
-                "label": timer.label
-            }
-            for timer in timers
-        ] if timers else []
-    }
+    # Cached until the recipe (or its ratings, timers, nutrition) changes.
+    key = response_cache.key_for(request)
+    entry = await db.run_sync(lambda session: response_cache.fetch(key, [recipe_tag(recipe_id)], lambda: build(session)))
+    return response_cache.respond(request, entry, validators)
 
 import json
 
@@ -365,7 +472,7 @@ async def update_recipe(
     timers: Optional[str] = Form("[]"),
     current_user_id: str = Form(...),
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Parse timers JSON string.
     try:
@@ -375,7 +482,7 @@ async def update_recipe(
         raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
 
     # Retrieve the recipe to be updated.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
@@ -383,17 +490,8 @@ async def update_recipe(
     if str(recipe.creator_id) != current_user_id:
         raise HTTPException(status_code=403, detail="You do not have permission to edit this recipe")
 
-    # If a new image is provided, save it and update the recipe's image URL.
-    if image:
-        image_filename = f"{recipe_id}_{os.urandom(8).hex()}.{image.filename.split('.')[-1]}"
-        image_path = os.path.join("static", image_filename)
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        if recipe.image_url and recipe.image_url != "/static/default-recipe.jpg":
-            old_image_path = recipe.image_url.replace("/static/", "static/")
-            if os.path.exists(old_image_path):
-                os.remove(old_image_path)
-        recipe.image_url = f"/static/{image_filename}"
+    # Stage a new image; a background job resizes it and then replaces the current one.
+    staged_image = await save_upload(image) if image else None
 
     # Update recipe fields.
     recipe.name = name
@@ -402,9 +500,10 @@ async def update_recipe(
     recipe.servings = servings
     recipe.categories = categories
     recipe.tags = tags
+    await db.run_sync(sync_recipe_tags, recipe)
 
     # Delete old ingredients and add updated ones.
-    db.query(Ingredient).filter(Ingredient.recipe_id == recipe.id).delete()
+    await db.execute(delete(Ingredient).where(Ingredient.recipe_id == recipe.id))
     ingredients_list = json.loads(ingredients)
     for ingredient in ingredients_list:
         new_ingredient = Ingredient(
@@ -415,33 +514,12 @@ async def update_recipe(
         )
         db.add(new_ingredient)
 
-    # Recalculate nutritional information.
-    nutrition_data = calculate_nutritional_info(ingredients_list, recipe.servings)
-    existing_nutrition = db.query(NutritionalInfo).filter(NutritionalInfo.recipe_id == recipe.id).first()
-    if existing_nutrition:
-        existing_nutrition.calories = nutrition_data["calories"]
-        existing_nutrition.protein = nutrition_data["protein"]
-        existing_nutrition.carbs = nutrition_data["carbs"]
-        existing_nutrition.fats = nutrition_data["fats"]
-    else:
-        new_nutrition = NutritionalInfo(
-            recipe_id=recipe.id,
-            calories=nutrition_data["calories"],
-            protein=nutrition_data["protein"],
-            carbs=nutrition_data["carbs"],
-            fats=nutrition_data["fats"]
-        )
-        db.add(new_nutrition)
-
-    db.commit()
-    print(f"Nutritional info updated successfully for recipe {recipe.id}")
-
-    db.commit()
+    await db.commit()
     
     # Delete old timers and add new ones.
     print(f"Deleting old timers for recipe ID {recipe.id}")
-    db.query(CookingTimer).filter(CookingTimer.recipe_id == recipe.id).delete()
-    db.commit()
+    await db.execute(delete(CookingTimer).where(CookingTimer.recipe_id == recipe.id))
+    await db.commit()
 
     print("Timers received:", timers_list)
     for timer in timers_list:
@@ -460,16 +538,27 @@ async def update_recipe(
         except (ValueError, KeyError, TypeError) as e:
             print(f"Error converting timer: {timer}, error: {e}")
 
-    db.commit()
+    await db.run_sync(bump_recipe_version, recipe.id)
+    await db.commit()
+    await db.run_sync(index_recipe, recipe)
+    response_cache.invalidate_recipe(recipe.id)
+
+    # Recalculate nutritional information and image variants in the background.
+    bind = sync_engine_for(db.get_bind())
+    nutrition_job = enqueue_nutrition_job(bind, recipe.id, ingredients_list, recipe.servings)
+    image_job = enqueue_image_job(bind, recipe.id, staged_image) if staged_image else None
 
     return {
         "message": "המתכון עודכן בהצלחה!",
-        "image_url": recipe.image_url  
+        "image_url": recipe.image_url,
+        "images": image_srcset(recipe.image_variants),
+        "nutrition_job_id": nutrition_job.id,
+        "image_job_id": image_job.id if image_job else None
     }
 
 
 @app.delete("/recipes/{recipe_id}", response_model=None)
-async def delete_recipe(recipe_id: int, authorization: str = Header(None), db: Session = Depends(get_db)):
+async def delete_recipe(recipe_id: int, authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
     # Delete a recipe by its ID. First, verify that the request includes a valid Authorization header.
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Authorization missing")
@@ -478,7 +567,7 @@ async def delete_recipe(recipe_id: int, authorization: str = Header(None), db: S
     user_id = int(authorization.replace("Bearer ", ""))
     
     # Retrieve the recipe from the database.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
@@ -486,9 +575,11 @@ async def delete_recipe(recipe_id: int, authorization: str = Header(None), db: S
     if recipe.creator_id != user_id:
         raise HTTPException(status_code=403, detail="You do not have permission to delete this recipe")
     
-    # Delete the recipe and commit the change.
-    db.delete(recipe)
-    db.commit()
+    # Delete the recipe, its search document and its image references, then commit the change.
+    await db.run_sync(unindex_recipe, recipe)
+    await db.delete(recipe)
+    await db.commit()
+    response_cache.invalidate_recipe(recipe_id)
     return {"message": "המתכון נמחק בהצלחה!"}
 
 
@@ -496,10 +587,20 @@ async def delete_recipe(recipe_id: int, authorization: str = Header(None), db: S
 async def scale_recipe(
     recipe_id: int,
     servings: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
 ):
+    # Revalidate against the recipe version before loading it.
+    validators = await db.run_sync(recipe_validators, recipe_id, f"scale-{servings}")
+    if validators is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if is_not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+    response.headers.update(validators)
+
     # Retrieve the recipe and verify it exists.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).options(selectinload(Recipe.ingredients)).where(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
@@ -517,35 +618,41 @@ async def scale_recipe(
 
 
 @app.post("/recipes/{recipe_id}/share/{user_id}")
-async def share_recipe(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+async def share_recipe(recipe_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
     # Share a recipe with another user.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    user = db.query(User).filter(User.id == user_id).first()
+    recipe = await db.get(Recipe, recipe_id)
+    user = await db.get(User, user_id)
     if not recipe or not user:
         raise HTTPException(status_code=404, detail="מתכון או משתמש לא נמצאו")
     
     # Check if the recipe is already shared with this user.
-    existing_share = db.query(SharedRecipe).filter(
+    existing_share = await db.scalar(select(SharedRecipe).where(
         SharedRecipe.recipe_id == recipe_id,
         SharedRecipe.user_id == user_id
-    ).first()
+    ))
     if existing_share:
         raise HTTPException(status_code=400, detail="המתכון כבר שותף עם היוזר הזה")
     
-    # Create the shared recipe record and commit.
+    # Create the shared recipe record and the user's notification, and commit.
     shared_recipe = SharedRecipe(recipe_id=recipe_id, user_id=user_id)
     db.add(shared_recipe)
-    db.commit()
-    
-    # Create a notification for the user.
-    create_notification(db, user_id, f"המתכון {recipe.name} שותף איתך!", f"/recipes/{recipe_id}")
+    await db.run_sync(enqueue_notification, [user_id], "recipe_shared", link=f"/recipes/{recipe_id}", recipe=recipe.name)
+    await db.commit()
     return {"message": f"המתכון '{recipe.name}' שותף עם המשתמש r {user_id}"}
 
 
 @app.get("/shopping-list/{recipe_id}")
-async def get_shopping_list(recipe_id: int, servings: int = 1, db: Session = Depends(get_db)):
+async def get_shopping_list(recipe_id: int, request: Request, response: Response, servings: int = 1, db: AsyncSession = Depends(get_read_db)):
+    # Revalidate against the recipe version before loading it.
+    validators = await db.run_sync(recipe_validators, recipe_id, f"shopping-{servings}")
+    if validators is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if is_not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+    response.headers.update(validators)
+
     # Retrieve the recipe for which the shopping list is needed.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.scalar(select(Recipe).options(selectinload(Recipe.ingredients)).where(Recipe.id == recipe_id))
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
@@ -562,24 +669,40 @@ async def get_shopping_list(recipe_id: int, servings: int = 1, db: Session = Dep
     return {"shopping_list": items}
 
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    # Report the status of a background job, e.g. a recipe's nutrition calculation.
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    # Hit ratio and invalidation counters of the recipe response cache.
+    return response_cache.stats()
+
+
 @app.post("/recipes/{recipe_id}/timers")
 async def add_timer(
     recipe_id: int,
     step_number: int = Form(...),
     duration: int = Form(...),
     label: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Retrieve the recipe to ensure it exists.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     # Create a new timer and save it to the database.
     new_timer = CookingTimer(recipe_id=recipe_id, step_number=step_number, duration=duration, label=label)
     db.add(new_timer)
-    db.commit()
-    db.refresh(new_timer)
+    await db.run_sync(bump_recipe_version, recipe_id)
+    await db.commit()
+    await db.refresh(new_timer)
+    response_cache.invalidate_recipe(recipe_id)
     return {"message": "Timer added successfully", "timer": new_timer}
 
 
@@ -587,36 +710,19 @@ async def add_timer(
 async def rate_recipe(
     recipe_id: int, 
     rating_data: RatingRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Ensure the rating is between 1 and 5.
     if rating_data.score < 1 or rating_data.score > 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
     
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-    if not recipe:
+    if await db.scalar(select(Recipe.id).where(Recipe.id == recipe_id)) is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    # Check if the user has already rated the recipe.
-    existing_rating = db.query(Rating).filter(
-        Rating.recipe_id == recipe_id, Rating.user_id == rating_data.user_id
-    ).first()
-    if existing_rating:
-        # Update existing rating.
-        existing_rating.score = rating_data.score
-    else:
-        # Create a new rating.
-        new_rating = Rating(recipe_id=recipe_id, user_id=rating_data.user_id, score=rating_data.score)
-        db.add(new_rating)
-    db.commit()
-    
-    # Recalculate the average rating for the recipe.
-    all_ratings = db.query(Rating).filter(Rating.recipe_id == recipe_id).all()
-    avg_rating = sum(r.score for r in all_ratings) / len(all_ratings)
-    recipe.rating = avg_rating
-    recipe.rating_count = len(all_ratings)
-    db.commit()
-    return {"message": "Rating added successfully", "average_rating": avg_rating}
+
+    # Upsert the vote and apply its delta to the recipe's running sum and count.
+    aggregate = await db.run_sync(apply_rating, recipe_id, rating_data.user_id, rating_data.score)
+    response_cache.invalidate_recipe(recipe_id)
+    return {"message": "Rating added successfully", "average_rating": aggregate["rating"], "rating_count": aggregate["rating_count"]}
 
 
 # Setup AI routes for the application.
@@ -626,10 +732,10 @@ setup_ai_routes(app)
 async def add_comment(
     recipe_id: int,
     comment_data: CommentRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Retrieve the recipe by its ID; return 404 if not found.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
@@ -637,63 +743,109 @@ async def add_comment(
     if not comment_data.content.strip():
         raise HTTPException(status_code=400, detail="Comment cannot be empty")
 
+    # A reply must belong to a comment on the same recipe.
+    parent_comment = None
+    if comment_data.parent_id is not None:
+        parent_comment = await db.get(Comment, comment_data.parent_id)
+        if not parent_comment or parent_comment.recipe_id != recipe_id:
+            raise HTTPException(status_code=404, detail="Parent comment not found")
+
     # Create a new Comment instance with the provided data and current timestamp.
     comment = Comment(
         recipe_id=recipe_id,
         user_id=comment_data.user_id,
         username=comment_data.username,  
         content=comment_data.content,
-        timestamp=datetime.now(timezone.utc).isoformat(),
-        parent_id=comment_data.parent_id
+        timestamp=datetime.now(timezone.utc).isoformat()
     )
 
-    # Save the comment to the database.
-    db.add(comment)
-    db.commit()
-    db.refresh(comment)
+    # Save the comment in its thread and count it towards the recipe's ranking.
+    await db.run_sync(insert_comment, comment, parent_comment)
+    await db.run_sync(refresh_ranking, recipe_id, comment_delta=1)
 
-    # If the commenter is not the recipe owner, create a notification for the owner.
+    # If the commenter is not the recipe owner, notify the owner (in the same transaction).
     if recipe.creator_id != comment_data.user_id:
-        create_notification(
-            db, 
-            user_id=recipe.creator_id, 
-            message=f"💬 {comment_data.username} הגיב על המתכון שלך {recipe.name}!",
-            link=f"/recipes/{recipe_id}"
+        await db.run_sync(
+            enqueue_notification,
+            [recipe.creator_id],
+            "recipe_comment",
+            actor=comment_data.username,
+            link=f"/recipes/{recipe_id}",
+            group_key=f"recipe_comment:{recipe_id}",
+            recipe=recipe.name
         )
+    await db.commit()
+    response_cache.invalidate_recipe(recipe_id)
 
     return {"message": "התגובה התווספה בהצלחה", "comment": comment.content}
 
 
 @app.get("/recipes/{recipe_id}/comments")
-async def get_comments(recipe_id: int, db: Session = Depends(get_db)):
-    # Fetch all comments associated with the given recipe.
-    comments = db.query(Comment).filter(Comment.recipe_id == recipe_id).all()
-    return [
-        {
-            "id": comment.id,
-            "user_id": comment.user_id,
-            "username": comment.username,
-            "content": comment.content,
-            "timestamp": comment.timestamp,
-            "parent_id": comment.parent_id  # Return the parent comment ID if it exists.
-        }
-        for comment in comments
-    ]
+async def get_comments(
+    recipe_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    max_depth: int = Query(COMMENT_MAX_DEPTH, ge=0),
+    replies: Optional[int] = Query(None, ge=0, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    def build(session):
+        # Threads in tree order: `limit` top-level comments per page, each followed by up to
+        # `replies` of its replies, at most max_depth levels down.
+        try:
+            comments, next_cursor = get_comment_threads(
+                session, recipe_id, limit=limit, cursor=cursor, max_depth=max_depth, replies=replies
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return comments, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    # Cached until a comment is added to the recipe.
+    key = response_cache.key_for(request)
+    entry = await db.run_sync(lambda session: response_cache.fetch(key, [recipe_tag(recipe_id)], lambda: build(session)))
+    return response_cache.respond(request, entry)
+
+
+@app.get("/recipes/{recipe_id}/comments/{comment_id}/replies")
+async def get_replies(
+    recipe_id: int,
+    comment_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    max_depth: int = Query(COMMENT_MAX_DEPTH, ge=1),
+    db: AsyncSession = Depends(get_read_db)
+):
+    def build(session):
+        # "Load more replies": the rest of a thread, from a replies_cursor or X-Next-Cursor.
+        comment = session.get(Comment, comment_id)
+        if not comment or comment.recipe_id != recipe_id:
+            raise HTTPException(status_code=404, detail="Comment not found")
+        try:
+            replies, next_cursor = get_comment_replies(session, comment, limit=limit, cursor=cursor, max_depth=max_depth)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return replies, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    key = response_cache.key_for(request)
+    entry = await db.run_sync(lambda session: response_cache.fetch(key, [recipe_tag(recipe_id)], lambda: build(session)))
+    return response_cache.respond(request, entry)
 
 
 # User endpoints
 @app.post("/register", include_in_schema=True)
-async def register_user(user: UserRegister, db: Session = Depends(get_db)):
+async def register_user(user: UserRegister, db: AsyncSession = Depends(get_db)):
     try:
         print("Data received:", user.model_dump())
 
         # Check if the user already exists by email.
-        existing_user = db.query(User).filter(User.email == user.email).first()
+        existing_user = await db.scalar(select(User).where(User.email == user.email))
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
 
-        # Hash the password using the defined password context.
-        hashed_password = pwd_context.hash(user.password) 
+        # Hash the password (deliberately slow) off the event loop.
+        hashed_password = await run_in_threadpool(pwd_context.hash, user.password)
 
         # Create a new User instance with the provided data.
         new_user = User(
@@ -709,8 +861,7 @@ async def register_user(user: UserRegister, db: Session = Depends(get_db)):
 
         # Save the new user to the database.
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
 
         return {"message": "User registered successfully"}
 
@@ -724,16 +875,16 @@ async def reply_to_comment(
     recipe_id: int,
     comment_id: int,
     comment_data: CommentRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Retrieve the recipe by ID.
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await db.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
-    # Retrieve the parent comment by its ID.
-    parent_comment = db.query(Comment).filter(Comment.id == comment_id).first()
-    if not parent_comment:
+    # Retrieve the parent comment by its ID; it must be on this recipe.
+    parent_comment = await db.get(Comment, comment_id)
+    if not parent_comment or parent_comment.recipe_id != recipe_id:
         raise HTTPException(status_code=404, detail="Parent comment not found")
 
     # Ensure that the reply content is not empty.
@@ -746,23 +897,26 @@ async def reply_to_comment(
         user_id=comment_data.user_id,
         username=comment_data.username,
         content=comment_data.content,
-        timestamp=datetime.now(timezone.utc).isoformat(),
-        parent_id=comment_id
+        timestamp=datetime.now(timezone.utc).isoformat()
     )
 
-    # Save the reply to the database.
-    db.add(reply_comment)
-    db.commit()
-    db.refresh(reply_comment)
+    # Save the reply under its parent and count it towards the recipe's ranking.
+    await db.run_sync(insert_comment, reply_comment, parent_comment)
+    await db.run_sync(refresh_ranking, recipe_id, comment_delta=1)
 
-    # Create a notification for the original commenter if the replier is not the same user.
+    # Notify the original commenter if the replier is not the same user.
     if parent_comment.user_id != comment_data.user_id:
-        create_notification(
-            db, 
-            user_id=parent_comment.user_id, 
-            message=f"💬 {comment_data.username} הגיב על התגובה שלך במתכון {recipe.name}!",
-            link=f"/recipes/{recipe_id}"
+        await db.run_sync(
+            enqueue_notification,
+            [parent_comment.user_id],
+            "comment_reply",
+            actor=comment_data.username,
+            link=f"/recipes/{recipe_id}",
+            group_key=f"comment_reply:{comment_id}",
+            recipe=recipe.name
         )
+    await db.commit()
+    response_cache.invalidate_recipe(recipe_id)
 
     return {
         "message": "Reply added successfully",
@@ -776,12 +930,12 @@ async def reply_to_comment(
     }
 
 @app.post("/login")
-async def login_user(user_data: dict, db: Session = Depends(get_db)):
+async def login_user(user_data: dict, db: AsyncSession = Depends(get_db)):
     # Retrieve the user based on the provided email.
-    user = db.query(User).filter(User.email == user_data["email"]).first()
+    user = await db.scalar(select(User).where(User.email == user_data["email"]))
 
     # If the user is not found or the password does not match, raise an error.
-    if not user or not verify_password(user_data["password"], user.password_hash):
+    if not user or not await run_in_threadpool(verify_password, user_data["password"], user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # Return a JWT token along with the user's basic info.
@@ -792,9 +946,9 @@ async def login_user(user_data: dict, db: Session = Depends(get_db)):
 
 
 @app.get("/users/")
-async def get_users(db: Session = Depends(get_db)):
+async def get_users(db: AsyncSession = Depends(get_read_db)):
     # Retrieve all users from the database.
-    users = db.query(User).all()
+    users = (await db.scalars(select(User))).all()
     if not users:
         raise HTTPException(status_code=404, detail="No users found")
     
@@ -814,7 +968,7 @@ async def get_users(db: Session = Depends(get_db)):
 @app.get("/users/me", response_model=None)
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # If no credentials are provided, return a message instead of crashing.
     if not credentials or not credentials.credentials:
@@ -835,7 +989,7 @@ async def get_current_user(
             raise HTTPException(status_code=401, detail="Invalid token")
 
         # Retrieve the user from the database.
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = await db.get(User, int(user_id))
         if not user:
             print("User not found")
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -860,26 +1014,26 @@ async def get_current_user(
 
 
 @app.get("/users/find/{username}")
-async def find_user(username: str, db: Session = Depends(get_db)):
+async def find_user(username: str, db: AsyncSession = Depends(get_read_db)):
     # Search for a user by username.
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return {"user_id": user.id}
 
 
 @app.get("/users/{user_id}/shared_recipes")
-async def get_shared_recipes(user_id: int, db: Session = Depends(get_db)):
+async def get_shared_recipes(user_id: int, db: AsyncSession = Depends(get_read_db)):
     # Retrieve recipes shared with the specified user.
     try:
-        shared_recipes = db.query(SharedRecipe).filter(SharedRecipe.user_id == user_id).all()
+        shared_recipes = (await db.scalars(select(SharedRecipe).where(SharedRecipe.user_id == user_id))).all()
         if not shared_recipes:
             return []
 
         result = []
         # For each shared recipe, fetch its details.
         for s in shared_recipes:
-            recipe = db.query(Recipe).filter(Recipe.id == s.recipe_id).first()
+            recipe = await db.get(Recipe, s.recipe_id)
             if recipe:
                 result.append({
                     "recipe_id": recipe.id,
@@ -894,10 +1048,10 @@ async def get_shared_recipes(user_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/users/{user_id}/recipes")
-async def get_user_recipes(user_id: int, db: Session = Depends(get_db)):
+async def get_user_recipes(user_id: int, db: AsyncSession = Depends(get_read_db)):
     try:
         # Retrieve recipes created by the specified user.
-        user_recipes = db.query(Recipe).filter(Recipe.creator_id == user_id).all()
+        user_recipes = (await db.scalars(select(Recipe).where(Recipe.creator_id == user_id))).all()
         if not user_recipes:
             return []
         return user_recipes
@@ -907,52 +1061,162 @@ async def get_user_recipes(user_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/users/{user_id}/notifications")
-async def fetch_notifications(user_id: int, db: Session = Depends(get_db)):
+async def fetch_notifications(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    unread: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
     # Retrieve the user to ensure they exist.
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Fetch all notifications for the user.
-    notifications = db.query(Notification).filter(Notification.user_id == user_id).all()
-    return [
-        {
-            "id": n.id,  # Include notification ID
-            "message": n.message,
-            "link": n.link,
-            "is_read": n.is_read,
-            "created_at": n.created_at.isoformat()
-        }
-        for n in notifications
-    ]
+    # Newest first; fetch one extra row to know whether another page follows.
+    try:
+        notifications = await db.run_sync(
+            get_user_notifications, user_id, limit=limit + 1 if limit else None, cursor=cursor, unread_only=unread
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit and len(notifications) > limit:
+        notifications = notifications[:limit]
+        response.headers["X-Next-Cursor"] = encode_notification_cursor(notifications[-1])
+    return [serialize_notification(n) for n in notifications]
+
+
+@app.post("/users/{user_id}/notifications/read")
+async def mark_read(user_id: int, body: Optional[MarkReadRequest] = None, db: AsyncSession = Depends(get_db)):
+    # Mark every unread notification of the user as read, or only the given ids.
+    marked = await db.run_sync(mark_notifications_as_read, user_id, body.ids if body else None)
+    return {"marked_read": marked}
+
+
+@app.get("/users/{user_id}/notifications/unread-count")
+async def fetch_unread_count(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    # A counter maintained with the notifications, instead of the whole history.
+    unread = await db.scalar(select(User.unread_notifications).where(User.id == user_id))
+    if unread is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"unread": unread}
+
+
+@app.get("/users/{user_id}/notifications/stream")
+async def stream_notifications(user_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    # Server-sent events: the unread count on connect, then every new notification and count change.
+    if not await db.get(User, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    async def events():
+        subscription = notification_broker.subscribe(user_id)
+        try:
+            # Read after subscribing, so no change falls between the count and the stream.
+            unread = await db.scalar(select(User.unread_notifications).where(User.id == user_id))
+            await db.close()  # Release the connection; the stream stays open for as long as the page.
+            yield format_sse("unread", {"type": "unread", "unread": unread})
+            while not await request.is_disconnected():
+                event = await subscription.get(NOTIFICATION_STREAM_HEARTBEAT)
+                # Comment lines keep proxies from closing an idle stream.
+                yield format_sse(event["type"], event) if event else ": keepalive\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.delete("/users/{user_id}/notifications/read")
-async def delete_read_notifications(user_id: int, db: Session = Depends(get_db)):
+async def delete_read_notifications(user_id: int, db: AsyncSession = Depends(get_db)):
     # Delete all notifications marked as read for the user.
-    deleted_rows = db.query(Notification).filter(Notification.user_id == user_id, Notification.is_read == True).delete(synchronize_session=False)
-    db.commit()
+    result = await db.execute(
+        delete(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read == True)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_rows = result.rowcount
+    await db.commit()
     # Return a message indicating the number of notifications deleted.
     return {"message": f"{deleted_rows} read notifications deleted" if deleted_rows > 0 else "No read notifications to delete"}
 
 
 @app.delete("/users/{user_id}/notifications/{notification_id}")
-async def delete_notification(user_id: int, notification_id: int, db: Session = Depends(get_db)):
+async def delete_notification(user_id: int, notification_id: int, db: AsyncSession = Depends(get_db)):
     # Delete a specific notification when the user clicks on it.
     # Retrieve the notification that matches the given notification ID and user ID.
-    notification = db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == user_id).first()
+    notification = await db.scalar(select(Notification).where(Notification.id == notification_id, Notification.user_id == user_id))
     
     # If the notification does not exist, return a 404 error.
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
     # Delete the notification from the database and commit the change.
-    db.delete(notification)
-    db.commit()
+    await db.delete(notification)
+    if not notification.is_read:
+        await db.run_sync(add_unread, {user_id: -1})
+    await db.commit()
+    if not notification.is_read:
+        publish_unread(user_id, await db.scalar(select(User.unread_notifications).where(User.id == user_id)))
     
     return {"message": "Notification deleted"}
 
 
+@app.post("/users/{user_id}/cooking-sessions")
+async def start_cooking_session(user_id: int, data: CookingSessionRequest, db: AsyncSession = Depends(get_read_db)):
+    # A session over the recipe's timers; each step is then started on its own.
+    timers = (await db.scalars(
+        select(CookingTimer).where(CookingTimer.recipe_id == data.recipe_id).order_by(CookingTimer.step_number)
+    )).all()
+    if not timers:
+        if not await db.get(Recipe, data.recipe_id):
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        raise HTTPException(status_code=400, detail="Recipe has no timers")
+    return await run_in_threadpool(timer_engine.create_session, user_id, data.recipe_id, timers)
+
+
+@app.get("/users/{user_id}/cooking-sessions")
+async def list_cooking_sessions(user_id: int):
+    return await run_in_threadpool(timer_engine.user_sessions, user_id)
+
+
+@app.get("/users/{user_id}/cooking-sessions/{session_id}")
+async def get_cooking_session(user_id: int, session_id: str):
+    try:
+        return await run_in_threadpool(timer_engine.get_session, session_id, user_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.post("/users/{user_id}/cooking-sessions/{session_id}/steps/{step_number}/{action}")
+async def control_cooking_timer(
+    user_id: int,
+    session_id: str,
+    step_number: int,
+    action: Literal["start", "pause", "resume", "reset"]
+):
+    # Expiry is pushed on /users/{user_id}/notifications/stream as a "timer" event.
+    operation = getattr(timer_engine, f"{action}_step")
+    try:
+        return await run_in_threadpool(operation, session_id, step_number, user_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/users/{user_id}/cooking-sessions/{session_id}")
+async def end_cooking_session(user_id: int, session_id: str):
+    try:
+        await run_in_threadpool(timer_engine.end_session, session_id, user_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"message": "Cooking session ended"}
+
+
 if __name__ == "__main__":
     import uvicorn
     # Run the FastAPI application on host 0.0.0.0 and port 8000.
@@ -0,0 +1,38 @@
+from alembic import context
+from logging.config import fileConfig
+from sqlalchemy import engine_from_config, pool
+from db.database import get_database_url
+from models.base import Base
+# Every model module, so autogenerate sees the whole schema.
+from models import image_model, notification_model, nutrition_model, ranking_model, recipe_model, search_model, user_model  # noqa: F401
+
+config = context.config
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    context.configure(url=get_database_url(), target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # db/migrations.py passes the application's connection; the alembic CLI connects itself.
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    connectable = engine_from_config({"sqlalchemy.url": get_database_url()}, prefix="sqlalchemy.", poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        _run(connection)
+
+def _run(connection):
+    # Batch mode lets ALTERs work on SQLite (tests and local runs) by copying the table.
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,302 @@
+"""baseline schema
+
+The schema as Base.metadata.create_all built it before migrations existed. Databases created
+that way are stamped with this revision instead of running it (see db/migrations.py).
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 16:34:12.681731
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('nutrition_lookups',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('found', sa.Boolean(), nullable=False),
+    sa.Column('calories', sa.Float(), nullable=True),
+    sa.Column('protein', sa.Float(), nullable=True),
+    sa.Column('carbs', sa.Float(), nullable=True),
+    sa.Column('fats', sa.Float(), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('stored_images',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('digest'),
+    sa.UniqueConstraint('filename')
+    )
+    with op.batch_alter_table('stored_images', schema=None) as batch_op:
+        batch_op.create_index('ix_stored_images_ref_count_updated_at', ['ref_count', 'updated_at'], unique=False)
+
+    op.create_table('tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'name', name='uq_tags_kind_name')
+    )
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tags_id'), ['id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(), nullable=False),
+    sa.Column('last_name', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('birthdate', sa.Date(), nullable=True),
+    sa.Column('gender', sa.String(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('password_hash', sa.String(), nullable=False),
+    sa.Column('dietary_preferences', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    op.create_table('notifications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('message', sa.String(), nullable=False),
+    sa.Column('link', sa.String(), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notifications_id'), ['id'], unique=False)
+
+    op.create_table('recipes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('preparation_steps', sa.String(), nullable=True),
+    sa.Column('cooking_time', sa.Integer(), nullable=True),
+    sa.Column('servings', sa.Integer(), nullable=True),
+    sa.Column('categories', sa.String(), nullable=True),
+    sa.Column('tags', sa.String(), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('rating_count', sa.Integer(), nullable=True),
+    sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('creator_id', sa.Integer(), nullable=True),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('image_variants', sa.JSON(none_as_null=True), nullable=True),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_recipes_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_recipes_name'), ['name'], unique=False)
+
+    op.create_table('comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('timestamp', sa.String(), nullable=False),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['parent_id'], ['comments.id'], ),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_comments_id'), ['id'], unique=False)
+
+    op.create_table('cooking_timers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=True),
+    sa.Column('step_number', sa.Integer(), nullable=True),
+    sa.Column('duration', sa.Integer(), nullable=True),
+    sa.Column('label', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cooking_timers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cooking_timers_id'), ['id'], unique=False)
+
+    op.create_table('ingredients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('quantity', sa.Float(), nullable=True),
+    sa.Column('unit', sa.String(), nullable=True),
+    sa.Column('nutritional_values', sa.JSON(), nullable=True),
+    sa.Column('recipe_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ingredients', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ingredients_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ingredients_name'), ['name'], unique=False)
+
+    op.create_table('nutritional_info',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=True),
+    sa.Column('calories', sa.Float(), nullable=True),
+    sa.Column('protein', sa.Float(), nullable=True),
+    sa.Column('carbs', sa.Float(), nullable=True),
+    sa.Column('fats', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('nutritional_info', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_nutritional_info_id'), ['id'], unique=False)
+
+    op.create_table('ratings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ratings', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ratings_id'), ['id'], unique=False)
+        batch_op.create_index('uq_ratings_recipe_user', ['recipe_id', 'user_id'], unique=True)
+
+    op.create_table('recipe_rankings',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('comment_count', sa.Integer(), nullable=False),
+    sa.Column('published_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('recipe_id')
+    )
+    with op.batch_alter_table('recipe_rankings', schema=None) as batch_op:
+        batch_op.create_index('ix_recipe_rankings_score', ['score', 'recipe_id'], unique=False)
+
+    op.create_table('recipe_search_documents',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('name_terms', sa.Text(), nullable=False),
+    sa.Column('ingredient_terms', sa.Text(), nullable=False),
+    sa.Column('step_terms', sa.Text(), nullable=False),
+    sa.Column('search_vector', sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('recipe_id')
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index('ix_recipe_search_documents_vector', 'recipe_search_documents', ['search_vector'], postgresql_using='gin')
+    op.create_table('recipe_shares',
+    sa.Column('recipe_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+    )
+    op.create_table('recipe_tags',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('recipe_id', 'tag_id')
+    )
+    with op.batch_alter_table('recipe_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_recipe_tags_tag_recipe', ['tag_id', 'recipe_id'], unique=False)
+
+    op.create_table('shared_recipes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('shared_recipes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_shared_recipes_id'), ['id'], unique=False)
+
+    op.create_table('shopping_lists',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('recipe_id', sa.Integer(), nullable=True),
+    sa.Column('items', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('shopping_lists', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_shopping_lists_id'), ['id'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('shopping_lists', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shopping_lists_id'))
+
+    op.drop_table('shopping_lists')
+    with op.batch_alter_table('shared_recipes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shared_recipes_id'))
+
+    op.drop_table('shared_recipes')
+    with op.batch_alter_table('recipe_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipe_tags_tag_recipe')
+
+    op.drop_table('recipe_tags')
+    op.drop_table('recipe_shares')
+    op.drop_table('recipe_search_documents')  # Drops the GIN index with it.
+    with op.batch_alter_table('recipe_rankings', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipe_rankings_score')
+
+    op.drop_table('recipe_rankings')
+    with op.batch_alter_table('ratings', schema=None) as batch_op:
+        batch_op.drop_index('uq_ratings_recipe_user')
+        batch_op.drop_index(batch_op.f('ix_ratings_id'))
+
+    op.drop_table('ratings')
+    with op.batch_alter_table('nutritional_info', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_nutritional_info_id'))
+
+    op.drop_table('nutritional_info')
+    with op.batch_alter_table('ingredients', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ingredients_name'))
+        batch_op.drop_index(batch_op.f('ix_ingredients_id'))
+
+    op.drop_table('ingredients')
+    with op.batch_alter_table('cooking_timers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cooking_timers_id'))
+
+    op.drop_table('cooking_timers')
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comments_id'))
+
+    op.drop_table('comments')
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recipes_name'))
+        batch_op.drop_index(batch_op.f('ix_recipes_id'))
+
+    op.drop_table('recipes')
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notifications_id'))
+
+    op.drop_table('notifications')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tags_id'))
+
+    op.drop_table('tags')
+    with op.batch_alter_table('stored_images', schema=None) as batch_op:
+        batch_op.drop_index('ix_stored_images_ref_count_updated_at')
+
+    op.drop_table('stored_images')
+    op.drop_table('nutrition_lookups')
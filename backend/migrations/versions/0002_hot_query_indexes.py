@@ -0,0 +1,43 @@
+"""indexes for foreign-key lookups and hot filters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ('ix_recipes_creator_id', 'recipes', ['creator_id'], False),
+    ('ix_ingredients_recipe_id', 'ingredients', ['recipe_id'], False),
+    ('ix_nutritional_info_recipe_id', 'nutritional_info', ['recipe_id'], False),
+    ('ix_cooking_timers_recipe_step', 'cooking_timers', ['recipe_id', 'step_number'], False),
+    ('ix_comments_recipe_parent', 'comments', ['recipe_id', 'parent_id'], False),
+    ('ix_comments_parent_id', 'comments', ['parent_id'], False),
+    ('ix_shared_recipes_recipe_id', 'shared_recipes', ['recipe_id'], False),
+    ('uq_shared_recipes_user_recipe', 'shared_recipes', ['user_id', 'recipe_id'], True),
+    ('ix_notifications_user_read_created', 'notifications', ['user_id', 'is_read', 'created_at'], False),
+    ('ix_users_username', 'users', ['username'], False),
+]
+
+
+def upgrade():
+    # Concurrent shares may have stored the same share twice; keep the first so the unique index can be built.
+    shared_recipes = sa.table('shared_recipes', sa.column('id'), sa.column('user_id'), sa.column('recipe_id'))
+    first = sa.select(sa.func.min(shared_recipes.c.id)).group_by(shared_recipes.c.user_id, shared_recipes.c.recipe_id)
+    op.execute(shared_recipes.delete().where(shared_recipes.c.id.not_in(first)))
+
+    # Databases stamped from create_all may already have some of them.
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
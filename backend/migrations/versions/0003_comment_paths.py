@@ -0,0 +1,74 @@
+"""materialized comment paths for threaded pagination
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# As in services/comment_service.py at the time of this migration.
+PATH_SEGMENT_WIDTH = 10
+
+def comment_columns():
+    return [
+        sa.Column('path', sa.String().with_variant(sa.String(collation='C'), 'postgresql'), nullable=True),
+        sa.Column('depth', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False),
+    ]
+
+INDEXES = [
+    ('ix_comments_recipe_depth_path', ['recipe_id', 'depth', 'path']),
+    ('ix_comments_recipe_path', ['recipe_id', 'path']),
+]
+
+
+def upgrade():
+    # Databases stamped from create_all may already have the columns.
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('comments')}
+    with op.batch_alter_table('comments') as batch_op:
+        for column in comment_columns():
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+    # Replies are inserted after their parent, so in id order every parent's path is known first.
+    comments = sa.table(
+        'comments', sa.column('id'), sa.column('parent_id'), sa.column('path'), sa.column('depth'), sa.column('reply_count')
+    )
+    bind = op.get_bind()
+    paths = {}
+    rows = []
+    for comment_id, parent_id in bind.execute(sa.select(comments.c.id, comments.c.parent_id).order_by(comments.c.id)):
+        parent = paths.get(parent_id)  # Replies to a missing comment become top-level.
+        path = (parent[0] if parent else '') + str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+        depth = parent[1] + 1 if parent else 0
+        paths[comment_id] = (path, depth)
+        rows.append({'comment_id': comment_id, 'new_path': path, 'new_depth': depth})
+    if rows:
+        bind.execute(
+            comments.update()
+            .where(comments.c.id == sa.bindparam('comment_id'))
+            .values(path=sa.bindparam('new_path'), depth=sa.bindparam('new_depth')),
+            rows
+        )
+
+    replies = sa.alias(comments, 'replies')
+    op.execute(comments.update().values(
+        reply_count=sa.select(sa.func.count(replies.c.id)).where(replies.c.parent_id == comments.c.id).scalar_subquery()
+    ))
+
+    for name, columns in INDEXES:
+        op.create_index(name, 'comments', columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='comments')
+    with op.batch_alter_table('comments') as batch_op:
+        for column in reversed(comment_columns()):
+            batch_op.drop_column(column.name)
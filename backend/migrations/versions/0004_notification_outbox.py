@@ -0,0 +1,37 @@
+"""notification outbox
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 20:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases stamped from create_all may already have the table.
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient_ids', sa.JSON(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('actor', sa.String(), nullable=True),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('link', sa.String(), nullable=True),
+    sa.Column('group_key', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_notification_outbox_created_at', 'notification_outbox', ['created_at'], if_not_exists=True)
+    op.create_index('ix_notification_outbox_group_key', 'notification_outbox', ['group_key'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_group_key', table_name='notification_outbox')
+    op.drop_index('ix_notification_outbox_created_at', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
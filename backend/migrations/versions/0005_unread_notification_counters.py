@@ -0,0 +1,34 @@
+"""per-user unread notification counters
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 21:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases stamped from create_all may already have the column.
+    if 'unread_notifications' not in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+
+    users = sa.table('users', sa.column('id'), sa.column('unread_notifications'))
+    notifications = sa.table('notifications', sa.column('user_id'), sa.column('is_read'))
+    unread = (
+        sa.select(sa.func.count())
+        .where(notifications.c.user_id == users.c.id, sa.or_(notifications.c.is_read == sa.false(), notifications.c.is_read.is_(None)))
+        .scalar_subquery()
+    )
+    op.execute(users.update().values(unread_notifications=unread))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('unread_notifications')
@@ -0,0 +1,121 @@
+"""keyset index for notifications; monthly partitions on PostgreSQL
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 22:00:00
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# As in services/notification_retention.py at the time of this migration.
+PARTITION_PREFIX = 'notifications_p'
+PARTITIONS_AHEAD = 3
+
+INDEXES = [
+    ('ix_notifications_id', ['id']),
+    ('ix_notifications_user_read_created', ['user_id', 'is_read', 'created_at']),
+    ('ix_notifications_user_created', ['user_id', 'created_at', 'id']),
+]
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def upgrade():
+    # Both columns become NOT NULL; the partition key cannot be NULL. Unread stays unread, as counted by 0005.
+    notifications = sa.table('notifications', sa.column('is_read'), sa.column('created_at'))
+    op.execute(notifications.update().where(notifications.c.is_read.is_(None)).values(is_read=sa.false()))
+    op.execute(notifications.update().where(notifications.c.created_at.is_(None)).values(created_at=sa.func.now()))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        partition_notifications()
+        return
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=False)
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_notifications_user_created', 'notifications', ['user_id', 'created_at', 'id'], if_not_exists=True)
+
+
+def partition_notifications():
+    # Rebuild the table partitioned by month of created_at; the primary key must include it.
+    bind = op.get_bind()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('notifications', 'id')")).scalar()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM notifications")).scalar()
+    month = (oldest or datetime.utcnow()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = next_month(datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    for _ in range(PARTITIONS_AHEAD - 1):
+        last = next_month(last)
+
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute(f"""
+        CREATE TABLE notifications_partitioned (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            user_id INTEGER REFERENCES users (id),
+            message VARCHAR NOT NULL,
+            link VARCHAR,
+            is_read BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT notifications_partitioned_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {PARTITION_PREFIX}{month:%Y%m} PARTITION OF notifications_partitioned "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"
+        )
+        month = next_month(month)
+    # Catches rows beyond the prepared months if the retention job stops creating them.
+    op.execute("CREATE TABLE notifications_default PARTITION OF notifications_partitioned DEFAULT")
+
+    op.execute(
+        "INSERT INTO notifications_partitioned (id, user_id, message, link, is_read, created_at) "
+        "SELECT id, user_id, message, link, is_read, created_at FROM notifications"
+    )
+    op.execute("DROP TABLE notifications")
+    op.execute("ALTER TABLE notifications_partitioned RENAME TO notifications")
+    op.execute("ALTER TABLE notifications RENAME CONSTRAINT notifications_partitioned_pkey TO notifications_pkey")
+    op.execute("ALTER TABLE notifications RENAME CONSTRAINT notifications_partitioned_user_id_fkey TO notifications_user_id_fkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY notifications.id")
+    for name, columns in INDEXES:
+        op.create_index(name, 'notifications', columns)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        unpartition_notifications()
+        return
+    op.drop_index('ix_notifications_user_created', table_name='notifications')
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=True)
+
+
+def unpartition_notifications():
+    sequence = op.get_bind().execute(sa.text("SELECT pg_get_serial_sequence('notifications', 'id')")).scalar()
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute(f"""
+        CREATE TABLE notifications_plain (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            user_id INTEGER REFERENCES users (id),
+            message VARCHAR NOT NULL,
+            link VARCHAR,
+            is_read BOOLEAN,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT notifications_plain_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("INSERT INTO notifications_plain SELECT id, user_id, message, link, is_read, created_at FROM notifications")
+    op.execute("DROP TABLE notifications")  # Drops the partitions with it.
+    op.execute("ALTER TABLE notifications_plain RENAME TO notifications")
+    op.execute("ALTER TABLE notifications RENAME CONSTRAINT notifications_plain_pkey TO notifications_pkey")
+    op.execute("ALTER TABLE notifications RENAME CONSTRAINT notifications_plain_user_id_fkey TO notifications_user_id_fkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY notifications.id")
+    for name, columns in INDEXES[:2]:
+        op.create_index(name, 'notifications', columns)
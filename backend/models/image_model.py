@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from models.base import Base
+from datetime import datetime, timezone
+
+# A content-addressed file under static/, shared by every recipe image that references it.
+class StoredImage(Base):
+    __tablename__ = "stored_images"
+    # The garbage collector looks for unreferenced files older than its grace period.
+    __table_args__ = (Index("ix_stored_images_ref_count_updated_at", "ref_count", "updated_at"),)
+
+    digest = Column(String(64), primary_key=True)  # SHA-256 of the file contents.
+    filename = Column(String, nullable=False, unique=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # Recipes whose image uses this file.
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
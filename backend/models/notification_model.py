@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from models.base import Base
@@ -6,13 +6,39 @@ from models.base import Base
 # Notification model for storing user notifications.
 class Notification(Base):
     __tablename__ = "notifications"
+    # On PostgreSQL the table is range-partitioned by month of created_at (migration 0006), so its
+    # primary key there is (id, created_at) and old months are dropped whole by the retention job.
+    __table_args__ = (
+        # A user's notifications, optionally only the (un)read ones, newest first.
+        Index("ix_notifications_user_read_created", "user_id", "is_read", "created_at"),
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),  # Keyset pages, newest first.
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     message = Column(String, nullable=False)
     link = Column(String, nullable=True)
-    is_read = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    is_read = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationship with the User model.
     user = relationship("User", back_populates="notifications")
+
+# Outbox of notification events: request handlers add them in their own transaction and the
+# dispatcher (services/notification_service.py) turns them into notifications in batches.
+class NotificationEvent(Base):
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_created_at", "created_at"),
+        Index("ix_notification_outbox_group_key", "group_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    recipient_ids = Column(JSON, nullable=False)  # Every user the event notifies.
+    kind = Column(String, nullable=False)  # Message template, see NOTIFICATION_TEMPLATES.
+    actor = Column(String, nullable=True)  # Who caused it, e.g. the commenter's username.
+    params = Column(JSON, nullable=False, default=dict)  # Other template values.
+    link = Column(String, nullable=True)
+    # Events with the same key for the same recipient are merged into one notification.
+    group_key = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Float, Boolean, DateTime
+from datetime import datetime
+from models.base import Base
+
+# Cached USDA lookup for a normalized ingredient name.
+class NutritionLookup(Base):
+    __tablename__ = "nutrition_lookups"
+
+    name = Column(String, primary_key=True)
+    found = Column(Boolean, nullable=False, default=True)  # False caches a "no data found" answer.
+    calories = Column(Float, default=0.0)
+    protein = Column(Float, default=0.0)
+    carbs = Column(Float, default=0.0)
+    fats = Column(Float, default=0.0)
+    fetched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
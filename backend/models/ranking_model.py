@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import backref, relationship
+from models.base import Base
+from datetime import datetime, timezone
+
+# Precomputed ranking score of a recipe, maintained incrementally by services/ranking_service.py.
+class RecipeRanking(Base):
+    __tablename__ = "recipe_rankings"
+    # Top-k reads walk this index backwards: ORDER BY score DESC, recipe_id DESC LIMIT k.
+    __table_args__ = (Index("ix_recipe_rankings_score", "score", "recipe_id"),)
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    comment_count = Column(Integer, nullable=False, default=0)
+    published_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    recipe = relationship("Recipe", backref=backref("ranking", uselist=False, cascade="all, delete-orphan"))
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, JSON, Table
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, JSON, Table, Index, UniqueConstraint, DateTime, func
+from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from models.base import Base
 
@@ -8,6 +9,14 @@ recipe_shares = Table('recipe_shares', Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'))
 )
 
+# Association table between recipes and their normalized categories/tags.
+recipe_tags = Table('recipe_tags', Base.metadata,
+    Column('recipe_id', Integer, ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # Lookups go from a tag to its recipes; the primary key covers the other direction.
+    Index('ix_recipe_tags_tag_recipe', 'tag_id', 'recipe_id')
+)
+
 class Recipe(Base):
     __tablename__ = 'recipes'
 
@@ -21,14 +30,31 @@ class Recipe(Base):
     tags = Column(String, nullable=True)
     rating = Column(Float, default=0.0)
     rating_count = Column(Integer, default=0)
-    creator_id = Column(Integer, ForeignKey('users.id'))
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")  # Running total of Rating.score.
+    creator_id = Column(Integer, ForeignKey('users.id'), index=True)
     image_url = Column(String, nullable=True)  
+    image_variants = Column(JSON(none_as_null=True), nullable=True)  # Resized WebP/JPEG files, see services/image_service.py.
+    # Bumped by every change to what GET /recipes/{id} returns; used for ETag/Last-Modified.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), server_default=func.now())
 
     comments = relationship("Comment", back_populates="recipe", cascade="all, delete-orphan")
     nutritional_info = relationship("NutritionalInfo", back_populates="recipe", uselist=False, cascade="all, delete-orphan")
     creator = relationship("User", back_populates="recipes")
     shared_with = relationship("SharedRecipe", back_populates="recipe", cascade="all, delete-orphan")
     cooking_timers = relationship("CookingTimer", back_populates="recipe", cascade="all, delete-orphan")
+    # Normalized form of categories/tags, kept in sync by services/tag_service.py.
+    labels = relationship("Tag", secondary=recipe_tags, back_populates="recipes")
+
+class Tag(Base):
+    __tablename__ = 'tags'
+    __table_args__ = (UniqueConstraint('kind', 'name', name='uq_tags_kind_name'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # "category" or "tag".
+    name = Column(String, nullable=False)
+
+    recipes = relationship("Recipe", secondary=recipe_tags, back_populates="labels")
 
 class Ingredient(Base):
     __tablename__ = 'ingredients'
@@ -38,7 +64,7 @@ class Ingredient(Base):
     quantity = Column(Float)
     unit = Column(String)
     nutritional_values = Column(JSON)  # Nutrition per 100g/ml.
-    recipe_id = Column(Integer, ForeignKey('recipes.id'))
+    recipe_id = Column(Integer, ForeignKey('recipes.id'), index=True)
     
     recipe = relationship("Recipe", back_populates="ingredients")
 
@@ -46,7 +72,7 @@ class NutritionalInfo(Base):
     __tablename__ = 'nutritional_info'
 
     id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, ForeignKey('recipes.id'))
+    recipe_id = Column(Integer, ForeignKey('recipes.id'), index=True)
     calories = Column(Float)
     protein = Column(Float)
     carbs = Column(Float)
@@ -68,6 +94,8 @@ class ShoppingList(Base):
 
 class CookingTimer(Base):
     __tablename__ = 'cooking_timers'
+    # A recipe's timers are always read together, in step order.
+    __table_args__ = (Index('ix_cooking_timers_recipe_step', 'recipe_id', 'step_number'),)
 
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey('recipes.id'))
@@ -79,6 +107,12 @@ class CookingTimer(Base):
 
 class Comment(Base):
     __tablename__ = 'comments'
+    __table_args__ = (
+        Index('ix_comments_recipe_parent', 'recipe_id', 'parent_id'),
+        Index('ix_comments_parent_id', 'parent_id'),  # Replies of a comment.
+        Index('ix_comments_recipe_depth_path', 'recipe_id', 'depth', 'path'),  # Threads of a recipe, in order.
+        Index('ix_comments_recipe_path', 'recipe_id', 'path'),  # A thread's replies, in tree order.
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey('recipes.id'), nullable=False)
@@ -87,6 +121,13 @@ class Comment(Base):
     content = Column(Text, nullable=False)
     timestamp = Column(String, nullable=False)
     parent_id = Column(Integer, ForeignKey('comments.id'), nullable=True)  
+    # Materialized path: the zero-padded ids from the thread's top comment down to this one,
+    # so a thread sorts in tree order and a subtree is a path range (see services/comment_service.py).
+    # Written right after the insert, once the id is known. Byte-wise collation on PostgreSQL,
+    # where locale collations would not keep tree order.
+    path = Column(String().with_variant(String(collation='C'), 'postgresql'), nullable=True)
+    depth = Column(Integer, nullable=False, default=0, server_default='0')  # 0 for top-level comments.
+    reply_count = Column(Integer, nullable=False, default=0, server_default='0')  # Direct replies.
 
     recipe = relationship("Recipe", back_populates="comments")
     user = relationship("User")
@@ -94,9 +135,11 @@ class Comment(Base):
 
 class SharedRecipe(Base):
     __tablename__ = 'shared_recipes'
+    # A recipe is shared with a user once; also serves "recipes shared with me".
+    __table_args__ = (Index('uq_shared_recipes_user_recipe', 'user_id', 'recipe_id', unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, ForeignKey('recipes.id'))
+    recipe_id = Column(Integer, ForeignKey('recipes.id'), index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
 
     recipe = relationship("Recipe", back_populates="shared_with")
@@ -104,6 +147,8 @@ class SharedRecipe(Base):
 
 class Rating(Base):
     __tablename__ = "ratings"
+    # One vote per user and recipe; also the conflict target of the rating upsert.
+    __table_args__ = (Index("uq_ratings_recipe_user", "recipe_id", "user_id", unique=True),)
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from models.base import Base
+
+# Pre-tokenized search terms for a recipe, kept in sync by services/search_service.py.
+class RecipeSearchDocument(Base):
+    __tablename__ = "recipe_search_documents"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    name_terms = Column(Text, nullable=False, default="")
+    ingredient_terms = Column(Text, nullable=False, default="")
+    step_terms = Column(Text, nullable=False, default="")
+    # Weighted tsvector of the terms above; only populated on PostgreSQL.
+    search_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True)
+
+# GIN index for tsvector matching; other databases use the in-process index instead.
+event.listen(
+    RecipeSearchDocument.__table__,
+    "after_create",
+    DDL("CREATE INDEX IF NOT EXISTS ix_recipe_search_documents_vector ON recipe_search_documents USING GIN (search_vector)").execute_if(dialect="postgresql")
+)
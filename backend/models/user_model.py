@@ -27,13 +27,16 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
-    username = Column(String, nullable=False)
+    username = Column(String, nullable=False, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     birthdate = Column(Date, nullable=True)
     gender = Column(String, nullable=True)
     phone_number = Column(String, nullable=True)
     password_hash = Column(String, nullable=False)
     dietary_preferences = Column(JSON, nullable=True)
+    # Maintained with every notification change (services/notification_service.py), so clients
+    # can poll or stream a count instead of the notification history.
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default='0')
 
     recipes = relationship("Recipe", back_populates="creator")
     shopping_lists = relationship("ShoppingList", back_populates="user")
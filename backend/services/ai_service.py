@@ -10,6 +10,9 @@ import re
 import requests
 from typing import List, Dict
 from deep_translator import GoogleTranslator
+from db.database import SessionLocal
+from services.nutrition_cache import MISSING, NutritionCache
+from services.nutrition_client import AsyncNutritionClient, NutritionNotFoundError
 
 load_dotenv()
 
@@ -245,10 +248,21 @@ def setup_ai_routes(app):
         except Exception as e:
             print(f"Error in /chat: {e}")
             raise HTTPException(status_code=500, detail=str(e))
+
+    @app.get("/nutrition/cache/stats", response_model=dict)
+    async def nutrition_cache_stats():
+        """Return hit/miss counters for the ingredient nutrition cache."""
+        return nutrition_cache.stats()
         
 USDA_API_KEY = os.getenv("USDA_API_KEY")
 USDA_API_URL = "https://api.nal.usda.gov/fdc/v1/foods/search"
 
+# Shared across requests so common ingredients are only fetched once.
+nutrition_cache = NutritionCache(SessionLocal)
+
+# Pooled, concurrent client used by the async request handlers.
+nutrition_client = AsyncNutritionClient(cache=nutrition_cache)
+
 def fetch_nutritional_info(ingredient_name: str, quantity: float, unit: str) -> Dict:
     """Fetch nutritional data from the USDA FoodData Central API."""
     if not USDA_API_KEY:
@@ -266,7 +280,7 @@ def fetch_nutritional_info(ingredient_name: str, quantity: float, unit: str) ->
     data = response.json()
 
     if "foods" not in data or not data["foods"]:
-        raise ValueError(f"No nutritional data found for {translated_name}")
+        raise NutritionNotFoundError(f"No nutritional data found for {translated_name}")
 
     food = data["foods"][0]
     nutrients = {nutrient["nutrientName"]: nutrient["value"] for nutrient in food["foodNutrients"]}
@@ -286,13 +300,22 @@ def calculate_nutritional_info(ingredients: List[Dict], servings: int) -> Dict:
 
     for ingredient in ingredients:
         try:
-            print(f"Fetching nutrition for: {ingredient['name']} ({ingredient['quantity']} {ingredient['unit']})")
-            nutrition = fetch_nutritional_info(
-                ingredient["name"], 
-                float(ingredient["quantity"]), 
-                ingredient["unit"]
-            )
-            print(f"Nutrition received: {nutrition}")
+            nutrition = nutrition_cache.get(ingredient["name"])
+            if nutrition is MISSING:
+                print(f"Fetching nutrition for: {ingredient['name']} ({ingredient['quantity']} {ingredient['unit']})")
+                try:
+                    nutrition = fetch_nutritional_info(
+                        ingredient["name"],
+                        float(ingredient["quantity"]),
+                        ingredient["unit"]
+                    )
+                except NutritionNotFoundError:
+                    nutrition_cache.set(ingredient["name"], None)
+                    raise
+                nutrition_cache.set(ingredient["name"], nutrition)
+                print(f"Nutrition received: {nutrition}")
+            elif nutrition is None:
+                raise NutritionNotFoundError(f"No nutritional data found for {ingredient['name']} (cached)")
 
             total_nutrition["calories"] += nutrition["calories"]
             total_nutrition["protein"] += nutrition["protein"]
@@ -304,3 +327,7 @@ def calculate_nutritional_info(ingredients: List[Dict], servings: int) -> Dict:
     per_serving = {key: round(value / float(servings), 2) for key, value in total_nutrition.items()}
     print(f"Final nutrition per serving: {per_serving}")
     return per_serving
+
+async def calculate_nutritional_info_async(ingredients: List[Dict], servings: int, strict: bool = False) -> Dict:
+    """Calculate recipe nutritional values without blocking the event loop."""
+    return await nutrition_client.calculate(ingredients, servings, strict=strict)
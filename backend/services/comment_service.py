@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, aliased
+from models.recipe_model import Comment
+import base64
+import os
+
+# Digits per id in a materialized path: the path of a reply is its parent's path followed by
+# its own zero-padded id, so sorting by path lists every thread in tree order.
+PATH_SEGMENT_WIDTH = 10
+# Deepest reply level one request returns, counted from the comment it starts at.
+COMMENT_MAX_DEPTH = int(os.getenv("COMMENT_MAX_DEPTH", "10"))
+# Sorts after every digit: a comment's subtree is the path range (path, path + SUBTREE_END).
+SUBTREE_END = ":"
+
+def comment_path(comment_id: int, parent_path: Optional[str] = None) -> str:
+    return (parent_path or "") + str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+
+def encode_comment_cursor(comment: Comment) -> str:
+    """Encode the tree position of a comment as an opaque cursor."""
+    return base64.urlsafe_b64encode(comment.path.encode()).decode()
+
+def decode_comment_cursor(cursor: str) -> str:
+    """Decode a cursor produced by encode_comment_cursor, raising ValueError if it is malformed."""
+    try:
+        path = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not path or not path.isdigit() or len(path) % PATH_SEGMENT_WIDTH:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return path
+
+def insert_comment(db: Session, comment: Comment, parent: Optional[Comment] = None) -> Comment:
+    """Add a comment (a reply to parent, if given) and place it in the thread; the caller commits."""
+    comment.parent_id = parent.id if parent else None
+    comment.depth = parent.depth + 1 if parent else 0
+    db.add(comment)
+    db.flush()  # Assigns the id the path ends with.
+    comment.path = comment_path(comment.id, parent.path if parent else None)
+    if parent is not None:
+        db.execute(update(Comment).where(Comment.id == parent.id).values(reply_count=Comment.reply_count + 1))
+    return comment
+
+def serialize_comment(comment: Comment) -> Dict:
+    return {
+        "id": comment.id,
+        "user_id": comment.user_id,
+        "username": comment.username,
+        "content": comment.content,
+        "timestamp": comment.timestamp,
+        "parent_id": comment.parent_id,  # The parent comment ID of a reply.
+        "depth": comment.depth,
+        "reply_count": comment.reply_count,
+    }
+
+def _depth_limit(max_depth: Optional[int]) -> int:
+    return COMMENT_MAX_DEPTH if max_depth is None else min(max_depth, COMMENT_MAX_DEPTH)
+
+def get_comment_threads(
+    db: Session,
+    recipe_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    max_depth: Optional[int] = None,
+    replies: Optional[int] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Top-level comments of a recipe after cursor, each followed by its replies in tree order.
+
+    Replies more than max_depth levels down are left out (reply_count tells which comments have
+    more), and a thread shows at most `replies` of them; a thread cut short carries the
+    replies_cursor to continue it from with get_comment_replies.
+    Returns the comments and the cursor of the next page of threads, or None on the last page.
+    """
+    max_depth = _depth_limit(max_depth)
+    query = select(Comment).where(Comment.recipe_id == recipe_id, Comment.depth == 0)
+    if cursor:
+        query = query.where(Comment.path > decode_comment_cursor(cursor))
+    query = query.order_by(Comment.path)
+    if limit:
+        query = query.limit(limit + 1)  # One extra row tells whether another page follows.
+    roots = db.scalars(query).all()
+
+    next_cursor = None
+    if limit and len(roots) > limit:
+        roots = roots[:limit]
+        next_cursor = encode_comment_cursor(roots[-1])
+    threads = {root.path: [] for root in roots}
+
+    # The replies of the whole page are one range of the (recipe_id, path) index.
+    if roots and max_depth > 0:
+        reply_query = select(Comment).where(
+            Comment.recipe_id == recipe_id,
+            Comment.depth.between(1, max_depth),
+            Comment.path > roots[0].path,
+            Comment.path < roots[-1].path + SUBTREE_END
+        )
+        if replies is None:
+            reply = Comment
+        else:
+            # Number the replies of each thread and keep one more than requested, to spot cut threads.
+            position = func.row_number().over(
+                partition_by=func.substr(Comment.path, 1, PATH_SEGMENT_WIDTH),
+                order_by=Comment.path
+            )
+            ranked = reply_query.add_columns(position.label("position")).subquery()
+            reply = aliased(Comment, ranked)
+            reply_query = select(reply).where(ranked.c.position <= replies + 1)
+        for comment in db.scalars(reply_query.order_by(reply.path)):
+            threads[comment.path[:PATH_SEGMENT_WIDTH]].append(comment)
+
+    comments = []
+    for root in roots:
+        thread = threads[root.path]
+        replies_cursor = None
+        if replies is not None and len(thread) > replies:
+            thread = thread[:replies]
+            replies_cursor = encode_comment_cursor(thread[-1] if thread else root)
+        comments.append({**serialize_comment(root), "replies_cursor": replies_cursor})
+        comments.extend(serialize_comment(comment) for comment in thread)
+    return comments, next_cursor
+
+def get_comment_replies(
+    db: Session,
+    comment: Comment,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    max_depth: Optional[int] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Replies below a comment in tree order, after cursor and at most max_depth levels down.
+
+    Continues a thread from a replies_cursor or from a previous page's cursor.
+    """
+    start = comment.path
+    if cursor:
+        start = decode_comment_cursor(cursor)
+        if not start.startswith(comment.path):
+            raise ValueError(f"Cursor is not inside comment {comment.id}")
+    query = (
+        select(Comment)
+        .where(
+            Comment.recipe_id == comment.recipe_id,
+            Comment.depth.between(comment.depth + 1, comment.depth + _depth_limit(max_depth)),
+            Comment.path > start,
+            Comment.path < comment.path + SUBTREE_END
+        )
+        .order_by(Comment.path)
+    )
+    if limit:
+        query = query.limit(limit + 1)
+    replies = db.scalars(query).all()
+
+    next_cursor = None
+    if limit and len(replies) > limit:
+        replies = replies[:limit]
+        next_cursor = encode_comment_cursor(replies[-1])
+    return [serialize_comment(reply) for reply in replies], next_cursor
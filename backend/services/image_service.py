@@ -1,6 +1,17 @@
-from fastapi import APIRouter, UploadFile
+from fastapi import APIRouter, HTTPException, UploadFile
 from fastapi.responses import FileResponse
-import shutil
+from typing import Dict, IO, Optional
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import inspect, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.recipe_model import Recipe
+from services.image_store import acquire_images, release_images, store_image
+from services.job_queue import Job, current_job, job_queue
+from services.recipe_version import bump_recipe_version, version_bump
+from services.response_cache import response_cache
+from services.upload_service import save_upload
+import io
 import os
 
 router = APIRouter()
@@ -9,16 +20,178 @@ router = APIRouter()
 STATIC_DIR = "static"
 os.makedirs(STATIC_DIR, exist_ok=True)
 
+DEFAULT_IMAGE_URL = "/static/default-recipe.jpg"
+
+# Responsive variants: name -> maximum width in pixels. Images are never upscaled.
+IMAGE_VARIANTS = {"thumb": 200, "card": 480, "full": 1280}
+
+# Encoded formats of every variant: key -> (Pillow format, file extension, save options).
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+class InvalidImageError(ValueError):
+    pass
+
 @router.post("/upload-image/")
 async def upload_image(file: UploadFile):
-    file_path = os.path.join(STATIC_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"image_url": f"/static/{file.filename}"}
+    # Streamed off the event loop, size-limited and type-checked.
+    file_path = await save_upload(file, STATIC_DIR, file.filename)
+    return {"image_url": f"/static/{os.path.basename(file_path)}"}
 
 @router.get("/static/{image_name}", response_class=FileResponse)
 async def get_image(image_name: str):
-    file_path = os.path.join(STATIC_DIR, image_name)
-    if os.path.exists(file_path):
-        return FileResponse(file_path, media_type="image/webp")
-    return {"message": "Image not found"}
+    # Apps mounting services/static_files.AssetFiles at /static never reach this route.
+    file_path = os.path.join(STATIC_DIR, os.path.basename(image_name))
+    if os.path.isfile(file_path):
+        return FileResponse(file_path)  # Media type from the extension.
+    raise HTTPException(status_code=404, detail="Image not found")
+
+def _flatten(image: Image.Image) -> Image.Image:
+    # JPEG has no alpha channel; transparent areas become white.
+    if image.mode == "RGB":
+        return image
+    background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+    return Image.alpha_composite(background, image.convert("RGBA")).convert("RGB")
+
+def process_image(db: Session, stream: IO[bytes], static_dir: str = STATIC_DIR) -> Dict[str, Dict]:
+    """Store resized WebP and JPEG variants of an uploaded image, without its metadata.
+
+    Returns {variant: {"width", "height", "webp": url, "jpeg": url}} for IMAGE_VARIANTS. The files
+    go to the image store unreferenced (not committed); see acquire_images.
+    Raises InvalidImageError if the stream is not a decodable image.
+    """
+    try:
+        source = Image.open(stream)
+        source.load()
+        # Apply the EXIF orientation before the EXIF data is dropped.
+        source = ImageOps.exif_transpose(source)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImageError(f"Invalid image: {e}")
+    source = source.convert("RGBA" if "A" in source.getbands() or "transparency" in source.info else "RGB")
+    source.info = {}
+
+    variants = {}
+    image = source
+    # Largest first, so each smaller variant is resized from the previous one.
+    for name, width in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        variant = {"width": image.width, "height": image.height}
+        for key, (image_format, extension, options) in IMAGE_FORMATS.items():
+            buffer = io.BytesIO()
+            (image if image_format == "WEBP" else _flatten(image)).save(buffer, image_format, **options)
+            variant[key] = store_image(db, buffer.getvalue(), extension, static_dir)
+        variants[name] = variant
+    return variants
+
+def image_srcset(variants: Optional[Dict[str, Dict]]) -> Optional[Dict]:
+    """Payload for a recipe's image: the variants plus one srcset string per format."""
+    if not variants:
+        return None
+    ordered = sorted(variants.values(), key=lambda variant: variant["width"])
+    srcset = {}
+    for key in IMAGE_FORMATS:
+        candidates = {}
+        for variant in ordered:
+            # Small originals produce identical variants; list each width once.
+            candidates.setdefault(variant["width"], variant[key])
+        srcset[key] = ", ".join(f"{url} {width}w" for width, url in candidates.items())
+    return {**variants, "srcset": srcset}
+
+def variant_urls(variants: Optional[Dict[str, Dict]]) -> set:
+    """The distinct file URLs behind a recipe's image variants."""
+    return {variant[key] for variant in (variants or {}).values() for key in IMAGE_FORMATS}
+
+def ensure_image_schema(bind: Engine):
+    """Add recipes.image_variants to databases created before it; safe to run repeatedly."""
+    if "image_variants" not in {column["name"] for column in inspect(bind).get_columns("recipes")}:
+        column_type = Recipe.__table__.c.image_variants.type.compile(dialect=bind.dialect)
+        with bind.begin() as connection:
+            connection.execute(text(f"ALTER TABLE recipes ADD COLUMN image_variants {column_type}"))
+
+def release_image(db: Session, recipe: Recipe):
+    """Drop the recipe's references to its image files (not committed); the collector deletes unused files."""
+    release_images(db, variant_urls(recipe.image_variants))
+
+def process_recipe_image(bind: Engine, recipe_id: int, upload_path: str, static_dir: str = STATIC_DIR) -> Optional[Dict]:
+    """Background job: make a staged upload the recipe's image, replacing the previous one.
+
+    Undecodable uploads are discarded; a job superseded by a newer upload for the same recipe
+    does not touch the recipe. Variants nobody ends up referencing are left to the collector.
+    """
+    job = current_job()
+    variants = None
+    db = Session(bind=bind)
+    try:
+        if job is None or not job.superseded:
+            try:
+                with open(upload_path, "rb") as f:
+                    variants = process_image(db, f, static_dir)
+            except InvalidImageError as e:
+                print(f"Discarding image upload for recipe {recipe_id}: {e}")
+        recipe = db.get(Recipe, recipe_id)
+        if recipe is None or (job is not None and job.superseded):
+            variants = None
+        if variants is not None:
+            release_image(db, recipe)
+            acquire_images(db, variant_urls(variants))
+            recipe.image_url = variants["full"]["jpeg"]
+            recipe.image_variants = variants
+            bump_recipe_version(db, recipe_id)
+        db.commit()
+    finally:
+        db.close()
+    os.remove(upload_path)
+    if variants is not None:
+        response_cache.invalidate_recipe(recipe_id)
+        print(f"Image of recipe {recipe_id} processed")
+    return variants
+
+def enqueue_image_job(bind: Engine, recipe_id: int, upload_path: str) -> Job:
+    # Keyed per recipe so a newer upload supersedes a pending one.
+    return job_queue.enqueue("process_recipe_image", process_recipe_image, bind, recipe_id, upload_path, key=f"recipe-image:{recipe_id}")
+
+def backfill_image_variants(bind: Engine, static_dir: str = STATIC_DIR) -> int:
+    """Background job: create the variants of images uploaded before the pipeline existed.
+
+    image_url moves to the full-size JPEG variant. Uploaded originals are then unreferenced and
+    left to the collector; bundled images (e.g. the seed photos) are kept.
+    """
+    db = Session(bind=bind)
+    processed = 0
+    try:
+        legacy = (
+            db.query(Recipe.id, Recipe.image_url)
+            .filter(Recipe.image_variants.is_(None), Recipe.image_url.like("/static/%"), Recipe.image_url != DEFAULT_IMAGE_URL)
+            .order_by(Recipe.id)
+            .all()
+        )
+        by_source = {}
+        for recipe_id, image_url in legacy:
+            path = os.path.join(static_dir, image_url.removeprefix("/static/"))
+            if image_url not in by_source:
+                try:
+                    with open(path, "rb") as f:
+                        by_source[image_url] = process_image(db, f, static_dir)
+                except (OSError, InvalidImageError) as e:
+                    print(f"Skipping image of recipe {recipe_id}: {e}")
+                    by_source[image_url] = None
+            variants = by_source[image_url]
+            if variants is None:
+                continue
+            db.execute(
+                update(Recipe)
+                .where(Recipe.id == recipe_id)
+                .values(image_variants=variants, image_url=variants["full"]["jpeg"], **version_bump())
+            )
+            acquire_images(db, variant_urls(variants))
+            db.commit()
+            processed += 1
+    finally:
+        db.close()
+    if processed:
+        response_cache.clear()
+        print(f"Created image variants for {processed} recipes")
+    return processed
@@ -0,0 +1,168 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.image_model import StoredImage
+from models.recipe_model import Recipe
+from services.job_queue import job_queue
+from services.rating_service import UPSERT_INSERTS
+from services.upload_service import UPLOAD_DIR
+import hashlib
+import os
+import re
+
+IMAGE_GC_INTERVAL = float(os.getenv("IMAGE_GC_INTERVAL", str(6 * 60 * 60)))  # Seconds.
+# How long an unreferenced file is kept, so uploads still being processed are never collected.
+IMAGE_GC_GRACE = float(os.getenv("IMAGE_GC_GRACE", str(60 * 60)))
+# Staged uploads older than this belong to jobs that gave up.
+STAGED_UPLOAD_TTL = float(os.getenv("STAGED_UPLOAD_TTL", str(24 * 60 * 60)))
+
+# Names of files the application writes to static/: stored images, and the random
+# "<name>_<16 hex>.<ext>" names uploads were given before the store existed.
+STORED_NAME = re.compile(r"^[0-9a-f]{32}\.[a-z]+$")
+LEGACY_UPLOAD_NAME = re.compile(r"^.+_[0-9a-f]{16}\.[A-Za-z0-9]+$")
+PARTIAL_SUFFIXES = (".part", ".tmp")
+
+def stored_filenames(urls: Iterable[str]) -> set:
+    """File names of the stored images among /static URLs."""
+    names = (url.removeprefix("/static/") for url in urls if url and url.startswith("/static/"))
+    return {name for name in names if STORED_NAME.match(name)}
+
+def _write_file(path: str, data: bytes):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(data)
+    os.replace(temporary_path, path)
+
+def store_image(db: Session, data: bytes, extension: str, static_dir: str) -> str:
+    """Store data under its SHA-256 and return its /static URL (not committed).
+
+    Identical contents are written once. Registering refreshes the row's updated_at, which keeps
+    the collector away until the caller has acquired a reference.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    filename = f"{digest[:32]}.{extension}"
+    now = datetime.now(timezone.utc)
+    insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    db.execute(
+        insert(StoredImage)
+        .values(digest=digest, filename=filename, size=len(data), ref_count=0, created_at=now, updated_at=now)
+        .on_conflict_do_update(index_elements=["digest"], set_={"updated_at": now})
+    )
+    path = os.path.join(static_dir, filename)
+    if not os.path.exists(path):
+        _write_file(path, data)
+    return f"/static/{filename}"
+
+def _add_references(db: Session, urls: Iterable[str], amount: int):
+    filenames = stored_filenames(urls)
+    if filenames:
+        db.execute(
+            update(StoredImage)
+            .where(StoredImage.filename.in_(filenames))
+            .values(ref_count=StoredImage.ref_count + amount, updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+
+def acquire_images(db: Session, urls: Iterable[str]):
+    """Count one more recipe using each stored file among urls (not committed)."""
+    _add_references(db, urls, 1)
+
+def release_images(db: Session, urls: Iterable[str]):
+    """Count one recipe fewer using each stored file among urls (not committed)."""
+    _add_references(db, urls, -1)
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def collect_garbage(db: Session, static_dir: str, upload_dir: str = UPLOAD_DIR, grace: float = IMAGE_GC_GRACE) -> Dict[str, int]:
+    """Delete image files nothing references any more; returns how many of each kind were removed.
+
+    Removes stored images whose reference count dropped to zero, files the application wrote
+    to static_dir that are neither tracked nor referenced by a Recipe.image_url, and stale
+    staged uploads. Files younger than grace seconds are always kept.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=grace)
+
+    # The rows stay locked until the files are gone, so a concurrent store of the same
+    # content waits and then writes the file again.
+    unreferenced = db.execute(
+        delete(StoredImage)
+        .where(StoredImage.ref_count <= 0, StoredImage.updated_at < cutoff)
+        .returning(StoredImage.filename)
+    ).scalars().all()
+    removed = {"stored": sum(_remove(os.path.join(static_dir, filename)) for filename in unreferenced)}
+    db.commit()
+
+    tracked = set(db.scalars(select(StoredImage.filename)))
+    referenced = {url.removeprefix("/static/") for url in db.scalars(select(Recipe.image_url).distinct()) if url}
+    removed["untracked"] = 0
+    with os.scandir(static_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.stat().st_mtime > cutoff.timestamp():
+                continue
+            name = entry.name
+            if (
+                name.endswith(PARTIAL_SUFFIXES)
+                or (STORED_NAME.match(name) and name not in tracked)
+                or (LEGACY_UPLOAD_NAME.match(name) and name not in referenced)
+            ):
+                removed["untracked"] += _remove(entry.path)
+
+    removed["staged"] = 0
+    if os.path.isdir(upload_dir):
+        with os.scandir(upload_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < now.timestamp() - STAGED_UPLOAD_TTL:
+                    removed["staged"] += _remove(entry.path)
+    return removed
+
+def collect_garbage_job(bind: Engine, static_dir: str) -> Dict[str, int]:
+    """Background job: sweep unreferenced image files."""
+    db = Session(bind=bind)
+    try:
+        removed = collect_garbage(db, static_dir)
+    finally:
+        db.close()
+    print(f"Image garbage collection removed {removed}")
+    return removed
+
+def schedule_image_gc(bind: Engine, static_dir: str, interval: float = IMAGE_GC_INTERVAL):
+    job_queue.every("images:gc", interval, collect_garbage_job, bind, static_dir)
+
+def reconcile_image_references(db: Session, static_dir: str) -> int:
+    """Recount references from the recipes' image variants and register stored files that have no row.
+
+    Repairs counts after crashes and brings stores written before reference counting up to
+    date; returns how many rows changed.
+    """
+    counts = Counter()
+    for (variants,) in db.execute(select(Recipe.image_variants).where(Recipe.image_variants.is_not(None))):
+        counts.update(stored_filenames(url for variant in variants.values() for url in variant.values() if isinstance(url, str)))
+
+    rows = {filename: ref_count for filename, ref_count in db.execute(select(StoredImage.filename, StoredImage.ref_count))}
+    changed = 0
+    for filename, ref_count in rows.items():
+        if ref_count != counts.get(filename, 0):
+            db.execute(update(StoredImage).where(StoredImage.filename == filename).values(ref_count=counts.get(filename, 0)))
+            changed += 1
+    for filename in counts.keys() - rows.keys():
+        path = os.path.join(static_dir, filename)
+        if not os.path.exists(path):
+            print(f"Stored image {filename} is referenced but missing")
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        db.add(StoredImage(digest=hashlib.sha256(data).hexdigest(), filename=filename, size=len(data), ref_count=counts[filename]))
+        changed += 1
+    db.commit()
+    if changed:
+        print(f"Reconciled {changed} stored image references")
+    return changed
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+import asyncio
+import inspect
+import os
+import threading
+import uuid
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_BACKOFF = float(os.getenv("JOB_BACKOFF", "2"))  # Seconds before the first retry; doubles each time.
+JOB_MAX_BACKOFF = float(os.getenv("JOB_MAX_BACKOFF", "300"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))  # Finished jobs kept for status queries.
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SUPERSEDED = "superseded"
+
+FINISHED = (SUCCEEDED, FAILED, SUPERSEDED)
+
+_local = threading.local()
+
+def current_job() -> Optional["Job"]:
+    """Return the job being run by the calling worker thread, if any."""
+    return getattr(_local, "job", None)
+
+class Job:
+    """A unit of background work and its current status."""
+
+    def __init__(self, name: str, func: Callable, args: tuple, kwargs: dict, key: Optional[str], max_attempts: int):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.max_attempts = max_attempts
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = None
+        self.result = None
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = self.created_at
+        self.next_attempt_at = None
+        self.done = threading.Event()
+
+    @property
+    def superseded(self) -> bool:
+        return self.status == SUPERSEDED
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None
+        }
+
+class JobQueue:
+    """In-process background job queue backed by a thread pool.
+
+    Failed jobs are retried with exponential backoff. Jobs enqueued with a key supersede any
+    unfinished job with the same key, so only the latest write for a record is applied.
+    Coroutine functions are run on a private event loop in the worker thread. every() schedules
+    a job to be enqueued periodically (e.g. nightly maintenance).
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        backoff: float = JOB_BACKOFF,
+        max_backoff: float = JOB_MAX_BACKOFF,
+        history: int = JOB_HISTORY
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.history = history
+        self._executor = None
+        self._jobs = OrderedDict()  # id -> Job
+        self._latest = {}  # key -> Job
+        self._schedules = {}  # name -> (schedule token, threading.Timer of its next run)
+        self._lock = threading.Lock()
+
+    def _submit(self, job: Job):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+            executor = self._executor
+        try:
+            executor.submit(self._run, job)
+        except RuntimeError as e:
+            # The interpreter is shutting down; the job cannot run any more.
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, FAILED)
+
+    def enqueue(self, name: str, func: Callable, *args, key: Optional[str] = None, max_attempts: Optional[int] = None, **kwargs) -> Job:
+        """Schedule func(*args, **kwargs) in the background and return its Job."""
+        job = Job(name, func, args, kwargs, key, max_attempts or self.max_attempts)
+        with self._lock:
+            if key is not None:
+                previous = self._latest.get(key)
+                if previous is not None and previous.status not in FINISHED:
+                    self._finish(previous, SUPERSEDED)
+                self._latest[key] = job
+            self._jobs[job.id] = job
+            self._prune()
+        self._submit(job)
+        return job
+
+    def every(self, name: str, interval: float, func: Callable, *args, first_delay: Optional[float] = None, **kwargs):
+        """Enqueue func(*args, **kwargs) every interval seconds (first after first_delay, default interval).
+
+        Runs are keyed by name, so a run still pending when the next one is due is superseded.
+        Scheduling the same name again replaces the previous schedule.
+        """
+        schedule = object()
+
+        def arm(delay: float):
+            timer = threading.Timer(delay, tick)
+            timer.daemon = True
+            with self._lock:
+                current = self._schedules.get(name)
+                if current is None or current[0] is not schedule:
+                    return  # Cancelled or replaced.
+                self._schedules[name] = (schedule, timer)
+            timer.start()
+
+        def tick():
+            with self._lock:
+                current = self._schedules.get(name)
+                if current is None or current[0] is not schedule:
+                    return
+            self.enqueue(name, func, *args, key=name, **kwargs)
+            arm(interval)
+
+        self.cancel_schedule(name)
+        with self._lock:
+            self._schedules[name] = (schedule, None)
+        arm(interval if first_delay is None else first_delay)
+
+    def cancel_schedule(self, name: str):
+        with self._lock:
+            current = self._schedules.pop(name, None)
+        if current is not None and current[1] is not None:
+            current[1].cancel()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """Block until the job finishes (or timeout expires) and return it."""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            schedules, self._schedules = self._schedules, {}
+            executor, self._executor = self._executor, None
+        for _, timer in schedules.values():
+            if timer is not None:
+                timer.cancel()
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.updated_at = datetime.now(timezone.utc)
+        job.next_attempt_at = None
+        if job.key is not None and self._latest.get(job.key) is job:
+            del self._latest[job.key]
+        job.done.set()
+
+    def _prune(self):
+        # Drop the oldest finished jobs once the history limit is reached.
+        excess = len(self._jobs) - self.history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job):
+        with self._lock:
+            if job.status in FINISHED:
+                return
+            job.status = RUNNING
+            job.attempts += 1
+            job.updated_at = datetime.now(timezone.utc)
+
+        _local.job = job
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                result = asyncio.run(job.func(*job.args, **job.kwargs))
+            else:
+                result = job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            print(f"Job {job.name} ({job.id}) attempt {job.attempts} failed: {e!r}")
+            with self._lock:
+                job.error = str(e)
+                if job.status in FINISHED:
+                    return
+                if job.attempts >= job.max_attempts:
+                    self._finish(job, FAILED)
+                    return
+                delay = min(self.backoff * 2 ** (job.attempts - 1), self.max_backoff)
+                job.status = RETRYING
+                job.updated_at = datetime.now(timezone.utc)
+                job.next_attempt_at = datetime.fromtimestamp(job.updated_at.timestamp() + delay, timezone.utc)
+            timer = threading.Timer(delay, self._submit, (job,))
+            timer.daemon = True
+            timer.start()
+            return
+        finally:
+            _local.job = None
+
+        with self._lock:
+            job.result = result
+            job.error = None
+            if job.status not in FINISHED:
+                self._finish(job, SUCCEEDED)
+
+# Shared queue for the application's background work.
+job_queue = JobQueue()
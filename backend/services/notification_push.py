@@ -0,0 +1,142 @@
+from typing import Dict, Optional, Set
+import asyncio
+import json
+import os
+import threading
+
+NOTIFICATION_PUSH_REDIS = os.getenv("NOTIFICATION_PUSH_REDIS", "0") == "1"  # Reach the streams of every worker.
+NOTIFICATION_PUSH_CHANNEL = os.getenv("NOTIFICATION_PUSH_CHANNEL", "plateful:notifications")
+NOTIFICATION_STREAM_QUEUE = int(os.getenv("NOTIFICATION_STREAM_QUEUE", "100"))  # Events buffered per stream.
+NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", "15"))  # Seconds.
+
+def format_sse(event: str, data: Dict) -> str:
+    """One server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class Subscription:
+    """The events pushed to one open stream of a user."""
+
+    def __init__(self, broker: "NotificationBroker", user_id: int):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=NOTIFICATION_STREAM_QUEUE)
+
+    def put(self, event: Dict):
+        # Runs on the stream's event loop. A client that stopped reading loses its oldest events;
+        # every event carries the unread count, so the counter catches up with the next one.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """The next event, or None if none arrives within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class NotificationBroker:
+    """Pub/sub of per-user events for the notification streams.
+
+    Events are delivered to the subscriptions of this process; with a Redis client they are
+    published on a channel instead, which a listener thread in every worker relays to its own.
+    publish() may be called from any thread (e.g. the notification dispatcher job).
+    """
+
+    def __init__(self, redis_client=None, channel: str = NOTIFICATION_PUSH_CHANNEL):
+        self.redis = redis_client
+        self.channel = channel
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._stopped = threading.Event()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Start receiving a user's events; call from the event loop that reads them."""
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            if self.redis is not None and self._listener is None:
+                self._stopped.clear()
+                self._listener = threading.Thread(target=self._listen, name="notification-push", daemon=True)
+                self._listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(user_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, user_id: int, event: Dict):
+        """Push an event to every open stream of the user."""
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.channel, json.dumps({"user_id": user_id, "event": event}, ensure_ascii=False))
+                return
+            except Exception as e:
+                # Still reach the streams connected to this worker.
+                print(f"Notification push through Redis failed: {e!r}")
+        self._deliver(user_id, event)
+
+    def _deliver(self, user_id: int, event: Dict):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Its event loop is closed; the stream is gone.
+                self.unsubscribe(subscription)
+
+    def _listen(self):
+        # Relay the channel to this process's subscriptions, reconnecting after errors.
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None or message.get("type") != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    self._deliver(int(data["user_id"]), data["event"])
+            except Exception as e:
+                print(f"Notification push listener error: {e!r}")
+                self._stopped.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def close(self):
+        """Stop the Redis listener (it restarts with the next subscription)."""
+        self._stopped.set()
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.join(timeout=2.0)
+
+def notification_broker_from_env() -> NotificationBroker:
+    redis_client = None
+    if NOTIFICATION_PUSH_REDIS:
+        from services.timer_service import redis_client
+    return NotificationBroker(redis_client=redis_client)
+
+# Shared broker for the application's notification streams.
+notification_broker = notification_broker_from_env()
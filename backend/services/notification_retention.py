@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.notification_model import Notification
+from services.job_queue import job_queue
+from services.notification_service import add_unread
+import os
+
+NOTIFICATION_RETENTION_DAYS = float(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))  # 0 keeps them forever.
+NOTIFICATION_PURGE_INTERVAL = float(os.getenv("NOTIFICATION_PURGE_INTERVAL", str(24 * 60 * 60)))  # Seconds.
+NOTIFICATION_PURGE_BATCH_SIZE = int(os.getenv("NOTIFICATION_PURGE_BATCH_SIZE", "1000"))
+NOTIFICATION_PARTITIONS_AHEAD = int(os.getenv("NOTIFICATION_PARTITIONS_AHEAD", "3"))  # Months created in advance.
+
+# Monthly partitions of the notifications table on PostgreSQL are named notifications_pYYYYMM.
+PARTITION_PREFIX = "notifications_p"
+# Catches rows outside the prepared months (see migration 0006).
+DEFAULT_PARTITION = "notifications_default"
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(month: datetime) -> datetime:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+def partition_month(name: str) -> Optional[datetime]:
+    """The month a partition holds, or None for other tables (e.g. the default partition)."""
+    try:
+        return datetime.strptime(name.removeprefix(PARTITION_PREFIX), "%Y%m") if name.startswith(PARTITION_PREFIX) else None
+    except ValueError:
+        return None
+
+def partition_ddl(month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF notifications "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"
+    )
+
+def month_filter(month: datetime) -> str:
+    return f"created_at >= '{month:%Y-%m-%d}' AND created_at < '{next_month(month):%Y-%m-%d}'"
+
+def split_default_ddl(month: datetime) -> List[str]:
+    """Create a month's partition when the default partition already holds rows of that month.
+
+    PostgreSQL refuses to create it while the default partition holds rows it would own, so the
+    default is detached, its rows of the month moved into the new partition, and re-attached.
+    """
+    return [
+        f"ALTER TABLE notifications DETACH PARTITION {DEFAULT_PARTITION}",
+        partition_ddl(month),
+        f"INSERT INTO {partition_name(month)} SELECT * FROM {DEFAULT_PARTITION} WHERE {month_filter(month)}",
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE {month_filter(month)}",
+        f"ALTER TABLE notifications ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT",
+    ]
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'notifications'::regclass)"
+    )).scalar()
+
+def notification_partitions(db: Session) -> List[str]:
+    return list(db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'notifications'::regclass ORDER BY c.relname"
+    )).scalars())
+
+def ensure_partitions(db: Session, now: Optional[datetime] = None, ahead: int = NOTIFICATION_PARTITIONS_AHEAD) -> List[str]:
+    """Create the partitions from this month to `ahead` months on, so none fill the default one (not committed)."""
+    existing = set(notification_partitions(db))
+    month = month_start(now or datetime.utcnow())
+    created = []
+    for _ in range(ahead + 1):
+        if partition_name(month) not in existing:
+            strays = DEFAULT_PARTITION in existing and db.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {month_filter(month)})"
+            )).scalar()
+            for statement in split_default_ddl(month) if strays else [partition_ddl(month)]:
+                db.execute(text(statement))
+            created.append(partition_name(month))
+        month = next_month(month)
+    return created
+
+def drop_expired_partitions(db: Session, cutoff: datetime) -> int:
+    """Drop the partitions holding only notifications older than cutoff; returns how many rows went."""
+    removed = 0
+    for name in notification_partitions(db):
+        month = partition_month(name)
+        if month is None or next_month(month) > cutoff:
+            continue
+        # Detached first, so no notification in it is marked read between the count and the drop.
+        db.execute(text(f"ALTER TABLE notifications DETACH PARTITION {name}"))
+        counts = db.execute(text(
+            f"SELECT user_id, count(*) FILTER (WHERE NOT is_read), count(*) FROM {name} GROUP BY user_id"
+        )).all()
+        add_unread(db, {user_id: -unread for user_id, unread, _ in counts if user_id is not None and unread})
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        removed += sum(total for _, _, total in counts)
+        print(f"Dropped notification partition {name}")
+    return removed
+
+def purge_notifications(
+    db: Session,
+    now: Optional[datetime] = None,
+    retention_days: float = NOTIFICATION_RETENTION_DAYS,
+    batch_size: int = NOTIFICATION_PURGE_BATCH_SIZE
+) -> int:
+    """Delete notifications older than the retention period, keeping the unread counters right.
+
+    Whole expired partitions are dropped on PostgreSQL; the rest is deleted in batches.
+    Returns how many notifications were removed.
+    """
+    if retention_days <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    purged = drop_expired_partitions(db, cutoff) if is_partitioned(db) else 0
+
+    while True:
+        ids = db.scalars(select(Notification.id).where(Notification.created_at < cutoff).limit(batch_size)).all()
+        if not ids:
+            break
+        # The rows as deleted, so a notification read meanwhile is not counted as unread.
+        deleted = db.execute(
+            delete(Notification)
+            .where(Notification.id.in_(ids), Notification.created_at < cutoff)
+            .returning(Notification.user_id, Notification.is_read)
+            .execution_options(synchronize_session=False)
+        ).all()
+        deltas = {}
+        for user_id, is_read in deleted:
+            if user_id is not None and not is_read:
+                deltas[user_id] = deltas.get(user_id, 0) - 1
+        add_unread(db, deltas)
+        db.commit()
+        purged += len(deleted)
+    return purged
+
+def maintain_notifications_job(bind: Engine) -> int:
+    """Background job: create upcoming partitions and purge expired notifications."""
+    db = Session(bind=bind)
+    try:
+        if is_partitioned(db):
+            try:
+                ensure_partitions(db)
+                db.commit()
+            except Exception as e:
+                # Rows land in the default partition meanwhile; the purge still runs.
+                db.rollback()
+                print(f"Creating notification partitions failed: {e!r}")
+        purged = purge_notifications(db)
+    finally:
+        db.close()
+    print(f"Purged {purged} expired notifications")
+    return purged
+
+def schedule_notification_retention(bind: Engine, interval: float = NOTIFICATION_PURGE_INTERVAL):
+    job_queue.every("notifications:retention", interval, maintain_notifications_job, bind)
@@ -1,19 +1,238 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, delete, insert, or_, select, update
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
-from models.notification_model import Notification
+from models.notification_model import Notification, NotificationEvent
+from models.user_model import User
+from services.job_queue import job_queue
+from services.notification_push import notification_broker
+import base64
+import json
+import os
+
+NOTIFICATION_DISPATCH_INTERVAL = float(os.getenv("NOTIFICATION_DISPATCH_INTERVAL", "5"))  # Seconds.
+# Grouped events wait this long (seconds) for more of their group, so a burst becomes one notification.
+NOTIFICATION_COALESCE_WINDOW = float(os.getenv("NOTIFICATION_COALESCE_WINDOW", "30"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "500"))  # Outbox events per transaction.
+
+# Messages by event kind: (one actor, several actors). The latter gets {others}, the number of other actors.
+NOTIFICATION_TEMPLATES = {
+    "recipe_comment": ("💬 {actor} הגיב על המתכון שלך {recipe}!", "💬 {actor} ועוד {others} הגיבו על המתכון שלך {recipe}!"),
+    "comment_reply": ("💬 {actor} הגיב על התגובה שלך במתכון {recipe}!", "💬 {actor} ועוד {others} הגיבו על התגובה שלך במתכון {recipe}!"),
+    "recipe_shared": ("המתכון {recipe} שותף איתך!", "המתכון {recipe} שותף איתך!"),
+    "message": ("{message}", "{message}"),
+}
+
+def serialize_notification(notification: Notification) -> Dict:
+    return {
+        "id": notification.id,
+        "message": notification.message,
+        "link": notification.link,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat()
+    }
+
+def add_unread(db: Session, deltas: Dict[int, int]):
+    """Adjust the users' unread notification counters by user_id -> delta (not committed)."""
+    if not deltas:
+        return
+    users = User.__table__
+    db.execute(
+        update(users)
+        .where(users.c.id == bindparam("counter_user_id"))
+        .values(unread_notifications=users.c.unread_notifications + bindparam("delta")),
+        [{"counter_user_id": user_id, "delta": delta} for user_id, delta in deltas.items()]
+    )
+
+def unread_counts(db: Session, user_ids: Iterable[int]) -> Dict[int, int]:
+    rows = db.execute(select(User.id, User.unread_notifications).where(User.id.in_(list(user_ids))))
+    return {user_id: unread for user_id, unread in rows}
+
+def publish_unread(user_id: int, unread: int):
+    """Push a user's new unread count to their open notification streams."""
+    notification_broker.publish(user_id, {"type": "unread", "unread": unread})
 
 def create_notification(db: Session, user_id: int, message: str, link: str = None):
     """Create a new notification for the user."""
-    notification = Notification(user_id=user_id, message=message, link=link)
+    notification = Notification(user_id=user_id, message=message, link=link, created_at=datetime.utcnow())
     db.add(notification)
+    add_unread(db, {user_id: 1})
     db.commit()
     db.refresh(notification)
+    notification_broker.publish(user_id, {
+        "type": "notification",
+        "notification": serialize_notification(notification),
+        "unread": db.scalar(select(User.unread_notifications).where(User.id == user_id))
+    })
     return notification
 
-def get_user_notifications(db: Session, user_id: int):
-    """Return the user's notifications, ordered by creation date descending."""
-    return db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at.desc()).all()
+def enqueue_notification(
+    db: Session,
+    recipient_ids: Iterable[int],
+    kind: str,
+    actor: Optional[str] = None,
+    link: Optional[str] = None,
+    group_key: Optional[str] = None,
+    **params
+) -> Optional[NotificationEvent]:
+    """Add a notification event for one or many users to the outbox; it is sent when the caller commits.
+
+    Events sharing a group_key are coalesced per recipient ("X and 4 others commented").
+    """
+    if kind not in NOTIFICATION_TEMPLATES:
+        raise ValueError(f"Unknown notification kind: {kind}")
+    recipient_ids = list(dict.fromkeys(recipient_ids))
+    if not recipient_ids:
+        return None
+    event = NotificationEvent(
+        recipient_ids=recipient_ids,
+        kind=kind,
+        actor=actor,
+        params=params,
+        link=link,
+        group_key=group_key
+    )
+    db.add(event)
+    return event
+
+def render_notification(kind: str, actors: List[str], params: Dict) -> str:
+    one, several = NOTIFICATION_TEMPLATES[kind]
+    if len(actors) > 1:
+        return several.format(actor=actors[-1], others=len(actors) - 1, **params)
+    return one.format(actor=actors[0] if actors else "", **params)
+
+def dispatch_notifications(db: Session, now: Optional[datetime] = None, batch_size: int = NOTIFICATION_BATCH_SIZE) -> int:
+    """Turn due outbox events into notifications with one bulk insert; returns how many were created.
+
+    Ungrouped events are due at once, a group once its oldest event is NOTIFICATION_COALESCE_WINDOW old.
+    The events of each (recipient, group) become a single notification.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=NOTIFICATION_COALESCE_WINDOW)
+    due_groups = select(NotificationEvent.group_key).where(
+        NotificationEvent.group_key.is_not(None),
+        NotificationEvent.created_at <= cutoff
+    )
+    events = db.scalars(
+        select(NotificationEvent)
+        .where(or_(NotificationEvent.group_key.is_(None), NotificationEvent.group_key.in_(due_groups)))
+        .order_by(NotificationEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # Other workers dispatch the rest (PostgreSQL).
+    ).all()
+    if not events:
+        return 0
+    if len(events) == batch_size:
+        # The batch may end inside a burst; take the rest of its groups, so each stays one notification.
+        cut_groups = {event.group_key for event in events if event.group_key is not None}
+        if cut_groups:
+            events += db.scalars(
+                select(NotificationEvent)
+                .where(NotificationEvent.group_key.in_(cut_groups), NotificationEvent.id > events[-1].id)
+                .order_by(NotificationEvent.id)
+                .with_for_update(skip_locked=True)
+            ).all()
+
+    # (recipient, group) -> its events, oldest first.
+    groups = {}
+    for event in events:
+        for user_id in event.recipient_ids:
+            groups.setdefault((user_id, event.group_key or event.id), []).append(event)
+
+    rows = []
+    for (user_id, _), grouped in groups.items():
+        latest = grouped[-1]
+        actors = list(dict.fromkeys(event.actor for event in grouped if event.actor))
+        # The newest actor leads the message.
+        if latest.actor:
+            actors.remove(latest.actor)
+            actors.append(latest.actor)
+        rows.append({
+            "user_id": user_id,
+            "message": render_notification(latest.kind, actors, latest.params or {}),
+            "link": latest.link,
+            "is_read": False,
+            "created_at": latest.created_at,
+        })
+    created = db.scalars(insert(Notification).returning(Notification), rows).all()
+    pushes = [(notification.user_id, serialize_notification(notification)) for notification in created]
+    deltas = {}
+    for user_id, _ in pushes:
+        deltas[user_id] = deltas.get(user_id, 0) + 1
+    add_unread(db, deltas)
+    db.execute(delete(NotificationEvent).where(NotificationEvent.id.in_([event.id for event in events])))
+    db.commit()
+
+    # Push each notification, with its recipient's new unread count, to their open streams.
+    unread = unread_counts(db, deltas)
+    for user_id, notification in pushes:
+        notification_broker.publish(user_id, {"type": "notification", "notification": notification, "unread": unread.get(user_id, 0)})
+    return len(created)
+
+def dispatch_notifications_job(bind: Engine) -> int:
+    """Background job: drain the due part of the notification outbox."""
+    db = Session(bind=bind)
+    dispatched = 0
+    try:
+        while True:
+            sent = dispatch_notifications(db)
+            dispatched += sent
+            if not sent:
+                break
+    finally:
+        db.close()
+    return dispatched
+
+def schedule_notification_dispatch(bind: Engine, interval: float = NOTIFICATION_DISPATCH_INTERVAL):
+    job_queue.every("notifications:dispatch", interval, dispatch_notifications_job, bind)
+
+def encode_notification_cursor(notification: Notification) -> str:
+    """Encode the (created_at, id) keyset position of a notification as an opaque cursor."""
+    position = {"created_at": notification.created_at.isoformat(), "id": notification.id}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_notification_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_notification_cursor, raising ValueError if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position["created_at"]), int(position["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_user_notifications(
+    db: Session,
+    user_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    unread_only: bool = False
+):
+    """Return the user's notifications, ordered by creation date descending.
+
+    limit and cursor page through them by (created_at, id); unread_only skips read ones.
+    """
+    conditions = [Notification.user_id == user_id]
+    if unread_only:
+        conditions.append(Notification.is_read == False)
+    if cursor:
+        created_at, last_id = decode_notification_cursor(cursor)
+        conditions.append(or_(
+            Notification.created_at < created_at,
+            and_(Notification.created_at == created_at, Notification.id < last_id)
+        ))
+    query = db.query(Notification).filter(*conditions).order_by(Notification.created_at.desc(), Notification.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
-def mark_notifications_as_read(db: Session, user_id: int):
-    """Mark all notifications for the user as read."""
-    db.query(Notification).filter(Notification.user_id == user_id).update({"is_read": True})
+def mark_notifications_as_read(db: Session, user_id: int, ids: Optional[List[int]] = None) -> int:
+    """Mark the user's notifications (all, or those in ids) as read; returns how many were unread."""
+    conditions = [Notification.user_id == user_id, Notification.is_read == False]
+    if ids is not None:
+        conditions.append(Notification.id.in_(ids))
+    updated = db.query(Notification).filter(*conditions).update({"is_read": True}, synchronize_session=False)
+    if updated:
+        add_unread(db, {user_id: -updated})
     db.commit()
+    if updated:
+        publish_unread(user_id, db.scalar(select(User.unread_notifications).where(User.id == user_id)))
+    return updated or 0
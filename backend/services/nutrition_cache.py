@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models.nutrition_model import NutritionLookup
+import os
+import re
+import threading
+
+NUTRITION_CACHE_SIZE = int(os.getenv("NUTRITION_CACHE_SIZE", "2048"))
+NUTRITION_CACHE_TTL = int(os.getenv("NUTRITION_CACHE_TTL", str(30 * 24 * 3600)))  # Seconds.
+NUTRITION_CACHE_NEGATIVE_TTL = int(os.getenv("NUTRITION_CACHE_NEGATIVE_TTL", str(24 * 3600)))  # Seconds.
+
+NUTRIENT_KEYS = ("calories", "protein", "carbs", "fats")
+
+# Returned by NutritionCache.get when nothing is cached; None means "cached as not found".
+MISSING = object()
+
+def normalize_ingredient_name(name: str) -> str:
+    """Normalize an ingredient name into a cache key (trimmed, lowercase, single spaces)."""
+    return re.sub(r"\s+", " ", name.strip().lower())
+
+class NutritionCache:
+    """Two-tier cache of per-ingredient nutrition: an in-process LRU backed by the nutrition_lookups table.
+
+    Entries expire after ttl seconds; "no data found" answers are cached as None for negative_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        max_entries: int = NUTRITION_CACHE_SIZE,
+        ttl: int = NUTRITION_CACHE_TTL,
+        negative_ttl: int = NUTRITION_CACHE_NEGATIVE_TTL
+    ):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl)
+        self.negative_ttl = timedelta(seconds=negative_ttl)
+        self._entries = OrderedDict()  # key -> (expires_at, nutrition or None)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _expiry(self, fetched_at: datetime, nutrition: Optional[Dict]) -> datetime:
+        return fetched_at + (self.ttl if nutrition is not None else self.negative_ttl)
+
+    def _remember(self, key: str, expires_at: datetime, nutrition: Optional[Dict]):
+        with self._lock:
+            self._entries[key] = (expires_at, nutrition)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, name: str):
+        """Return cached nutrition for an ingredient, None if cached as not found, or MISSING."""
+        key = normalize_ingredient_name(name)
+        now = datetime.utcnow()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+
+        row = self._load(key)
+        if row is not None:
+            nutrition = {k: getattr(row, k) for k in NUTRIENT_KEYS} if row.found else None
+            expires_at = self._expiry(row.fetched_at, nutrition)
+            if expires_at > now:
+                self._remember(key, expires_at, nutrition)
+                with self._lock:
+                    self.db_hits += 1
+                return nutrition
+
+        with self._lock:
+            self.misses += 1
+        return MISSING
+
+    def set(self, name: str, nutrition: Optional[Dict]):
+        """Cache nutrition for an ingredient; pass None to cache a "no data found" answer."""
+        key = normalize_ingredient_name(name)
+        fetched_at = datetime.utcnow()
+        self._remember(key, self._expiry(fetched_at, nutrition), nutrition)
+        self._store(key, fetched_at, nutrition)
+
+    def _load(self, key: str) -> Optional[NutritionLookup]:
+        if self.session_factory is None:
+            return None
+        db = self.session_factory()
+        try:
+            return db.query(NutritionLookup).filter(NutritionLookup.name == key).first()
+        except SQLAlchemyError as e:
+            print(f"Nutrition cache lookup failed for '{key}': {e}")
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key: str, fetched_at: datetime, nutrition: Optional[Dict]):
+        if self.session_factory is None:
+            return
+        values = nutrition or {}
+        db = self.session_factory()
+        try:
+            db.merge(NutritionLookup(
+                name=key,
+                found=nutrition is not None,
+                fetched_at=fetched_at,
+                **{k: values.get(k, 0.0) for k in NUTRIENT_KEYS}
+            ))
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"Nutrition cache store failed for '{key}': {e}")
+        finally:
+            db.close()
+
+    def clear(self):
+        """Drop the in-process tier (the table is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the overall hit ratio."""
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,247 @@
+from typing import Dict, List, Optional
+from deep_translator import GoogleTranslator
+from services.nutrition_cache import MISSING, NUTRIENT_KEYS, NutritionCache, normalize_ingredient_name
+import asyncio
+import httpx
+import json
+import os
+import threading
+
+USDA_API_URL = os.getenv("USDA_API_URL", "https://api.nal.usda.gov/fdc/v1/foods/search")
+NUTRITION_BACKEND = os.getenv("NUTRITION_BACKEND", "usda")  # "usda" or "stub".
+NUTRITION_STUB_FILE = os.getenv("NUTRITION_STUB_FILE")  # JSON {"english name": {calories, protein, carbs, fats}}.
+NUTRITION_MAX_CONCURRENCY = int(os.getenv("NUTRITION_MAX_CONCURRENCY", "8"))
+NUTRITION_TIMEOUT = float(os.getenv("NUTRITION_TIMEOUT", "10"))  # Seconds per translation or USDA call.
+
+class NutritionNotFoundError(ValueError):
+    """Raised when USDA has no data for an ingredient; this answer is cached."""
+
+class NutritionUnavailableError(Exception):
+    """Raised in strict mode when a lookup failed for a transient reason (timeout, network, config)."""
+
+class GoogleTranslateBackend:
+    """Translate ingredient names to English with one shared deep_translator client.
+
+    deep_translator is blocking, so calls run in a worker thread.
+    """
+
+    def __init__(self):
+        self._translator = GoogleTranslator(source="auto", target="en")
+
+    async def translate(self, text: str) -> str:
+        return await asyncio.to_thread(self._translator.translate, text)
+
+class StubTranslationBackend:
+    """Local translation backend for tests and offline development: a fixed lookup table."""
+
+    def __init__(self, translations: Optional[Dict[str, str]] = None):
+        self.translations = translations or {}
+
+    async def translate(self, text: str) -> str:
+        return self.translations.get(text, text)
+
+class USDABackend:
+    """Look up nutrition on USDA FoodData Central (or any server exposing the same search API)."""
+
+    def __init__(self, api_key: Optional[str] = None, url: str = USDA_API_URL):
+        self.api_key = api_key if api_key is not None else os.getenv("USDA_API_KEY")
+        self.url = url
+
+    async def lookup(self, http: httpx.AsyncClient, name: str) -> Dict:
+        if not self.api_key:
+            raise ValueError("USDA API key is missing! Please add it to the .env file")
+
+        response = await http.get(self.url, params={"query": name, "api_key": self.api_key})
+        response.raise_for_status()
+        data = response.json()
+
+        if "foods" not in data or not data["foods"]:
+            raise NutritionNotFoundError(f"No nutritional data found for {name}")
+
+        food = data["foods"][0]
+        nutrients = {nutrient["nutrientName"]: nutrient["value"] for nutrient in food["foodNutrients"]}
+        return {
+            "calories": nutrients.get("Energy", 0),
+            "protein": nutrients.get("Protein", 0),
+            "carbs": nutrients.get("Carbohydrate, by difference", 0),
+            "fats": nutrients.get("Total lipid (fat)", 0)
+        }
+
+class StubNutritionBackend:
+    """Local nutrition backend for tests and offline development: a fixed table keyed by English name."""
+
+    def __init__(self, foods: Optional[Dict[str, Dict]] = None):
+        self.foods = {normalize_ingredient_name(name): values for name, values in (foods or {}).items()}
+
+    async def lookup(self, http: httpx.AsyncClient, name: str) -> Dict:
+        values = self.foods.get(normalize_ingredient_name(name))
+        if values is None:
+            raise NutritionNotFoundError(f"No nutritional data found for {name}")
+        return values
+
+def backends_from_env():
+    """Return the (translator, nutrition backend) pair selected by NUTRITION_BACKEND."""
+    if NUTRITION_BACKEND == "stub":
+        foods = {}
+        if NUTRITION_STUB_FILE:
+            with open(NUTRITION_STUB_FILE, encoding="utf-8") as f:
+                foods = json.load(f)
+        return StubTranslationBackend(), StubNutritionBackend(foods)
+    return GoogleTranslateBackend(), USDABackend()
+
+class AsyncNutritionClient:
+    """Fetch nutrition for many ingredients concurrently.
+
+    Lookups run on the client's own event loop in a daemon thread, whichever loop awaits them
+    (request handlers, or job workers that each run a loop of their own). So one pooled httpx
+    client and one semaphore bound every lookup in the process; each translation and USDA call
+    is bounded by timeout seconds. Results go through the NutritionCache, so cached ingredients
+    are neither translated nor fetched.
+    """
+
+    def __init__(
+        self,
+        translator=None,
+        backend=None,
+        cache: Optional[NutritionCache] = None,
+        max_concurrency: int = NUTRITION_MAX_CONCURRENCY,
+        timeout: float = NUTRITION_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        if translator is None or backend is None:
+            default_translator, default_backend = backends_from_env()
+            translator = translator or default_translator
+            backend = backend or default_backend
+        self.translator = translator
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        # Created on, and only used from, the client's loop.
+        self._http = None
+        self._semaphore = None
+
+    def _client_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, args=(self._loop,), name="nutrition-client", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    async def _submit(self, coroutine):
+        loop = self._client_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coroutine
+        # Cancelling the caller cancels the lookup on the client loop as well.
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+    def _pool(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+                transport=self.transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._http, self._semaphore
+
+    async def _close_pool(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = self._semaphore = None
+
+    async def aclose(self):
+        """Close the pooled client and stop the client loop; the next lookup starts a new one."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close_pool(), loop))
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.to_thread(thread.join)
+
+    async def fetch(self, name: str, strict: bool = False) -> Optional[Dict]:
+        """Return nutrition per 100g for an ingredient, or None if it cannot be resolved.
+
+        With strict=True, transient failures raise NutritionUnavailableError instead of returning None.
+        """
+        return await self._submit(self._fetch(name, strict))
+
+    async def _fetch(self, name: str, strict: bool) -> Optional[Dict]:
+        if self.cache is not None:
+            # The cache may read the nutrition_lookups table; keep that off the event loop.
+            cached = await asyncio.to_thread(self.cache.get, name)
+            if cached is not MISSING:
+                return cached
+
+        http, semaphore = self._pool()
+        async with semaphore:
+            try:
+                translated_name = await asyncio.wait_for(self.translator.translate(name), self.timeout)
+            except Exception as e:
+                # Translation errors are transient and not cached.
+                print(f"Skipping ingredient {name}, translation failed: {e!r}")
+                if strict:
+                    raise NutritionUnavailableError(f"Translation failed for {name}: {e!r}") from e
+                return None
+            print(f"Translating '{name}' to English: '{translated_name}'")
+
+            try:
+                nutrition = await asyncio.wait_for(self.backend.lookup(http, translated_name), self.timeout)
+            except NutritionNotFoundError as e:
+                print(f"Skipping ingredient {name} due to error: {e}")
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.set, name, None)
+                return None
+            except (ValueError, asyncio.TimeoutError, httpx.HTTPError) as e:
+                # Transient failures are not cached so the next save retries them.
+                print(f"Skipping ingredient {name} due to error: {e!r}")
+                if strict:
+                    raise NutritionUnavailableError(f"Lookup failed for {name}: {e!r}") from e
+                return None
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, name, nutrition)
+        return nutrition
+
+    async def _fetch_all(self, names: List[str], strict: bool) -> List:
+        return await asyncio.gather(*(self._fetch(name, strict) for name in names), return_exceptions=True)
+
+    async def calculate(self, ingredients: List[Dict], servings: int, strict: bool = False) -> Dict:
+        """Calculate per-serving nutrition for a recipe, fetching distinct ingredients concurrently.
+
+        With strict=True, every lookup still runs (and is cached) but the first transient failure is raised.
+        """
+        print(f"Calculating nutrition for {len(ingredients)} ingredients, {servings} servings")
+        names = list(dict.fromkeys(normalize_ingredient_name(ing["name"]) for ing in ingredients))
+        fetched = await self._submit(self._fetch_all(names, strict))
+        for outcome in fetched:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        results = dict(zip(names, fetched))
+
+        total_nutrition = {key: 0 for key in NUTRIENT_KEYS}
+        for ingredient in ingredients:
+            nutrition = results[normalize_ingredient_name(ingredient["name"])]
+            if nutrition:
+                for key in NUTRIENT_KEYS:
+                    total_nutrition[key] += nutrition[key]
+
+        per_serving = {key: round(value / float(servings), 2) for key, value in total_nutrition.items()}
+        print(f"Final nutrition per serving: {per_serving}")
+        return per_serving
@@ -0,0 +1,316 @@
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from db.database import sync_engine_for
+from models.recipe_model import Ingredient
+from services.search_service import tokenize
+import threading
+import weakref
+
+# Plural/feminine endings stripped so "ביצה" and "ביצים" share a key.
+HEBREW_SUFFIXES = ("ים", "ות", "ה")
+MIN_STEM_LENGTH = 3
+
+# Ingredients most kitchens have; missing one counts as STAPLE_WEIGHT of an ingredient.
+STAPLE_INGREDIENTS = ["מלח", "מים", "פלפל שחור", "סוכר", "שמן"]
+STAPLE_WEIGHT = 0.25
+# Weights are kept as integer units so they can be summed in bit-sliced counters.
+WEIGHT_UNITS = 4
+
+def stem(token: str) -> str:
+    # Plene spelling doubles yod/vav ("עגבנייה" / "עגבניה").
+    token = token.replace("יי", "י").replace("וו", "ו")
+    for suffix in HEBREW_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+def ingredient_tokens(name: Optional[str]) -> Tuple[str, ...]:
+    """Tokens of an ingredient name with Hebrew plural endings removed."""
+    return tuple(dict.fromkeys(stem(token) for token in tokenize(name)))
+
+STAPLE_TOKENS = [set(ingredient_tokens(name)) for name in STAPLE_INGREDIENTS]
+
+# Positions of the set bits in each byte value, for turning bitsets back into ids.
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits of a non-negative int, lowest first."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for offset, value in enumerate(data):
+        if value:
+            base = offset * 8
+            for bit in _BYTE_BITS[value]:
+                yield base + bit
+
+def bits_from_ids(ids: Iterable[int], size: int) -> int:
+    data = bytearray((size + 7) // 8)
+    for recipe_id in ids:
+        data[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(data, "little")
+
+# Bit-sliced counters hold one count per recipe id: planes[i] is the bitset of ids whose count has bit i set.
+
+def add_to_counter(planes: List[int], bits: int, amount: int = 1):
+    """Add amount to the counter of every id set in bits."""
+    for shift in range(amount.bit_length()):
+        if not amount >> shift & 1:
+            continue
+        carry = bits
+        i = shift
+        while carry:
+            while len(planes) <= i:
+                planes.append(0)
+            planes[i], carry = planes[i] ^ carry, planes[i] & carry
+            i += 1
+
+def subtract_counters(minuend: List[int], subtrahend: List[int], universe: int) -> List[int]:
+    """Return minuend - subtrahend for the ids in universe (every difference must be >= 0)."""
+    planes, borrow = [], 0
+    for i in range(max(len(minuend), len(subtrahend))):
+        a = minuend[i] & universe if i < len(minuend) else 0
+        b = subtrahend[i] & universe if i < len(subtrahend) else 0
+        planes.append(a ^ b ^ borrow)
+        borrow = (~a & (b | borrow)) | (b & borrow)
+    return planes
+
+def equal_to(planes: List[int], value: int, universe: int) -> int:
+    """Return the ids in universe whose counter equals value."""
+    if value.bit_length() > len(planes):
+        return 0
+    for i, plane in enumerate(planes):
+        universe &= plane if value >> i & 1 else ~plane
+        if not universe:
+            break
+    return universe
+
+class PantryIndex:
+    """Ingredient -> recipe inverted index for pantry matching.
+
+    Each ingredient key keeps a sorted array of recipe ids; a bitset (a Python int with one bit
+    per recipe id) is materialized when the key is first queried and then updated in place.
+    Covered and total ingredient weights are bit-sliced counters, so a query costs a few big-int
+    operations per pantry ingredient and per result tier rather than a loop over recipes.
+    """
+
+    def __init__(self):
+        self.key_ids = {}  # ingredient tokens -> key id
+        self.name_keys = {}  # ingredient name as written -> key id, to skip re-tokenizing
+        self.key_names = []  # key id -> display name
+        self.key_units = []  # key id -> weight in WEIGHT_UNITS
+        self.postings = []  # key id -> array of recipe ids
+        self.token_keys = defaultdict(set)  # token -> key ids containing it
+        self.recipe_keys = {}  # recipe_id -> tuple of key ids
+        self.by_total = defaultdict(int)  # total weight units -> bitset of recipes
+        self._bitsets = {}  # key id -> bitset cache
+        self._total_planes = None  # bit-sliced total units, rebuilt from by_total when None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.recipe_keys)
+
+    def _key_id(self, name: str) -> Optional[int]:
+        if name in self.name_keys:
+            return self.name_keys[name]
+        tokens = ingredient_tokens(name)
+        key_id = self.key_ids.get(tokens) if tokens else None
+        if tokens and key_id is None:
+            key_id = len(self.key_names)
+            self.key_ids[tokens] = key_id
+            self.key_names.append(" ".join(tokenize(name)))
+            staple = any(staple <= set(tokens) for staple in STAPLE_TOKENS)
+            self.key_units.append(round((STAPLE_WEIGHT if staple else 1.0) * WEIGHT_UNITS))
+            self.postings.append(array("i"))
+            for token in tokens:
+                self.token_keys[token].add(key_id)
+        self.name_keys[name] = key_id
+        return key_id
+
+    def _recipe_key_ids(self, ingredient_names: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(sorted({key_id for key_id in map(self._key_id, ingredient_names) if key_id is not None}))
+
+    def load(self, recipes: Iterable[Tuple[int, Iterable[str]]]):
+        """Bulk-load (recipe_id, ingredient names) pairs into an empty index."""
+        totals = defaultdict(list)
+        with self._lock:
+            for recipe_id, names in sorted(recipes, key=lambda item: item[0]):
+                keys = self._recipe_key_ids(names)
+                if not keys:
+                    continue
+                for key_id in keys:
+                    self.postings[key_id].append(recipe_id)  # ids arrive in order, so arrays stay sorted
+                self.recipe_keys[recipe_id] = keys
+                totals[sum(self.key_units[key_id] for key_id in keys)].append(recipe_id)
+                self._size = recipe_id + 1
+            for total, recipe_ids in totals.items():
+                self.by_total[total] = bits_from_ids(recipe_ids, self._size)
+            self._bitsets.clear()
+            self._total_planes = None
+
+    def add(self, recipe_id: int, ingredient_names: Iterable[str]):
+        with self._lock:
+            self._remove(recipe_id)
+            keys = self._recipe_key_ids(ingredient_names)
+            if not keys:
+                return
+            for key_id in keys:
+                postings = self.postings[key_id]
+                postings.insert(bisect_left(postings, recipe_id), recipe_id)
+                if key_id in self._bitsets:
+                    self._bitsets[key_id] |= 1 << recipe_id
+            self.recipe_keys[recipe_id] = keys
+            self.by_total[sum(self.key_units[key_id] for key_id in keys)] |= 1 << recipe_id
+            self._total_planes = None
+            self._size = max(self._size, recipe_id + 1)
+
+    def remove(self, recipe_id: int):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id: int):
+        keys = self.recipe_keys.pop(recipe_id, None)
+        if keys is None:
+            return
+        for key_id in keys:
+            postings = self.postings[key_id]
+            del postings[bisect_left(postings, recipe_id)]
+            if key_id in self._bitsets:
+                self._bitsets[key_id] &= ~(1 << recipe_id)
+        self.by_total[sum(self.key_units[key_id] for key_id in keys)] &= ~(1 << recipe_id)
+        self._total_planes = None
+
+    def _bitset(self, key_id: int) -> int:
+        bits = self._bitsets.get(key_id)
+        if bits is None:
+            bits = self._bitsets[key_id] = bits_from_ids(self.postings[key_id], self._size)
+        return bits
+
+    def _totals(self) -> List[int]:
+        if self._total_planes is None:
+            planes = []
+            for total, recipes in self.by_total.items():
+                for i in range(total.bit_length()):
+                    if total >> i & 1:
+                        while len(planes) <= i:
+                            planes.append(0)
+                        planes[i] |= recipes
+            self._total_planes = planes
+        return self._total_planes
+
+    def resolve(self, pantry: Iterable[str]) -> set:
+        """Return the ingredient keys covered by pantry items; "שמן" covers "שמן זית"."""
+        covered = set()
+        for item in pantry:
+            tokens = ingredient_tokens(item)
+            if tokens:
+                covered |= set.intersection(*(self.token_keys.get(token, set()) for token in tokens))
+        return covered
+
+    def match(self, pantry: Iterable[str], max_missing: float = 2, limit: int = 20) -> List[Dict]:
+        """Rank recipes that use at least one pantry item and miss at most max_missing ingredients.
+
+        Missing ingredients are weighted (a staple counts STAPLE_WEIGHT). Results are ordered by
+        missing weight, then by the share of the recipe the pantry covers.
+        """
+        with self._lock:
+            covered = self.resolve(pantry)
+            if not covered:
+                return []
+            candidates, covered_planes = 0, []
+            for key_id in covered:
+                bits = self._bitset(key_id)
+                candidates |= bits
+                add_to_counter(covered_planes, bits, self.key_units[key_id])
+            missing_planes = subtract_counters(self._totals(), covered_planes, candidates)
+
+            # Walk the result tiers in rank order and stop once limit recipes are found.
+            ranked = []
+            for missing_units in range(int(max_missing * WEIGHT_UNITS) + 1):
+                tier = equal_to(missing_planes, missing_units, candidates)
+                if not tier:
+                    continue
+                # Within a tier a larger recipe has the higher coverage.
+                for total in sorted(self.by_total, reverse=True):
+                    group = tier & self.by_total[total]
+                    if not group:
+                        continue
+                    for recipe_id in iter_bits(group):
+                        ranked.append((recipe_id, missing_units, total))
+                        if len(ranked) == limit:
+                            break
+                    if len(ranked) == limit:
+                        break
+                if len(ranked) == limit:
+                    break
+
+            results = []
+            for recipe_id, missing_units, total in ranked:
+                missing = [key_id for key_id in self.recipe_keys[recipe_id] if key_id not in covered]
+                results.append({
+                    "recipe_id": recipe_id,
+                    "missing": [self.key_names[key_id] for key_id in missing],
+                    "missing_count": len(missing),
+                    "missing_weight": missing_units / WEIGHT_UNITS,
+                    "coverage": round(1 - missing_units / total, 4),
+                })
+            return results
+
+class RecipePantry:
+    """Pantry matching over the recipes of a database.
+
+    An in-process PantryIndex is built from the Ingredient rows on first use and updated
+    incrementally through index_recipes/remove_recipe.
+    """
+
+    def __init__(self):
+        self._indexes = weakref.WeakKeyDictionary()  # engine -> PantryIndex
+        self._lock = threading.Lock()
+
+    def _index(self, db: Session, build: bool = True) -> Optional[PantryIndex]:
+        key = sync_engine_for(db.get_bind())  # Shared by sync sessions and the async path.
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is not None or not build:
+            return index
+
+        index = PantryIndex()
+        index.load(self._ingredient_names(db).items())
+        with self._lock:
+            return self._indexes.setdefault(key, index)
+
+    @staticmethod
+    def _ingredient_names(db: Session, recipe_ids: Optional[List[int]] = None) -> Dict[int, List[str]]:
+        query = select(Ingredient.recipe_id, Ingredient.name).where(Ingredient.recipe_id.is_not(None))
+        if recipe_ids is not None:
+            query = query.where(Ingredient.recipe_id.in_(recipe_ids))
+        names = defaultdict(list)
+        for recipe_id, name in db.execute(query.execution_options(yield_per=10000)):
+            names[recipe_id].append(name)
+        return names
+
+    def index_recipes(self, db: Session, recipe_ids: Iterable[int], chunk_size: int = 500):
+        """Refresh the ingredients of recipes after they were created, edited or imported."""
+        index = self._index(db, build=False)
+        if index is None:
+            return
+        recipe_ids = list(recipe_ids)
+        for start in range(0, len(recipe_ids), chunk_size):
+            chunk = recipe_ids[start:start + chunk_size]
+            names = self._ingredient_names(db, chunk)
+            for recipe_id in chunk:
+                index.add(recipe_id, names.get(recipe_id, []))
+
+    def remove_recipe(self, db: Session, recipe_id: int):
+        index = self._index(db, build=False)
+        if index is not None:
+            index.remove(recipe_id)
+
+    def match(self, db: Session, pantry: Iterable[str], max_missing: float = 2, limit: int = 20) -> List[Dict]:
+        return self._index(db).match(pantry, max_missing=max_missing, limit=limit)
+
+# Shared pantry index for the application.
+recipe_pantry = RecipePantry()
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.ranking_model import RecipeRanking
+from models.recipe_model import Comment, Recipe
+from services.job_queue import job_queue
+from services.response_cache import LISTING_TAG, response_cache
+import math
+import os
+
+# Every recipe starts with RANKING_PRIOR_VOTES virtual votes of RANKING_PRIOR_MEAN stars, so a
+# single 5-star vote cannot outrank hundreds of 4.8s.
+RANKING_PRIOR_MEAN = float(os.getenv("RANKING_PRIOR_MEAN", "3.5"))
+RANKING_PRIOR_VOTES = float(os.getenv("RANKING_PRIOR_VOTES", "10"))
+# Comments add RANKING_COMMENT_WEIGHT stars per doubling of the comment count.
+RANKING_COMMENT_WEIGHT = float(os.getenv("RANKING_COMMENT_WEIGHT", "0.25"))
+# A recipe published this many days later ranks equal with half the quality.
+RANKING_HALF_LIFE_DAYS = float(os.getenv("RANKING_HALF_LIFE_DAYS", "30"))
+RANKING_REBUILD_INTERVAL = float(os.getenv("RANKING_REBUILD_INTERVAL", str(24 * 60 * 60)))  # Seconds.
+
+def bayesian_average(rating_sum: float, rating_count: int) -> float:
+    return (RANKING_PRIOR_VOTES * RANKING_PRIOR_MEAN + (rating_sum or 0)) / (RANKING_PRIOR_VOTES + (rating_count or 0))
+
+def ranking_score(rating_sum: float, rating_count: int, comment_count: int, published_at: datetime) -> float:
+    """Score a recipe by Bayesian rating and comment activity, decayed by age.
+
+    The score is log2(quality) + published_at / half-life, which orders recipes exactly like
+    quality * 2 ** (-age / half-life) but never changes as time passes, so stored scores only
+    need updating when the recipe's votes or comments change.
+    """
+    quality = bayesian_average(rating_sum, rating_count) + RANKING_COMMENT_WEIGHT * math.log2(1 + comment_count)
+    if published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return math.log2(quality) + published_at.timestamp() / (RANKING_HALF_LIFE_DAYS * 24 * 60 * 60)
+
+def refresh_ranking(db: Session, recipe_id: int, comment_delta: int = 0) -> Optional[RecipeRanking]:
+    """Recompute one recipe's score from its rating aggregate (not committed).
+
+    Creates the ranking of a new recipe; comment_delta records comments added since the last call.
+    """
+    aggregate = db.execute(select(Recipe.rating_sum, Recipe.rating_count).where(Recipe.id == recipe_id)).first()
+    if aggregate is None:
+        return None
+    if comment_delta:
+        db.execute(
+            update(RecipeRanking)
+            .where(RecipeRanking.recipe_id == recipe_id)
+            .values(comment_count=RecipeRanking.comment_count + comment_delta)
+            .execution_options(synchronize_session=False)
+        )
+    ranking = db.get(RecipeRanking, recipe_id, populate_existing=True)
+    if ranking is None:
+        comments = db.execute(select(func.count(Comment.id)).where(Comment.recipe_id == recipe_id)).scalar()
+        ranking = RecipeRanking(recipe_id=recipe_id, comment_count=comments, published_at=datetime.now(timezone.utc))
+        db.add(ranking)
+    ranking.score = ranking_score(aggregate.rating_sum, aggregate.rating_count, ranking.comment_count, ranking.published_at)
+    db.flush()
+    return ranking
+
+def add_rankings(db: Session, rows: Iterable[Tuple[int, int, int]], published_at: Optional[datetime] = None):
+    """Insert rankings for recipes that have none; rows are (recipe_id, rating_sum, rating_count)."""
+    published_at = published_at or datetime.now(timezone.utc)
+    rows = list(rows)
+    if not rows:
+        return
+    comments = dict(db.execute(
+        select(Comment.recipe_id, func.count(Comment.id))
+        .where(Comment.recipe_id.in_([recipe_id for recipe_id, _, _ in rows]))
+        .group_by(Comment.recipe_id)
+    ).all())
+    db.execute(insert(RecipeRanking), [
+        {
+            "recipe_id": recipe_id,
+            "score": ranking_score(rating_sum, rating_count, comments.get(recipe_id, 0), published_at),
+            "comment_count": comments.get(recipe_id, 0),
+            "published_at": published_at,
+        }
+        for recipe_id, rating_sum, rating_count in rows
+    ])
+
+def backfill_rankings(db: Session, chunk_size: int = 1000) -> int:
+    """Rank recipes created before the leaderboard existed; safe to run repeatedly."""
+    unranked = (
+        select(Recipe.id, Recipe.rating_sum, Recipe.rating_count)
+        .where(~select(RecipeRanking.recipe_id).where(RecipeRanking.recipe_id == Recipe.id).exists())
+        .order_by(Recipe.id)
+        .limit(chunk_size)
+    )
+    backfilled = 0
+    while True:
+        chunk = db.execute(unranked).all()
+        if not chunk:
+            break
+        add_rankings(db, chunk)
+        db.commit()
+        backfilled += len(chunk)
+    if backfilled:
+        print(f"Backfilled rankings for {backfilled} recipes")
+    return backfilled
+
+def rebuild_rankings(db: Session, chunk_size: int = 1000) -> int:
+    """Recompute every score and comment count from the source rows (repairs drift)."""
+    last_id, rebuilt = 0, 0
+    while True:
+        chunk = db.execute(
+            select(RecipeRanking.recipe_id, RecipeRanking.published_at, Recipe.rating_sum, Recipe.rating_count)
+            .join(Recipe, Recipe.id == RecipeRanking.recipe_id)
+            .where(RecipeRanking.recipe_id > last_id)
+            .order_by(RecipeRanking.recipe_id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            break
+        comments = dict(db.execute(
+            select(Comment.recipe_id, func.count(Comment.id))
+            .where(Comment.recipe_id.in_([row.recipe_id for row in chunk]))
+            .group_by(Comment.recipe_id)
+        ).all())
+        db.execute(update(RecipeRanking), [
+            {
+                "recipe_id": row.recipe_id,
+                "comment_count": comments.get(row.recipe_id, 0),
+                "score": ranking_score(row.rating_sum, row.rating_count, comments.get(row.recipe_id, 0), row.published_at),
+            }
+            for row in chunk
+        ])
+        db.commit()
+        rebuilt += len(chunk)
+        last_id = chunk[-1].recipe_id
+    return rebuilt
+
+def rebuild_rankings_job(bind: Engine) -> int:
+    """Background job: recompute the leaderboard."""
+    db = Session(bind=bind)
+    try:
+        rebuilt = rebuild_rankings(db)
+    finally:
+        db.close()
+    # Scores decay over time, so the score-sorted listings change even without writes.
+    response_cache.invalidate(LISTING_TAG)
+    print(f"Rebuilt rankings of {rebuilt} recipes")
+    return rebuilt
+
+def schedule_ranking_rebuild(bind: Engine, interval: float = RANKING_REBUILD_INTERVAL):
+    job_queue.every("rankings:rebuild", interval, rebuild_rankings_job, bind)
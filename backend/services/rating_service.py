@@ -0,0 +1,128 @@
+from typing import Dict
+from sqlalchemy import Float, cast, delete, func, inspect, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.recipe_model import Rating, Recipe
+from services.job_queue import job_queue
+from services.ranking_service import refresh_ranking
+from services.recipe_version import ensure_recipe_version_schema, version_bump
+from services.response_cache import response_cache
+import os
+
+RATING_RECONCILE_INTERVAL = float(os.getenv("RATING_RECONCILE_INTERVAL", str(24 * 60 * 60)))  # Seconds.
+
+# Dialect inserts that support ON CONFLICT DO NOTHING.
+UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+def _average(total, votes):
+    return func.coalesce(cast(total, Float) / cast(func.nullif(votes, 0), Float), 0.0)
+
+def _insert_vote(db: Session, recipe_id: int, user_id: int, score: int) -> bool:
+    """Insert a first vote; returns False if the user's vote already exists."""
+    insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    statement = (
+        insert(Rating)
+        .values(recipe_id=recipe_id, user_id=user_id, score=score)
+        .on_conflict_do_nothing(index_elements=["recipe_id", "user_id"])
+        .returning(Rating.id)
+    )
+    return db.execute(statement).first() is not None
+
+def apply_rating(db: Session, recipe_id: int, user_id: int, score: int) -> Dict:
+    """Record a user's vote and update the recipe's running sum/count and ranking in one transaction.
+
+    A new vote adds (score, 1) to the recipe's aggregate; a changed vote adds (score - previous, 0).
+    Neither reads the other votes, so a vote costs the same however many the recipe has.
+    """
+    for _ in range(2):
+        previous = db.execute(
+            select(Rating.score)
+            .where(Rating.recipe_id == recipe_id, Rating.user_id == user_id)
+            .with_for_update()
+        ).scalar_one_or_none()
+        if previous is not None:
+            db.execute(update(Rating).where(Rating.recipe_id == recipe_id, Rating.user_id == user_id).values(score=score))
+            delta_sum, delta_count = score - previous, 0
+            break
+        if _insert_vote(db, recipe_id, user_id, score):
+            delta_sum, delta_count = score, 1
+            break
+        # A concurrent first vote by the same user was inserted; apply this one as a change.
+    else:
+        raise RuntimeError(f"Could not record rating of user {user_id} for recipe {recipe_id}")
+
+    # The right-hand sides read the values from before this update.
+    rating_sum = Recipe.rating_sum + delta_sum
+    rating_count = func.coalesce(Recipe.rating_count, 0) + delta_count
+    rating, count = db.execute(
+        update(Recipe)
+        .where(Recipe.id == recipe_id)
+        .values(rating_sum=rating_sum, rating_count=rating_count, rating=_average(rating_sum, rating_count), **version_bump())
+        .returning(Recipe.rating, Recipe.rating_count)
+        .execution_options(synchronize_session=False)
+    ).one()
+    refresh_ranking(db, recipe_id)
+    db.commit()
+    return {"rating": float(rating), "rating_count": count}
+
+def reconcile_ratings(db: Session) -> int:
+    """Recompute the rating aggregates of recipes that drifted from their Rating rows; returns how many."""
+    votes = select(func.count(Rating.id)).where(Rating.recipe_id == Recipe.id).scalar_subquery()
+    total = select(func.coalesce(func.sum(Rating.score), 0)).where(Rating.recipe_id == Recipe.id).scalar_subquery()
+    average = _average(total, votes)
+    result = db.execute(
+        update(Recipe)
+        .where(or_(
+            func.coalesce(Recipe.rating_count, -1) != votes,
+            Recipe.rating_sum != total,
+            func.coalesce(Recipe.rating, -1.0) != average,
+        ))
+        .values(rating_count=votes, rating_sum=total, rating=average, **version_bump())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def reconcile_ratings_job(bind: Engine) -> int:
+    """Background job: repair rating aggregates."""
+    db = Session(bind=bind)
+    try:
+        repaired = reconcile_ratings(db)
+    finally:
+        db.close()
+    if repaired:
+        # Repaired ratings appear in listings and recipe pages alike.
+        response_cache.clear()
+    print(f"Rating reconciliation repaired {repaired} recipes")
+    return repaired
+
+def schedule_rating_reconciliation(bind: Engine, interval: float = RATING_RECONCILE_INTERVAL):
+    job_queue.every("ratings:reconcile", interval, reconcile_ratings_job, bind)
+
+def ensure_rating_schema(bind: Engine):
+    """Bring databases created before the running aggregate up to date; safe to run repeatedly.
+
+    Adds recipes.rating_sum, keeps only the latest vote per user and recipe so the unique index
+    can be created, then fills the aggregates from the Rating rows (which bumps recipe versions,
+    so those columns are ensured first).
+    """
+    ensure_recipe_version_schema(bind)
+    inspector = inspect(bind)
+    changed = False
+    with bind.begin() as connection:
+        if "rating_sum" not in {column["name"] for column in inspector.get_columns("recipes")}:
+            connection.execute(text("ALTER TABLE recipes ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0"))
+            changed = True
+        if "uq_ratings_recipe_user" not in {index["name"] for index in inspector.get_indexes("ratings")}:
+            latest = select(func.max(Rating.id)).group_by(Rating.recipe_id, Rating.user_id)
+            connection.execute(delete(Rating).where(Rating.id.not_in(latest)))
+            next(index for index in Rating.__table__.indexes if index.name == "uq_ratings_recipe_user").create(connection)
+            changed = True
+    if changed:
+        db = Session(bind=bind)
+        try:
+            print(f"Rating schema upgraded, {reconcile_ratings(db)} recipe aggregates recomputed")
+        finally:
+            db.close()
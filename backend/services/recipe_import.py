@@ -0,0 +1,236 @@
+import sys
+import os
+
+# Add the root directory to the system path for proper imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models.recipe_model import Recipe, Ingredient, NutritionalInfo, CookingTimer
+from services.pantry_service import recipe_pantry
+from services.ranking_service import add_rankings
+from services.response_cache import response_cache
+from services.search_service import recipe_search
+from services.tag_service import add_recipe_tags
+import argparse
+import csv
+import io
+import json
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+# Recipe columns accepted in an import row, with the default used when a row omits them.
+RECIPE_DEFAULTS = {
+    "preparation_steps": "",
+    "cooking_time": 0,
+    "servings": 1,
+    "categories": "",
+    "tags": None,
+    "image_url": "/static/default-recipe.jpg",
+}
+
+class ImportReport:
+    """Outcome of a bulk import: the ids inserted and the rows that were rejected."""
+
+    def __init__(self):
+        self.recipe_ids: List[int] = []
+        self.errors: List[Dict] = []
+
+    def add_error(self, line: int, error: str):
+        self.errors.append({"line": line, "error": error})
+
+    def to_dict(self) -> Dict:
+        return {"imported": len(self.recipe_ids), "failed": len(self.errors), "errors": self.errors}
+
+def iter_jsonl(stream: IO[str]) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, parsed object) for each non-blank line of a JSONL stream."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+def iter_csv(stream: IO[str]) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, row) for a CSV stream; ingredients, timers and nutrition columns hold JSON."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        line_number = reader.line_num
+        try:
+            for column in ("ingredients", "timers", "nutrition"):
+                if row.get(column):
+                    row[column] = json.loads(row[column])
+                else:
+                    row.pop(column, None)
+            yield line_number, {key: value for key, value in row.items() if value != ""}
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"Invalid JSON in column: {e}")
+
+def iter_import_file(stream: IO[str], filename: str) -> Iterator[Tuple[int, object]]:
+    """Pick the parser from the file extension (.csv, otherwise JSONL)."""
+    if filename.lower().endswith(".csv"):
+        return iter_csv(stream)
+    return iter_jsonl(stream)
+
+def validate_row(row: object, creator_id: Optional[int]) -> Dict:
+    """Normalize one import row, raising ValueError describing the first problem found."""
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("Recipe name must not be empty")
+
+    recipe = {"name": name, "creator_id": row.get("creator_id", creator_id)}
+    for field, default in RECIPE_DEFAULTS.items():
+        recipe[field] = row.get(field, default)
+    if row.get("image_filename") and "image_url" not in row:
+        recipe["image_url"] = f"/static/{row['image_filename']}"
+    try:
+        recipe["cooking_time"] = int(recipe["cooking_time"])
+        recipe["servings"] = int(recipe["servings"])
+        if recipe["creator_id"] is not None:
+            recipe["creator_id"] = int(recipe["creator_id"])
+    except (TypeError, ValueError):
+        raise ValueError("cooking_time, servings and creator_id must be integers")
+    if recipe["servings"] < 1:
+        raise ValueError("servings must be positive")
+
+    ingredients = []
+    for ingredient in row.get("ingredients") or []:
+        try:
+            quantity = float(ingredient["quantity"])
+            ingredients.append({"name": ingredient["name"], "quantity": quantity, "unit": ingredient.get("unit", "")})
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid ingredient: {ingredient}")
+        if quantity <= 0 or not ingredient["name"]:
+            raise ValueError(f"Invalid ingredient: {ingredient}")
+
+    timers = []
+    for timer in row.get("timers") or []:
+        try:
+            step_number = int(timer["step_number"])
+            timers.append({
+                "step_number": step_number,
+                "duration": int(timer["duration"]),
+                "label": timer.get("label", f"Step {step_number}")
+            })
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid timer: {timer}")
+
+    nutrition = row.get("nutrition")
+    if nutrition is not None:
+        try:
+            nutrition = {key: float(nutrition[key]) for key in ("calories", "protein", "carbs", "fats")}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid nutrition: {nutrition}")
+
+    return {"recipe": recipe, "ingredients": ingredients, "timers": timers, "nutrition": nutrition}
+
+def _insert_batch(db: Session, batch: List[Dict]) -> List[int]:
+    # One multi-row INSERT ... RETURNING for the recipes, then one executemany per child table
+    # (tags and rankings included).
+    recipe_ids = db.execute(
+        insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True),
+        [item["recipe"] for item in batch]
+    ).scalars().all()
+
+    ingredients, timers, nutrition = [], [], []
+    for recipe_id, item in zip(recipe_ids, batch):
+        ingredients.extend({**ingredient, "recipe_id": recipe_id} for ingredient in item["ingredients"])
+        timers.extend({**timer, "recipe_id": recipe_id} for timer in item["timers"])
+        if item["nutrition"]:
+            nutrition.append({**item["nutrition"], "recipe_id": recipe_id})
+    if ingredients:
+        db.execute(insert(Ingredient), ingredients)
+    if timers:
+        db.execute(insert(CookingTimer), timers)
+    if nutrition:
+        db.execute(insert(NutritionalInfo), nutrition)
+    add_recipe_tags(db, [
+        (recipe_id, item["recipe"]["categories"], item["recipe"]["tags"])
+        for recipe_id, item in zip(recipe_ids, batch)
+    ])
+    add_rankings(db, [(recipe_id, 0, 0) for recipe_id in recipe_ids])
+    return list(recipe_ids)
+
+def _flush_batch(db: Session, batch: List[Tuple[int, Dict]], report: ImportReport):
+    try:
+        report.recipe_ids.extend(_insert_batch(db, [item for _, item in batch]))
+        db.commit()
+        return
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Batch insert failed, retrying row by row: {e}")
+
+    # Isolate the rows the database rejected; the rest of the batch is still imported.
+    for line_number, item in batch:
+        try:
+            with db.begin_nested():
+                report.recipe_ids.extend(_insert_batch(db, [item]))
+        except SQLAlchemyError as e:
+            report.add_error(line_number, str(e.orig if hasattr(e, "orig") else e))
+    db.commit()
+
+def import_recipes(db: Session, rows: Iterable[Tuple[int, object]], creator_id: Optional[int] = None, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Bulk insert recipes with their ingredients, timers and nutrition in batched transactions.
+
+    rows yields (line number, row) pairs, e.g. from iter_jsonl/iter_csv. Invalid rows are reported
+    and skipped; each batch is committed on its own so one bad row never aborts the import.
+    Rows without a nutrition object are imported without NutritionalInfo. Imported recipes
+    are added to the search and pantry indexes, and cached listings are invalidated.
+    """
+    report = ImportReport()
+    batch = []
+    for line_number, row in rows:
+        try:
+            batch.append((line_number, validate_row(row, creator_id)))
+        except ValueError as e:
+            report.add_error(line_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _flush_batch(db, batch, report)
+            batch = []
+    if batch:
+        _flush_batch(db, batch, report)
+    recipe_search.index_recipes(db, report.recipe_ids)
+    recipe_pantry.index_recipes(db, report.recipe_ids)
+    if report.recipe_ids:
+        response_cache.invalidate_recipe()
+    print(f"Imported {len(report.recipe_ids)} recipes, {len(report.errors)} rows rejected")
+    return report
+
+def import_recipe_file(db: Session, binary_stream: IO[bytes], filename: str, creator_id: Optional[int] = None, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Stream a JSONL or CSV file (opened in binary mode) into import_recipes."""
+    stream = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    try:
+        return import_recipes(db, iter_import_file(stream, filename), creator_id, batch_size)
+    finally:
+        stream.detach()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import recipes from a JSONL or CSV file.")
+    parser.add_argument("path", help="Path to a .jsonl or .csv file")
+    parser.add_argument("--creator-id", type=int, default=None, help="User id recorded as the creator of rows without one")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from db.database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            report = import_recipe_file(db, f, args.path, args.creator_id, args.batch_size)
+    finally:
+        db.close()
+    for error in report.errors:
+        print(f"Line {error['line']}: {error['error']}")
+    return 1 if report.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
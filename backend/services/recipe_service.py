@@ -1,12 +1,18 @@
-from services.ai_service import calculate_nutritional_info
-from sqlalchemy.orm import Session
+from services.ai_service import calculate_nutritional_info, calculate_nutritional_info_async
+from services.job_queue import Job, current_job, job_queue
+from services.image_service import image_srcset
+from services.recipe_version import bump_recipe_version
+from services.response_cache import response_cache
+from services.tag_service import label_filters
+from sqlalchemy import and_, func, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, contains_eager, joinedload, load_only, selectinload
 from models.recipe_model import CookingTimer, Recipe, NutritionalInfo, Ingredient
+from models.ranking_model import RecipeRanking
 from models.user_model import UserProfile
-from typing import List, Optional
-import redis
-
-# Connect to Redis for timers
-redis_client = redis.Redis(host='redis', port=6379, db=0)
+from typing import List, Optional, Tuple
+import base64
+import json
 
 def create_recipe(db: Session, recipe_data: dict):
     """Create a new recipe, including its ingredients and nutrition."""
@@ -62,14 +68,209 @@ def create_recipe(db: Session, recipe_data: dict):
 
     return recipe
 
-def filter_recipes(db: Session, category: Optional[str] = None, tag: Optional[str] = None) -> List[Recipe]:
+def save_recipe_nutrition(db: Session, recipe_id: int, nutrition_data: dict) -> Optional[NutritionalInfo]:
+    """Create or update the NutritionalInfo row of a recipe; returns None if the recipe is gone."""
+    if not db.query(Recipe.id).filter(Recipe.id == recipe_id).first():
+        return None
+    nutrition = db.query(NutritionalInfo).filter(NutritionalInfo.recipe_id == recipe_id).first()
+    if nutrition is None:
+        nutrition = NutritionalInfo(recipe_id=recipe_id)
+        db.add(nutrition)
+    nutrition.calories = nutrition_data["calories"]
+    nutrition.protein = nutrition_data["protein"]
+    nutrition.carbs = nutrition_data["carbs"]
+    nutrition.fats = nutrition_data["fats"]
+    bump_recipe_version(db, recipe_id)
+    db.commit()
+    return nutrition
+
+async def compute_recipe_nutrition(bind: Engine, recipe_id: int, ingredients: List[dict], servings: int) -> dict:
+    """Background job: calculate a recipe's nutrition and store it.
+
+    Transient lookup failures raise so the job queue retries; a job superseded by a newer
+    edit of the same recipe does not write its (stale) result.
+    """
+    nutrition_data = await calculate_nutritional_info_async(ingredients, servings, strict=True)
+    job = current_job()
+    if job is not None and job.superseded:
+        return nutrition_data
+    db = Session(bind=bind)
+    try:
+        save_recipe_nutrition(db, recipe_id, nutrition_data)
+    finally:
+        db.close()
+    response_cache.invalidate_recipe(recipe_id)
+    print(f"Nutritional info updated successfully for recipe {recipe_id}")
+    return nutrition_data
+
+def enqueue_nutrition_job(bind: Engine, recipe_id: int, ingredients: List[dict], servings: int) -> Job:
+    """Queue nutrition calculation for a recipe, superseding any pending job for the same recipe."""
+    key = f"nutrition:{recipe_id}"
+    return job_queue.enqueue(key, compute_recipe_nutrition, bind, recipe_id, ingredients, servings, key=key)
+
+def filter_recipes(db: Session, category: Optional[str] = None, tag: Optional[str] = None, skip: int = 0, limit: Optional[int] = None) -> List[Recipe]:
     query = db.query(Recipe)
-    if category:
-        query = query.filter(Recipe.categories == category)
-    if tag:
-        query = query.filter(Recipe.tags.like(f"%{tag}%"))
+    for clause in label_filters(Recipe.id, category, tag):
+        query = query.filter(clause)
+    if skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
     return query.all()
 
+# Listing fields backed by a column on Recipe; only the requested ones are selected.
+LISTING_COLUMNS = {
+    "id": Recipe.id,
+    "name": Recipe.name,
+    "preparation_steps": Recipe.preparation_steps,
+    "cooking_time": Recipe.cooking_time,
+    "categories": Recipe.categories,
+    "rating": Recipe.rating,
+    "tags": Recipe.tags,
+    "creator_id": Recipe.creator_id,
+    "image_url": Recipe.image_url,
+    "images": Recipe.image_variants,
+}
+
+# Listing fields backed by a relationship, with the loader used to fetch them in bulk.
+LISTING_RELATIONS = {
+    "ingredients": selectinload(Recipe.ingredients),
+    "nutritional_info": joinedload(Recipe.nutritional_info),
+    "timers": selectinload(Recipe.cooking_timers),
+}
+
+LISTING_FIELDS = ["id", "name", "ingredients", "preparation_steps", "cooking_time", "categories", "rating", "tags", "creator_id", "image_url", "images", "nutritional_info", "timers"]
+
+# Card-sized shape for listing pages; never touches the preparation text.
+SUMMARY_FIELDS = ["id", "name", "image_url", "images", "rating"]
+
+def parse_listing_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated fields= value, raising ValueError for unknown names."""
+    if not fields:
+        return list(LISTING_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LISTING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def encode_cursor(recipe: Recipe, sort_by: str = "rating") -> str:
+    """Encode the (rating or score, id) keyset position of a recipe as an opaque cursor."""
+    if sort_by == "score":
+        position = {"score": recipe.ranking.score, "id": recipe.id}
+    else:
+        position = {"rating": recipe.rating or 0.0, "id": recipe.id}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_cursor(cursor: str, sort_by: str = "rating") -> Tuple[float, int]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key = "score" if sort_by == "score" else "rating"
+        return float(position[key]), int(position["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_recipe_listing(
+    db: Session,
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    sort_by: str = "rating",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    ids: Optional[List[int]] = None
+) -> List[Recipe]:
+    """Load recipes for the listing with the requested relationships eagerly loaded.
+
+    Nutrition is joined onto the main query and each collection is fetched with one
+    SELECT ... IN, so the listing costs at most three statements however many recipes match.
+    Pages are keyed on (rating, id) so deep pages cost the same as the first one; sort_by="score"
+    reads the precomputed leaderboard through its (score, recipe_id) index instead.
+    category/tag match whole normalized labels (comma-separated labels must all match).
+    """
+    fields = fields or LISTING_FIELDS
+    # The keyset columns are always loaded so the next cursor can be built.
+    columns = {LISTING_COLUMNS[field] for field in fields if field in LISTING_COLUMNS}
+    columns.update({Recipe.id, Recipe.rating})
+
+    query = db.query(Recipe).options(load_only(*columns))
+    for field in fields:
+        if field in LISTING_RELATIONS:
+            query = query.options(LISTING_RELATIONS[field])
+    if ids is not None:
+        query = query.filter(Recipe.id.in_(ids))
+    for clause in label_filters(Recipe.id, category, tag):
+        query = query.filter(clause)
+
+    if sort_by == "score":
+        query = query.join(Recipe.ranking).options(contains_eager(Recipe.ranking))
+        if cursor:
+            last_score, last_id = decode_cursor(cursor, sort_by)
+            query = query.filter(or_(
+                RecipeRanking.score < last_score,
+                and_(RecipeRanking.score == last_score, RecipeRanking.recipe_id < last_id)
+            ))
+        query = query.order_by(RecipeRanking.score.desc(), RecipeRanking.recipe_id.desc())
+    elif sort_by == "rating":
+        rating = func.coalesce(Recipe.rating, 0.0)
+        if cursor:
+            last_rating, last_id = decode_cursor(cursor)
+            query = query.filter(or_(rating < last_rating, and_(rating == last_rating, Recipe.id < last_id)))
+        query = query.order_by(rating.desc(), Recipe.id.desc())
+    else:
+        if cursor:
+            _, last_id = decode_cursor(cursor)
+            query = query.filter(Recipe.id > last_id)
+        query = query.order_by(Recipe.id)
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def _serialize_nutrition(recipe: Recipe) -> Optional[dict]:
+    nutrition = recipe.nutritional_info
+    if not nutrition:
+        return None
+    return {
+        "calories": nutrition.calories,
+        "protein": nutrition.protein,
+        "carbs": nutrition.carbs,
+        "fats": nutrition.fats,
+    }
+
+LISTING_SERIALIZERS = {
+    "ingredients": lambda recipe: [
+        {
+            "id": ing.id,
+            "name": ing.name,
+            "quantity": ing.quantity,
+            "unit": ing.unit
+        }
+        for ing in recipe.ingredients
+    ],
+    "nutritional_info": _serialize_nutrition,
+    "images": lambda recipe: image_srcset(recipe.image_variants),
+    "timers": lambda recipe: [
+        {
+            "step_number": timer.step_number,
+            "duration": timer.duration,
+            "label": timer.label
+        }
+        for timer in recipe.cooking_timers
+    ],
+}
+
+def serialize_recipe_listing(recipe: Recipe, fields: Optional[List[str]] = None) -> dict:
+    """Build the listing payload for a recipe loaded by get_recipe_listing with the same fields."""
+    payload = {}
+    for field in fields or LISTING_FIELDS:
+        if field in LISTING_SERIALIZERS:
+            payload[field] = LISTING_SERIALIZERS[field](recipe)
+        else:
+            payload[field] = getattr(recipe, field)
+    return payload
+
 def create_user(db: Session, user_data):
     user = UserProfile(**user_data.dict())
     db.add(user)
@@ -77,12 +278,3 @@ def create_user(db: Session, user_data):
     db.refresh(user)
     return user
 
-def start_timer(timer_id: str, duration: int):
-    redis_client.set(timer_id, duration)
-    redis_client.expire(timer_id, duration)
-
-def get_timer(timer_id: str):
-    time_left = redis_client.get(timer_id)
-    if time_left:
-        return {"time_left": time_left.decode("utf-8")}
-    return {"message": "Timer not found"}
@@ -0,0 +1,46 @@
+from typing import Dict, Optional
+from sqlalchemy import func, inspect, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.recipe_model import Recipe
+from services.response_cache import validator_headers
+
+def version_bump() -> Dict:
+    """UPDATE values marking a recipe as changed, e.g. update(Recipe).values(**version_bump())."""
+    return {"version": Recipe.version + 1, "updated_at": func.now()}
+
+def bump_recipe_version(db: Session, recipe_id: int):
+    """Invalidate the ETag of a recipe whose ingredients, timers or nutrition changed (not committed)."""
+    db.execute(
+        update(Recipe)
+        .where(Recipe.id == recipe_id)
+        .values(**version_bump())
+        .execution_options(synchronize_session=False)
+    )
+
+def recipe_validators(db: Session, recipe_id: int, variant: str = "") -> Optional[Dict[str, str]]:
+    """ETag/Last-Modified headers of a recipe's current version, or None if it does not exist.
+
+    Only the version columns are read, so a 304 costs one indexed lookup. variant tells apart
+    representations derived from the recipe, e.g. "scale-4".
+    """
+    row = db.query(Recipe.version, Recipe.updated_at).filter(Recipe.id == recipe_id).first()
+    if row is None:
+        return None
+    version, updated_at = row
+    suffix = f"-{variant}" if variant else ""
+    return validator_headers(f'"recipe-{recipe_id}-v{version}{suffix}"', updated_at)
+
+def ensure_recipe_version_schema(bind: Engine):
+    """Add recipes.version and recipes.updated_at to databases created before them; safe to run repeatedly."""
+    columns = {column["name"] for column in inspect(bind).get_columns("recipes")}
+    with bind.begin() as connection:
+        if "version" not in columns:
+            connection.execute(text("ALTER TABLE recipes ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+        if "updated_at" not in columns:
+            column_type = Recipe.__table__.c.updated_at.type.compile(dialect=bind.dialect)
+            connection.execute(text(f"ALTER TABLE recipes ADD COLUMN updated_at {column_type}"))
+            connection.execute(update(Recipe).where(Recipe.updated_at.is_(None)).values(updated_at=func.now()))
+            if bind.dialect.name == "postgresql":
+                connection.execute(text("ALTER TABLE recipes ALTER COLUMN updated_at SET DEFAULT now(), ALTER COLUMN updated_at SET NOT NULL"))
+            print("Recipe version columns added")
@@ -0,0 +1,272 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from urllib.parse import urlencode
+import hashlib
+import json
+import os
+import threading
+import time
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))  # Seconds.
+RESPONSE_CACHE_REDIS = os.getenv("RESPONSE_CACHE_REDIS", "0") == "1"  # Share entries and invalidations through Redis.
+# Responses built this soon after one of their tags was invalidated are served but not cached:
+# with a read replica, they may have been read before the replica caught up with the write.
+RESPONSE_CACHE_SETTLE = float(os.getenv(
+    "RESPONSE_CACHE_SETTLE", os.getenv("REPLICA_READ_AFTER_WRITE", "2") if os.getenv("DATABASE_READ_URL") else "0"
+))
+
+# Every entry depends on ALL_TAG, so bumping it invalidates the whole cache.
+ALL_TAG = "*"
+# Tag of every recipe listing; any recipe change can alter listing membership or order.
+LISTING_TAG = "recipes"
+
+def recipe_tag(recipe_id: int) -> str:
+    return f"recipe:{recipe_id}"
+
+class CachedResponse:
+    """A serialized JSON response body with its ETag and extra headers."""
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]] = None, etag: Optional[str] = None):
+        self.body = body
+        self.headers = headers or {}
+        self.etag = etag or '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def to_json(self) -> str:
+        return json.dumps({"body": self.body.decode("utf-8"), "headers": self.headers, "etag": self.etag})
+
+    @classmethod
+    def from_json(cls, data) -> "CachedResponse":
+        data = json.loads(data)
+        return cls(data["body"].encode("utf-8"), data["headers"], data["etag"])
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Apply If-None-Match's weak comparison: any listed tag (or *) matching etag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in (candidate.removeprefix("W/") for candidate in candidates)
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """ETag (and Last-Modified) headers of a response clients must revalidate before reuse."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent, against the validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, headers["ETag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or "Last-Modified" not in headers:
+        return False
+    try:
+        return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+def render_json(payload) -> bytes:
+    # Same encoding as FastAPI's JSONResponse.
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class ResponseCache:
+    """Cache of rendered JSON responses: an in-process TTL/LRU with an optional shared Redis tier.
+
+    Entries are stamped with the versions of the tags they depend on (e.g. "recipe:7"), read
+    before the response is built. Invalidating a tag bumps its version, so a stale entry is
+    never served again however many keys depend on the tag. With Redis, versions and entries
+    are shared by every worker process.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+        redis_client=None,
+        namespace: str = "response-cache",
+        settle: float = RESPONSE_CACHE_SETTLE
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis_client
+        self.namespace = namespace
+        self.settle = settle
+        self._entries = OrderedDict()  # key -> (expires_at, versions, CachedResponse)
+        self._versions = {}  # tag -> version, when there is no Redis tier
+        self._invalidated = {}  # tag -> when this process last invalidated it (epoch seconds)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        """Cache key of a request: its path plus sorted query parameters."""
+        return request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+
+    def _tag_versions(self, tags: List[str]) -> Optional[Tuple[int, ...]]:
+        if self.redis is None:
+            with self._lock:
+                return tuple(self._versions.get(tag, 0) for tag in tags)
+        try:
+            versions = self.redis.hmget(f"{self.namespace}:versions", tags)
+        except Exception as e:
+            # Without the shared versions, nothing cached can be trusted.
+            print(f"Response cache unavailable, bypassing: {e!r}")
+            return None
+        return tuple(int(version or 0) for version in versions)
+
+    def _remember(self, key: str, versions: Tuple[int, ...], entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, versions, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fetch(self, key: str, tags: Iterable[str], build: Callable[[], Tuple[object, Dict[str, str]]]) -> CachedResponse:
+        """Return the cached response for key, or build(), render and cache it.
+
+        build returns (payload, extra headers). Exceptions from build propagate and nothing is cached.
+        """
+        tags = [ALL_TAG, *tags]
+        versions = self._tag_versions(tags)
+        if versions is not None:
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached and cached[0] > time.monotonic() and cached[1] == versions:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return cached[2]
+
+            if self.redis is not None:
+                entry = self._redis_get(key, versions)
+                if entry is not None:
+                    self._remember(key, versions, entry)
+                    with self._lock:
+                        self.redis_hits += 1
+                    return entry
+
+        with self._lock:
+            self.misses += 1
+        payload, headers = build()
+        entry = CachedResponse(render_json(payload), headers)
+        if versions is not None and self._settled(tags):
+            self._remember(key, versions, entry)
+            if self.redis is not None:
+                self._redis_set(key, versions, entry)
+        return entry
+
+    def _settled(self, tags: List[str]) -> bool:
+        """Whether none of tags was invalidated within the last settle seconds."""
+        if self.settle <= 0:
+            return True
+        cutoff = time.time() - self.settle
+        with self._lock:
+            if any(self._invalidated.get(tag, 0) > cutoff for tag in tags):
+                return False
+        if self.redis is None:
+            return True
+        try:
+            invalidated = self.redis.hmget(f"{self.namespace}:invalidated", tags)
+        except Exception as e:
+            print(f"Response cache read failed: {e!r}")
+            return False
+        return all(float(at or 0) <= cutoff for at in invalidated)
+
+    def _redis_get(self, key: str, versions: Tuple[int, ...]) -> Optional[CachedResponse]:
+        try:
+            data = self.redis.get(f"{self.namespace}:{key}")
+        except Exception as e:
+            print(f"Response cache read failed: {e!r}")
+            return None
+        if data is None:
+            return None
+        stored = json.loads(data)
+        if tuple(stored["versions"]) != versions:
+            return None
+        return CachedResponse.from_json(stored["entry"])
+
+    def _redis_set(self, key: str, versions: Tuple[int, ...], entry: CachedResponse):
+        try:
+            data = json.dumps({"versions": list(versions), "entry": entry.to_json()})
+            self.redis.set(f"{self.namespace}:{key}", data, ex=max(int(self.ttl), 1))
+        except Exception as e:
+            print(f"Response cache write failed: {e!r}")
+
+    def invalidate(self, *tags: str):
+        """Make every entry depending on any of tags stale."""
+        now = time.time()
+        with self._lock:
+            self.invalidations += 1
+            self._invalidated.update((tag, now) for tag in tags)
+            if self.redis is None:
+                for tag in tags:
+                    self._versions[tag] = self._versions.get(tag, 0) + 1
+                return
+        try:
+            pipeline = self.redis.pipeline()
+            for tag in tags:
+                pipeline.hincrby(f"{self.namespace}:versions", tag, 1)
+            if self.settle > 0:
+                pipeline.hset(f"{self.namespace}:invalidated", mapping={tag: now for tag in tags})
+            pipeline.execute()
+        except Exception as e:
+            # Local entries cannot be checked against Redis now; drop them so none outlive the write.
+            print(f"Response cache invalidation failed: {e!r}")
+            with self._lock:
+                self._entries.clear()
+
+    def invalidate_recipe(self, recipe_id: Optional[int] = None):
+        """Invalidate a recipe's cached reads and every listing (call after committing a change)."""
+        if recipe_id is None:
+            self.invalidate(LISTING_TAG)
+        else:
+            self.invalidate(LISTING_TAG, recipe_tag(recipe_id))
+
+    def clear(self):
+        self.invalidate(ALL_TAG)
+
+    def respond(self, request: Request, entry: CachedResponse, validators: Optional[Dict[str, str]] = None) -> Response:
+        """Return entry as a JSON response, or 304 when the client already has this version.
+
+        validators (see validator_headers) replace the ETag derived from the body.
+        """
+        headers = {**entry.headers, **(validators or validator_headers(entry.etag))}
+        if is_not_modified(request, headers):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.redis_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+def response_cache_from_env() -> ResponseCache:
+    redis_client = None
+    if RESPONSE_CACHE_REDIS:
+        from services.timer_service import redis_client
+    return ResponseCache(redis_client=redis_client)
+
+# Shared response cache for the application.
+response_cache = response_cache_from_env()
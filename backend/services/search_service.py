@@ -0,0 +1,243 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import Session, selectinload
+from db.database import sync_engine_for
+from models.recipe_model import Recipe
+from models.search_model import RecipeSearchDocument
+import math
+import re
+import threading
+import weakref
+
+# Hebrew prefix letters (ו/ה/ב/ל) that attach to the following word, e.g. "ובביצים" -> "ביצים".
+HEBREW_PREFIXES = "והבל"
+MAX_PREFIX_LETTERS = 2
+MIN_STEM_LENGTH = 2
+
+NIQQUD = re.compile(r"[֑-ׇ]")
+WORD = re.compile(r"\w+")
+
+# Relative weight of a term by the field it came from.
+FIELD_WEIGHTS = {"name": 3.0, "ingredients": 2.0, "steps": 1.0}
+# Terms produced by stripping prefix letters count less than the word as written.
+STRIPPED_WEIGHT = 0.6
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase words with Hebrew niqqud removed."""
+    if not text:
+        return []
+    return WORD.findall(NIQQUD.sub("", text).lower())
+
+def term_variants(token: str) -> List[str]:
+    """Return a token followed by the forms left after stripping up to two Hebrew prefix letters."""
+    variants = [token]
+    stem = token
+    for _ in range(MAX_PREFIX_LETTERS):
+        if len(stem) - 1 < MIN_STEM_LENGTH or stem[0] not in HEBREW_PREFIXES:
+            break
+        stem = stem[1:]
+        variants.append(stem)
+    return variants
+
+def expand(terms: str) -> str:
+    """Expand space-separated tokens into the tokens plus their prefix variants."""
+    return " ".join(variant for token in terms.split() for variant in term_variants(token))
+
+def document_terms(recipe: Recipe) -> Dict[str, str]:
+    """Build the space-separated tokens of a recipe's name, ingredients and steps."""
+    return {
+        "name_terms": " ".join(tokenize(recipe.name)),
+        "ingredient_terms": " ".join(tokenize(" ".join(ing.name or "" for ing in recipe.ingredients))),
+        "step_terms": " ".join(tokenize(recipe.preparation_steps)),
+    }
+
+def weighted_term_counts(document: RecipeSearchDocument) -> Counter:
+    """Count a document's terms and prefix variants, weighted by field."""
+    counts = Counter()
+    for field, terms in (("name", document.name_terms), ("ingredients", document.ingredient_terms), ("steps", document.step_terms)):
+        weight = FIELD_WEIGHTS[field]
+        for token in (terms or "").split():
+            variants = term_variants(token)
+            counts[variants[0]] += weight
+            for variant in variants[1:]:
+                counts[variant] += weight * STRIPPED_WEIGHT
+    return counts
+
+class InvertedIndex:
+    """In-process inverted index with BM25 ranking, used where tsvector is not available."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {recipe_id: weighted term frequency}
+        self.doc_terms = {}  # recipe_id -> terms, for removal
+        self.doc_lengths = {}
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, recipe_id: int, counts: Counter):
+        with self._lock:
+            self._remove(recipe_id)
+            for term, frequency in counts.items():
+                self.postings[term][recipe_id] = frequency
+            self.doc_terms[recipe_id] = list(counts)
+            length = sum(counts.values())
+            self.doc_lengths[recipe_id] = length
+            self._total_length += length
+
+    def remove(self, recipe_id: int):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id: int):
+        for term in self.doc_terms.pop(recipe_id, []):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(recipe_id, None)
+                if not postings:
+                    del self.postings[term]
+        self._total_length -= self.doc_lengths.pop(recipe_id, 0.0)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        """Return (recipe_id, score) pairs matching every query word, best first."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            total_docs = len(self.doc_lengths)
+            if not total_docs:
+                return []
+            average_length = self._total_length / total_docs
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for variant in term_variants(token):
+                    postings = self.postings.get(variant)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for recipe_id, frequency in postings.items():
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[recipe_id] / average_length)
+                        score = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                        if score > token_scores.get(recipe_id, 0.0):
+                            token_scores[recipe_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {recipe_id: score + token_scores[recipe_id] for recipe_id, score in scores.items() if recipe_id in token_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[offset:offset + limit]
+
+class RecipeSearch:
+    """Recipe search over name, ingredient names and preparation steps.
+
+    Documents are stored in recipe_search_documents. On PostgreSQL they are matched through a
+    GIN-indexed tsvector; elsewhere an InvertedIndex per database is built on first use and
+    updated incrementally by index_recipe/remove_recipe.
+    """
+
+    def __init__(self):
+        self._indexes = weakref.WeakKeyDictionary()  # engine -> InvertedIndex
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _uses_tsvector(db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
+    def _memory_index(self, db: Session, build: bool = True) -> Optional[InvertedIndex]:
+        key = sync_engine_for(db.get_bind())  # Shared by sync sessions and the async path.
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is not None or not build:
+            return index
+
+        self.backfill(db)
+        index = InvertedIndex()
+        for document in db.query(RecipeSearchDocument).yield_per(1000):
+            index.add(document.recipe_id, weighted_term_counts(document))
+        with self._lock:
+            return self._indexes.setdefault(key, index)
+
+    def _store(self, db: Session, recipe: Recipe) -> RecipeSearchDocument:
+        document = db.get(RecipeSearchDocument, recipe.id)
+        if document is None:
+            document = RecipeSearchDocument(recipe_id=recipe.id)
+            db.add(document)
+        for field, terms in document_terms(recipe).items():
+            setattr(document, field, terms)
+        if self._uses_tsvector(db):
+            document.search_vector = (
+                func.setweight(func.to_tsvector("simple", expand(document.name_terms)), literal_column("'A'"))
+                .op("||")(func.setweight(func.to_tsvector("simple", expand(document.ingredient_terms)), literal_column("'B'")))
+                .op("||")(func.setweight(func.to_tsvector("simple", expand(document.step_terms)), literal_column("'C'")))
+            )
+        return document
+
+    def index_recipe(self, db: Session, recipe: Recipe):
+        """Create or refresh the search document of a recipe and commit it."""
+        counts = weighted_term_counts(self._store(db, recipe))
+        db.commit()
+        index = self._memory_index(db, build=False)
+        if index is not None:
+            index.add(recipe.id, counts)
+
+    def index_recipes(self, db: Session, recipe_ids: Iterable[int], chunk_size: int = 500):
+        """Index many recipes (e.g. after a bulk import), loading them in chunks."""
+        recipe_ids = list(recipe_ids)
+        index = self._memory_index(db, build=False)
+        for start in range(0, len(recipe_ids), chunk_size):
+            chunk = recipe_ids[start:start + chunk_size]
+            recipes = db.query(Recipe).options(selectinload(Recipe.ingredients)).filter(Recipe.id.in_(chunk)).all()
+            counts = {recipe.id: weighted_term_counts(self._store(db, recipe)) for recipe in recipes}
+            db.commit()
+            if index is not None:
+                for recipe_id, recipe_counts in counts.items():
+                    index.add(recipe_id, recipe_counts)
+
+    def remove_recipe(self, db: Session, recipe_id: int):
+        """Delete a recipe's search document; call before committing the recipe's deletion."""
+        db.query(RecipeSearchDocument).filter(RecipeSearchDocument.recipe_id == recipe_id).delete(synchronize_session=False)
+        index = self._memory_index(db, build=False)
+        if index is not None:
+            index.remove(recipe_id)
+
+    def backfill(self, db: Session):
+        """Index recipes that have no search document yet (e.g. rows created before search existed)."""
+        missing = (
+            db.query(Recipe.id)
+            .outerjoin(RecipeSearchDocument, RecipeSearchDocument.recipe_id == Recipe.id)
+            .filter(RecipeSearchDocument.recipe_id.is_(None))
+        )
+        self.index_recipes(db, [recipe_id for recipe_id, in missing])
+
+    def search(self, db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        """Return (recipe_id, score) pairs matching every word of the query, best first."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        if not self._uses_tsvector(db):
+            return self._memory_index(db).search(query, limit, offset)
+
+        # Each query word matches any of its prefix variants; all words must match.
+        ts_query = " & ".join("(" + " | ".join(term_variants(token)) + ")" for token in tokens)
+        tsquery = func.to_tsquery("simple", ts_query)
+        rank = func.ts_rank(RecipeSearchDocument.search_vector, tsquery)
+        rows = (
+            db.query(RecipeSearchDocument.recipe_id, rank.label("rank"))
+            .filter(RecipeSearchDocument.search_vector.op("@@")(tsquery))
+            .order_by(rank.desc(), RecipeSearchDocument.recipe_id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return [(recipe_id, float(score)) for recipe_id, score in rows]
+
+# Shared search index for the application.
+recipe_search = RecipeSearch()
@@ -5,12 +5,12 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from sqlalchemy.orm import Session
-from models.recipe_model import Recipe, Ingredient, NutritionalInfo, CookingTimer
+from models.recipe_model import Recipe, Ingredient, NutritionalInfo
 from models.user_model import User
 from db.database import SessionLocal, init_db
 from passlib.context import CryptContext
 from services.ai_service import calculate_nutritional_info 
-from services.timer_service import start_timer  
+from services.recipe_import import import_recipes
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -699,51 +699,10 @@ def load_seed_data(db: Session):
                 }
             },
         ]
-        #Add new recipe
-        for recipe_data in seed_recipes:
-            image_path = f"/static/{recipe_data['image_filename']}"
-            new_recipe = Recipe(
-                name=recipe_data["name"],
-                preparation_steps=recipe_data["preparation_steps"],
-                cooking_time=recipe_data["cooking_time"],
-                servings=recipe_data["servings"],
-                categories=recipe_data["categories"],
-                tags=recipe_data["tags"],
-                creator_id=admin_user.id,
-                image_url=image_path
-            )
-            db.add(new_recipe)
-            db.flush()  # Retrieve new recipe ID
-
-            for ingredient in recipe_data["ingredients"]:
-                new_ingredient = Ingredient(
-                    name=ingredient["name"],
-                    quantity=ingredient["quantity"],
-                    unit=ingredient["unit"],
-                    recipe_id=new_recipe.id
-                )
-                db.add(new_ingredient)
-
-            for timer in recipe_data["timers"]:
-                new_timer = CookingTimer(
-                    recipe_id=new_recipe.id,
-                    step_number=timer["step_number"],
-                    duration=timer["duration"],
-                    label=timer["label"]
-                )
-                db.add(new_timer)
-                start_timer(f"recipe_{new_recipe.id}_step_{timer['step_number']}", timer["duration"])
-
-            if "nutrition" in recipe_data:
-                nutrition_data = recipe_data["nutrition"]
-                new_nutrition = NutritionalInfo(
-                    recipe_id=new_recipe.id,
-                    calories=nutrition_data["calories"],
-                    protein=nutrition_data["protein"],
-                    carbs=nutrition_data["carbs"],
-                    fats=nutrition_data["fats"]
-                )
-                db.add(new_nutrition)
+        # Add the seed recipes through the bulk importer
+        report = import_recipes(db, enumerate(seed_recipes, start=1), creator_id=admin_user.id)
+        if report.errors:
+            raise ValueError(f"Invalid seed recipes: {report.errors}")
 
         db.commit()
         print("✅ Seed data loaded successfully!")
@@ -0,0 +1,83 @@
+from typing import Optional
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+from services.image_store import STORED_NAME
+from urllib.parse import quote
+import mimetypes
+import os
+
+# "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd) hands the file transfer to the front proxy.
+STATIC_OFFLOAD = os.getenv("STATIC_OFFLOAD", "").lower()
+# nginx "internal" location aliased to the static directory, used with x-accel-redirect.
+STATIC_ACCEL_PREFIX = os.getenv("STATIC_ACCEL_PREFIX", "/internal-static/")
+# Cache lifetime of files whose name does not change with their content.
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Pre-compressed siblings, in order of preference: encoding -> file suffix.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+def is_compressible(media_type: Optional[str]) -> bool:
+    # JPEG, WebP and PNG are compressed already; gzip/brotli only helps text formats.
+    return bool(media_type) and (
+        media_type.startswith("text/") or media_type in ("image/svg+xml", "application/json", "application/javascript")
+    )
+
+def accepted_encodings(headers: Headers) -> set:
+    encodings = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, parameters = part.strip().partition(";")
+        if name and parameters.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(name.lower())
+    return encodings
+
+class AssetFiles(StaticFiles):
+    """StaticFiles for production: immutable caching of content-hashed files, pre-compressed
+    variants and optional hand-off of the transfer to a front proxy.
+
+    Range and conditional requests are handled by Starlette's FileResponse.
+    """
+
+    def __init__(self, *args, offload: str = STATIC_OFFLOAD, accel_prefix: str = STATIC_ACCEL_PREFIX, max_age: int = STATIC_MAX_AGE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offload = offload
+        self.accel_prefix = accel_prefix.rstrip("/") + "/"
+        self.max_age = max_age
+
+    def cache_control(self, full_path) -> str:
+        # Content-hashed names never change meaning, so clients need not revalidate them.
+        if STORED_NAME.match(os.path.basename(full_path)):
+            return IMMUTABLE_CACHE_CONTROL
+        return f"public, max-age={self.max_age}"
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        headers = {"Cache-Control": self.cache_control(full_path)}
+
+        if self.offload in ("x-accel-redirect", "x-sendfile"):
+            # The proxy sends the bytes (and handles ranges); the worker only names the file.
+            if self.offload == "x-accel-redirect":
+                relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                headers["X-Accel-Redirect"] = self.accel_prefix + quote(relative_path)
+            else:
+                headers["X-Sendfile"] = os.path.abspath(full_path)
+            return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+        if is_compressible(media_type):
+            headers["Vary"] = "Accept-Encoding"
+            encodings = accepted_encodings(request_headers)
+            for encoding, suffix in PRECOMPRESSED:
+                compressed_path = f"{full_path}{suffix}"
+                if encoding in encodings and os.path.isfile(compressed_path):
+                    headers["Content-Encoding"] = encoding
+                    full_path, stat_result = compressed_path, os.stat(compressed_path)
+                    break
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
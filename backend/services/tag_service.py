@@ -0,0 +1,116 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.recipe_model import Recipe, Tag, recipe_tags
+
+CATEGORY = "category"
+TAG = "tag"
+
+def normalize_label(name: str) -> str:
+    """Collapse whitespace and case so "  Vegan " and "vegan" are the same label."""
+    return " ".join(name.split()).lower()
+
+def split_labels(value: Optional[str]) -> List[str]:
+    """Split a comma-separated categories/tags string into distinct normalized labels."""
+    if not value:
+        return []
+    labels = (normalize_label(part) for part in value.split(","))
+    return list(dict.fromkeys(label for label in labels if label))
+
+def recipe_labels(categories: Optional[str], tags: Optional[str]) -> Set[Tuple[str, str]]:
+    """Return the (kind, name) pairs described by a recipe's categories and tags strings."""
+    return {(CATEGORY, name) for name in split_labels(categories)} | {(TAG, name) for name in split_labels(tags)}
+
+def resolve_tag_ids(db: Session, labels: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """Map (kind, name) pairs to tag ids, creating the tags that do not exist yet."""
+    labels = set(labels)
+    if not labels:
+        return {}
+
+    def existing():
+        names = {name for _, name in labels}
+        rows = db.execute(select(Tag.kind, Tag.name, Tag.id).where(Tag.name.in_(names))).all()
+        return {(kind, name): tag_id for kind, name, tag_id in rows if (kind, name) in labels}
+
+    tag_ids = existing()
+    missing = [{"kind": kind, "name": name} for kind, name in sorted(labels - set(tag_ids))]
+    if missing:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Tag), missing)
+        except IntegrityError:
+            # Another writer created some of these tags first; theirs are used instead.
+            pass
+        tag_ids = existing()
+    return tag_ids
+
+def sync_recipe_tags(db: Session, recipe: Recipe):
+    """Point recipe.labels at the tags parsed from its categories and tags strings (not committed)."""
+    tag_ids = resolve_tag_ids(db, recipe_labels(recipe.categories, recipe.tags))
+    recipe.labels = db.query(Tag).filter(Tag.id.in_(tag_ids.values())).all() if tag_ids else []
+
+def add_recipe_tags(db: Session, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]):
+    """Link recipes without labels to their tags in bulk; rows are (recipe_id, categories, tags)."""
+    rows = [(recipe_id, recipe_labels(categories, tags)) for recipe_id, categories, tags in rows]
+    tag_ids = resolve_tag_ids(db, set().union(*(labels for _, labels in rows)))
+    links = [
+        {"recipe_id": recipe_id, "tag_id": tag_ids[label]}
+        for recipe_id, labels in rows
+        for label in labels
+    ]
+    if links:
+        db.execute(insert(recipe_tags), links)
+
+def backfill_recipe_tags(db: Session, chunk_size: int = 1000) -> int:
+    """Create the labels of recipes that only have the legacy strings; safe to run repeatedly."""
+    unlabeled = (
+        select(Recipe.id, Recipe.categories, Recipe.tags)
+        .where(~select(recipe_tags.c.recipe_id).where(recipe_tags.c.recipe_id == Recipe.id).exists())
+        .where(func.coalesce(Recipe.categories, "") + func.coalesce(Recipe.tags, "") != "")
+        .order_by(Recipe.id)
+    )
+    backfilled = 0
+    last_id = 0
+    while True:
+        chunk = db.execute(unlabeled.where(Recipe.id > last_id).limit(chunk_size)).all()
+        if not chunk:
+            break
+        add_recipe_tags(db, chunk)
+        db.commit()
+        backfilled += len(chunk)
+        last_id = chunk[-1][0]
+    if backfilled:
+        print(f"Backfilled tags for {backfilled} recipes")
+    return backfilled
+
+def label_filters(recipe_id_column, category: Optional[str] = None, tag: Optional[str] = None) -> list:
+    """Build one indexed membership clause per requested label; all of them must match.
+
+    category and tag may each hold several comma-separated labels.
+    """
+    clauses = []
+    for kind, value in ((CATEGORY, category), (TAG, tag)):
+        for name in split_labels(value):
+            tagged = (
+                select(recipe_tags.c.recipe_id)
+                .join(Tag, Tag.id == recipe_tags.c.tag_id)
+                .where(Tag.kind == kind, Tag.name == name)
+            )
+            clauses.append(recipe_id_column.in_(tagged))
+    return clauses
+
+def facet_counts(db: Session, category: Optional[str] = None, tag: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """Count recipes per category and tag, optionally within the recipes matching the given filters."""
+    count = func.count(recipe_tags.c.recipe_id)
+    query = (
+        select(Tag.kind, Tag.name, count)
+        .join(recipe_tags, recipe_tags.c.tag_id == Tag.id)
+        .where(*label_filters(recipe_tags.c.recipe_id, category, tag))
+        .group_by(Tag.id, Tag.kind, Tag.name)
+        .order_by(count.desc(), Tag.name)
+    )
+    facets = {"categories": [], "tags": []}
+    for kind, name, recipes in db.execute(query):
+        facets["categories" if kind == CATEGORY else "tags"].append({"name": name, "count": recipes})
+    return facets
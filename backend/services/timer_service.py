@@ -1,15 +1,447 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from services.notification_push import notification_broker
+import heapq
+import json
+import os
 import redis
+import threading
+import time
+import uuid
+
+# "redis" shares sessions and the schedule between workers. Expiry events then reach streams
+# connected to other workers only with NOTIFICATION_PUSH_REDIS=1 (see notification_push).
+TIMER_BACKEND = os.getenv("TIMER_BACKEND", "memory")
+TIMER_SESSION_TTL = float(os.getenv("TIMER_SESSION_TTL", str(12 * 60 * 60)))  # Seconds an untouched session is kept.
+# With Redis, other workers can schedule an earlier expiry; the scheduler looks again at least this often.
+TIMER_REDIS_POLL = float(os.getenv("TIMER_REDIS_POLL", "1"))
 
 # Connect to Redis for timers
 redis_client = redis.Redis(host='redis', port=6379, db=0)
 
-# Function to handle timers
-def start_timer(timer_id: str, duration: int):
-    redis_client.set(timer_id, duration)
-    redis_client.expire(timer_id, duration)
+# Timer states of a cooking session step.
+IDLE = "idle"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+
+# Schedule key suffix of a session's own expiry.
+SESSION_END = "end"
+
+# A session change: the session to save (None deletes it) and schedule keys to set (None removes them).
+Change = Tuple[Optional[Dict], Dict[str, Optional[float]]]
+
+class MemoryTimerStore:
+    """Sessions and the expiry schedule of one process (tests and single-worker deployments).
+
+    The schedule is a heap; rescheduled or cancelled entries stay in it and are skipped when popped.
+    """
+
+    def __init__(self):
+        self._sessions = {}  # session id -> session (JSON text, so callers never share state)
+        self._by_user = {}  # user id -> session ids
+        self._heap = []  # (due at, key)
+        self._due = {}  # key -> due at of its live heap entry
+        self._lock = threading.Lock()
+
+    def create(self, session: Dict, schedule: Dict[str, Optional[float]]):
+        with self._lock:
+            self._apply(session["id"], session, schedule)
+
+    def update(self, session_id: str, change: Callable[[Dict], Change]) -> Optional[Dict]:
+        """Apply change to the stored session atomically; returns what was saved, or None if no session."""
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is None:
+                return None
+            session, schedule = change(json.loads(data))
+            self._apply(session_id, session, schedule)
+            return session
+
+    def _apply(self, session_id: str, session: Optional[Dict], schedule: Dict[str, Optional[float]]):
+        if session is None:
+            data = self._sessions.pop(session_id, None)
+            if data is not None:
+                self._by_user.get(json.loads(data)["user_id"], set()).discard(session_id)
+        else:
+            self._sessions[session_id] = json.dumps(session)
+            self._by_user.setdefault(session["user_id"], set()).add(session_id)
+        for key, due_at in schedule.items():
+            if due_at is None:
+                self._due.pop(key, None)
+            else:
+                self._due[key] = due_at
+                heapq.heappush(self._heap, (due_at, key))
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            data = self._sessions.get(session_id)
+        return json.loads(data) if data is not None else None
+
+    def user_sessions(self, user_id: int) -> List[Dict]:
+        with self._lock:
+            data = [self._sessions[session_id] for session_id in self._by_user.get(user_id, ())]
+        return [json.loads(session) for session in data]
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        keys = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, key = heapq.heappop(self._heap)
+                if self._due.get(key) == due_at:
+                    del self._due[key]
+                    keys.append(key)
+        return keys
+
+class RedisTimerStore:
+    """Sessions as Redis keys and the schedule as one sorted set shared by every worker.
+
+    A session and its schedule entries change in one WATCH/MULTI transaction, retried when
+    another worker changed the session first. A worker fires an expiry only if its ZREM of
+    the entry succeeds, so each fires once.
+    """
+
+    def __init__(self, client, namespace: str = "timers", ttl: float = TIMER_SESSION_TTL):
+        self.redis = client
+        self.namespace = namespace
+        self.ttl = max(int(ttl), 1)
+        self.schedule_key = f"{namespace}:due"
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.namespace}:session:{session_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.namespace}:user:{user_id}"
+
+    def create(self, session: Dict, schedule: Dict[str, Optional[float]]):
+        pipeline = self.redis.pipeline()
+        self._apply(pipeline, session["id"], session["user_id"], session, schedule)
+        pipeline.execute()
+
+    def update(self, session_id: str, change: Callable[[Dict], Change]) -> Optional[Dict]:
+        """Apply change to the stored session atomically; returns what was saved, or None if no session."""
+        key = self._session_key(session_id)
+        with self.redis.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(key)
+                    data = pipeline.get(key)
+                    if data is None:
+                        return None
+                    stored = json.loads(data)
+                    session, schedule = change(json.loads(data))
+                    pipeline.multi()
+                    self._apply(pipeline, session_id, stored["user_id"], session, schedule)
+                    pipeline.execute()
+                    return session
+                except redis.WatchError:
+                    continue
+
+    def _apply(self, pipeline, session_id: str, user_id: int, session: Optional[Dict], schedule: Dict[str, Optional[float]]):
+        if session is None:
+            pipeline.delete(self._session_key(session_id))
+            pipeline.srem(self._user_key(user_id), session_id)
+        else:
+            pipeline.set(self._session_key(session_id), json.dumps(session), ex=self.ttl)
+            pipeline.sadd(self._user_key(user_id), session_id)
+            pipeline.expire(self._user_key(user_id), self.ttl)
+        added = {key: due_at for key, due_at in schedule.items() if due_at is not None}
+        if added:
+            pipeline.zadd(self.schedule_key, added)
+        for key in [key for key, due_at in schedule.items() if due_at is None]:
+            pipeline.zrem(self.schedule_key, key)
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        data = self.redis.get(self._session_key(session_id))
+        return json.loads(data) if data is not None else None
+
+    def user_sessions(self, user_id: int) -> List[Dict]:
+        session_ids = [session_id.decode() if isinstance(session_id, bytes) else session_id
+                       for session_id in self.redis.smembers(self._user_key(user_id))]
+        if not session_ids:
+            return []
+        data = self.redis.mget([self._session_key(session_id) for session_id in session_ids])
+        return [json.loads(session) for session in data if session is not None]
+
+    def next_due(self) -> Optional[float]:
+        first = self.redis.zrange(self.schedule_key, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    def pop_due(self, now: float, limit: int = 100) -> List[str]:
+        keys = self.redis.zrangebyscore(self.schedule_key, "-inf", now, start=0, num=limit)
+        if not keys:
+            return []
+        pipeline = self.redis.pipeline()
+        for key in keys:
+            pipeline.zrem(self.schedule_key, key)
+        claimed = pipeline.execute()
+        return [key.decode() if isinstance(key, bytes) else key for key, won in zip(keys, claimed) if won]
+
+def publish_timer_event(user_id: int, event: Dict):
+    notification_broker.publish(user_id, event)
+
+class TimerEngine:
+    """Per-user cooking sessions over a recipe's CookingTimer steps, with one expiry scheduler.
+
+    Each step can be started, paused, resumed and reset. A running step stores when it ends and a
+    paused one what was left, so remaining time is computed without touching the schedule. A
+    single scheduler thread sleeps until the earliest expiry and pushes a "timer" event to the
+    user's notification streams; idle sessions expire through the same schedule. Every change
+    goes through the store's atomic update, so workers sharing a Redis store never lose one.
+    """
+
+    def __init__(
+        self,
+        store,
+        publish: Callable[[int, Dict], None] = publish_timer_event,
+        clock: Callable[[], float] = time.time,
+        session_ttl: float = TIMER_SESSION_TTL,
+        poll: Optional[float] = None
+    ):
+        self.store = store
+        self.publish = publish
+        self.clock = clock
+        self.session_ttl = session_ttl
+        self.poll = poll
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # Sessions
+
+    def create_session(self, user_id: int, recipe_id: int, timers: Iterable) -> Dict:
+        """Start a session over CookingTimer rows (or objects with the same attributes); all steps idle."""
+        session = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "recipe_id": recipe_id,
+            "steps": [
+                {
+                    "step_number": timer.step_number,
+                    "label": timer.label,
+                    "duration": timer.duration,
+                    "status": IDLE,
+                    "remaining": float(timer.duration),
+                    "ends_at": None,
+                }
+                for timer in sorted(timers, key=lambda timer: timer.step_number)
+            ],
+        }
+        self.store.create(session, self._keep_alive(session, {}))
+        return self.view(session)
+
+    def get_session(self, session_id: str, user_id: Optional[int] = None) -> Dict:
+        session = self.store.load(session_id)
+        self._check_owner(session, user_id)
+        return self.view(session)
+
+    def user_sessions(self, user_id: int) -> List[Dict]:
+        return [self.view(session) for session in self.store.user_sessions(user_id)]
+
+    def end_session(self, session_id: str, user_id: Optional[int] = None):
+        def end(session):
+            self._check_owner(session, user_id)
+            return None, self._unschedule_all(session)
+
+        self._update(session_id, end)
+
+    # Steps
+
+    def start_step(self, session_id: str, step_number: int, user_id: Optional[int] = None) -> Dict:
+        """Run an idle or paused step for what is left of it."""
+        return self._change_step(session_id, step_number, user_id, self._start)
+
+    def resume_step(self, session_id: str, step_number: int, user_id: Optional[int] = None) -> Dict:
+        def resume(session, step):
+            if step["status"] != PAUSED:
+                raise ValueError("Timer is not paused")
+            return self._start(session, step)
+
+        return self._change_step(session_id, step_number, user_id, resume)
+
+    def pause_step(self, session_id: str, step_number: int, user_id: Optional[int] = None) -> Dict:
+        def pause(session, step):
+            if step["status"] != RUNNING:
+                raise ValueError("Timer is not running")
+            step.update(status=PAUSED, remaining=max(step["ends_at"] - self.clock(), 0.0), ends_at=None)
+            return {self._key(session["id"], step["step_number"]): None}
+
+        return self._change_step(session_id, step_number, user_id, pause)
+
+    def reset_step(self, session_id: str, step_number: int, user_id: Optional[int] = None) -> Dict:
+        def reset(session, step):
+            step.update(status=IDLE, remaining=float(step["duration"]), ends_at=None)
+            return {self._key(session["id"], step["step_number"]): None}
+
+        return self._change_step(session_id, step_number, user_id, reset)
+
+    def _start(self, session: Dict, step: Dict) -> Dict[str, Optional[float]]:
+        if step["status"] == RUNNING:
+            raise ValueError("Timer is already running")
+        if step["status"] == DONE:
+            raise ValueError("Timer has finished; reset it to run it again")
+        step.update(status=RUNNING, ends_at=self.clock() + step["remaining"])
+        return {self._key(session["id"], step["step_number"]): step["ends_at"]}
+
+    def _change_step(self, session_id: str, step_number: int, user_id: Optional[int], change) -> Dict:
+        def apply(session):
+            self._check_owner(session, user_id)
+            schedule = change(session, self._step(session, step_number))
+            return session, self._keep_alive(session, schedule)
+
+        session = self._update(session_id, apply)
+        self._wake()
+        return self.view(session)
+
+    def remaining(self, step: Dict, now: Optional[float] = None) -> float:
+        """Seconds left on a step, from its end time or its paused remainder."""
+        if step["status"] == RUNNING:
+            return max(step["ends_at"] - (self.clock() if now is None else now), 0.0)
+        return step["remaining"]
+
+    def view(self, session: Dict) -> Dict:
+        now = self.clock()
+        return {
+            "id": session["id"],
+            "user_id": session["user_id"],
+            "recipe_id": session["recipe_id"],
+            "steps": [
+                {
+                    "step_number": step["step_number"],
+                    "label": step["label"],
+                    "duration": step["duration"],
+                    "status": step["status"],
+                    "remaining": round(self.remaining(step, now), 1),
+                }
+                for step in session["steps"]
+            ],
+        }
+
+    # Scheduler
+
+    def fire_due(self, now: Optional[float] = None) -> int:
+        """Fire every expiry that is due; returns how many steps finished."""
+        now = self.clock() if now is None else now
+        finished = 0
+        for key in self.store.pop_due(now):
+            session_id, _, part = key.rpartition(":")
+            expired = []
+
+            def expire(session):
+                if part == SESSION_END:
+                    return None, self._unschedule_all(session)
+                step = self._step(session, int(part))
+                expired.clear()
+                # Paused, reset or restarted since it was claimed: nothing is due any more.
+                if step["status"] == RUNNING and step["ends_at"] <= now:
+                    step.update(status=DONE, remaining=0.0, ends_at=None)
+                    expired.append(step)
+                return session, {}
+
+            try:
+                session = self.store.update(session_id, expire)
+            except KeyError:
+                continue
+            if session is None or not expired:
+                continue
+            finished += 1
+            self.publish(session["user_id"], {
+                "type": "timer",
+                "event": "expired",
+                "session_id": session_id,
+                "recipe_id": session["recipe_id"],
+                "step_number": expired[0]["step_number"],
+                "label": expired[0]["label"],
+            })
+        return finished
+
+    def start_scheduler(self):
+        with self._wakeup:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="timer-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop_scheduler(self):
+        with self._wakeup:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+            self._wakeup.notify_all()
+        if thread is not None:
+            thread.join(timeout=2.0)
+
+    def _run(self):
+        while True:
+            try:
+                with self._wakeup:
+                    if self._stopped:
+                        return
+                    due_at = self.store.next_due()
+                    delay = None if due_at is None else due_at - self.clock()
+                    if self.poll is not None:
+                        delay = self.poll if delay is None else min(delay, self.poll)
+                    if delay is None or delay > 0:
+                        # Woken early when a step starts, since it may end before anything scheduled.
+                        self._wakeup.wait(delay)
+                        continue
+                self.fire_due()
+            except Exception as e:
+                print(f"Timer scheduler error: {e!r}")
+                with self._wakeup:
+                    self._wakeup.wait(1.0)
+
+    def _wake(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    # Helpers
+
+    @staticmethod
+    def _key(session_id: str, part) -> str:
+        return f"{session_id}:{part}"
+
+    def _update(self, session_id: str, change) -> Optional[Dict]:
+        found = []
+
+        def apply(session):
+            found.append(True)
+            return change(session)
+
+        session = self.store.update(session_id, apply)
+        if not found:
+            raise KeyError("Cooking session not found")
+        return session
+
+    @staticmethod
+    def _check_owner(session: Optional[Dict], user_id: Optional[int]):
+        if session is None or (user_id is not None and session["user_id"] != user_id):
+            raise KeyError("Cooking session not found")
+
+    @staticmethod
+    def _step(session: Dict, step_number: int) -> Dict:
+        for step in session["steps"]:
+            if step["step_number"] == step_number:
+                return step
+        raise KeyError("Timer step not found")
+
+    def _keep_alive(self, session: Dict, schedule: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        # Every change keeps the session alive for another session_ttl.
+        return {**schedule, self._key(session["id"], SESSION_END): self.clock() + self.session_ttl}
+
+    def _unschedule_all(self, session: Dict) -> Dict[str, Optional[float]]:
+        keys = [self._key(session["id"], step["step_number"]) for step in session["steps"]]
+        return dict.fromkeys(keys + [self._key(session["id"], SESSION_END)])
+
+def timer_engine_from_env() -> TimerEngine:
+    if TIMER_BACKEND == "redis":
+        return TimerEngine(RedisTimerStore(redis_client), poll=TIMER_REDIS_POLL)
+    return TimerEngine(MemoryTimerStore())
 
-def get_timer(timer_id: str):
-    time_left = redis_client.get(timer_id)
-    if time_left:
-        return {"time_left": time_left.decode("utf-8")}
-    return {"message": "Timer not found"}
+# Shared timer engine for the application's cooking sessions.
+timer_engine = timer_engine_from_env()
@@ -0,0 +1,76 @@
+from typing import IO, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+import os
+import tempfile
+import uuid
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Staging area for uploads awaiting post-processing; never served.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+
+# Leading bytes of the accepted image formats -> file extension.
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+class UploadTooLargeError(ValueError):
+    pass
+
+class UnsupportedUploadError(ValueError):
+    pass
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the extension of the image format the first bytes belong to, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+def stream_to_file(source: IO[bytes], directory: str, filename: Optional[str] = None, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, int]:
+    """Copy an image stream to directory in chunks; returns (path, size). Blocking, run it in a thread.
+
+    The data goes to a temporary file first and is renamed into place only once complete, so
+    readers never see a partial file. Without a filename a unique name is generated.
+    Raises UnsupportedUploadError for non-images and UploadTooLargeError past max_bytes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            extension = sniff_image_type(chunk)
+            if extension is None:
+                raise UnsupportedUploadError("Only JPEG, PNG, GIF and WebP images are accepted")
+            size = 0
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                f.write(chunk)
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+        path = os.path.join(directory, os.path.basename(filename) if filename else f"{uuid.uuid4().hex}.{extension}")
+        os.replace(temporary_path, path)
+        return path, size
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+async def save_upload(upload: UploadFile, directory: str = UPLOAD_DIR, filename: Optional[str] = None, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Store an uploaded image off the event loop; returns its path. Raises HTTPException 413/415."""
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image must be at most {max_bytes} bytes")
+    try:
+        path, _ = await run_in_threadpool(stream_to_file, upload.file, directory, filename, max_bytes)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail=f"Image must be at most {max_bytes} bytes")
+    except UnsupportedUploadError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return path
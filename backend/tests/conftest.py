@@ -34,3 +34,18 @@ def db_session():
 def test_db(db_session):
     """Alias for db_session."""
     yield db_session
+
+@pytest.fixture(scope="function")
+def fresh_engine():
+    """A private in-memory database for one test, with no tables yet."""
+    engine = create_engine(DATABASE_URL)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="function")
+def fresh_db(fresh_engine):
+    """A session on a private in-memory database with every table created."""
+    Base.metadata.create_all(bind=fresh_engine)
+    session = sessionmaker(bind=fresh_engine)()
+    yield session
+    session.close()
@@ -0,0 +1,91 @@
+import pytest
+from models.recipe_model import Comment, Recipe
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services import comment_service
+from services.comment_service import (
+    decode_comment_cursor,
+    get_comment_replies,
+    get_comment_threads,
+    insert_comment
+)
+
+@pytest.fixture
+def db_session(fresh_db):
+    fresh_db.add(Recipe(id=1, name="Shakshuka", creator_id=1))
+    fresh_db.commit()
+    return fresh_db
+
+def add(db, content, parent=None):
+    comment = insert_comment(db, Comment(recipe_id=1, user_id=1, username="chef", content=content, timestamp="t"), parent)
+    db.commit()
+    return comment
+
+@pytest.fixture
+def threads(db_session):
+    """a (a1 (a1x (a1x1)), a2, a3), b, c (c1)"""
+    a = add(db_session, "a")
+    b = add(db_session, "b")
+    a1 = add(db_session, "a1", a)
+    c = add(db_session, "c")
+    a1x = add(db_session, "a1x", a1)
+    a2 = add(db_session, "a2", a)
+    add(db_session, "c1", c)
+    add(db_session, "a1x1", a1x)
+    add(db_session, "a3", a)
+    return {"a": a, "a1": a1, "a1x": a1x, "a2": a2, "b": b}
+
+def contents(comments):
+    return [comment["content"] for comment in comments]
+
+def test_insert_places_replies_in_their_thread(db_session, threads):
+    a, a1x = threads["a"], threads["a1x"]
+    assert a1x.path == a.path + threads["a1"].path[-10:] + a1x.path[-10:]
+    assert (a.depth, a1x.depth) == (0, 2)
+    db_session.refresh(a)
+    assert a.reply_count == 3
+
+def test_threads_are_listed_in_tree_order(db_session, threads):
+    comments, next_cursor = get_comment_threads(db_session, 1)
+    assert contents(comments) == ["a", "a1", "a1x", "a1x1", "a2", "a3", "b", "c", "c1"]
+    assert next_cursor is None
+    assert comments[0]["replies_cursor"] is None and comments[0]["reply_count"] == 3
+
+def test_threads_are_paginated(db_session, threads):
+    first, next_cursor = get_comment_threads(db_session, 1, limit=2)
+    assert contents(first) == ["a", "a1", "a1x", "a1x1", "a2", "a3", "b"]
+    rest, next_cursor = get_comment_threads(db_session, 1, limit=2, cursor=next_cursor)
+    assert contents(rest) == ["c", "c1"]
+    assert next_cursor is None
+
+def test_depth_is_capped(db_session, threads, monkeypatch):
+    comments, _ = get_comment_threads(db_session, 1, max_depth=1)
+    assert contents(comments) == ["a", "a1", "a2", "a3", "b", "c", "c1"]
+    assert contents(get_comment_threads(db_session, 1, max_depth=0)[0]) == ["a", "b", "c"]
+    # Requests cannot go deeper than COMMENT_MAX_DEPTH.
+    monkeypatch.setattr(comment_service, "COMMENT_MAX_DEPTH", 2)
+    assert "a1x1" not in contents(get_comment_threads(db_session, 1, max_depth=50)[0])
+
+def test_long_threads_load_more_replies(db_session, threads):
+    comments, _ = get_comment_threads(db_session, 1, replies=2)
+    assert contents(comments) == ["a", "a1", "a1x", "b", "c", "c1"]
+    a, b, c = (comment for comment in comments if comment["depth"] == 0)
+    assert b["replies_cursor"] is None and c["replies_cursor"] is None
+    assert decode_comment_cursor(a["replies_cursor"]) == threads["a1x"].path
+
+    page, next_cursor = get_comment_replies(db_session, threads["a"], limit=2, cursor=a["replies_cursor"])
+    assert contents(page) == ["a1x1", "a2"]
+    page, next_cursor = get_comment_replies(db_session, threads["a"], limit=2, cursor=next_cursor)
+    assert contents(page) == ["a3"] and next_cursor is None
+
+def test_replies_of_a_reply(db_session, threads):
+    replies, _ = get_comment_replies(db_session, threads["a1"])
+    assert contents(replies) == ["a1x", "a1x1"]
+    assert contents(get_comment_replies(db_session, threads["a1"], max_depth=1)[0]) == ["a1x"]
+    assert get_comment_replies(db_session, threads["a2"]) == ([], None)
+
+def test_invalid_cursors_are_rejected(db_session, threads):
+    with pytest.raises(ValueError):
+        get_comment_threads(db_session, 1, cursor="not-a-cursor")
+    _, cursor = get_comment_threads(db_session, 1, limit=1)  # Points at thread a.
+    with pytest.raises(ValueError):
+        get_comment_replies(db_session, threads["b"], cursor=cursor)
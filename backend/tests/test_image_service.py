@@ -1,19 +1,37 @@
+import io
 import os
 import shutil
 import pytest
 from fastapi import UploadFile
 from fastapi.testclient import TestClient
-from services.image_service import upload_image, get_image
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models.base import Base
+from models.image_model import StoredImage
+from models.recipe_model import Recipe
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.image_service import (
+    InvalidImageError,
+    backfill_image_variants,
+    image_srcset,
+    process_image,
+    process_recipe_image,
+    release_image,
+    upload_image,
+    variant_urls,
+    get_image
+)
 from main import app
 
 client = TestClient(app)
 
 @pytest.fixture
 def test_image():
-    # Create a temporary image file for testing
+    # Create a temporary image file for testing; uploads must start with an image signature.
     image_path = "test_image.jpg"
     with open(image_path, "wb") as f:
-        f.write(os.urandom(1024))
+        f.write(b"\xff\xd8\xff\xe0" + os.urandom(1020))
     yield image_path
     os.remove(image_path)
 
@@ -46,3 +64,136 @@ async def test_get_image(test_image, upload_dir):
     assert response.status_code == 404
     json_response = response.json()
     assert json_response.get("detail") == "Not Found", f"Unexpected response: {json_response}"
+
+
+def encoded_image(size=(2000, 1000), image_format="JPEG", color=(200, 80, 40), **options):
+    buffer = io.BytesIO()
+    Image.new("RGBA" if len(color) == 4 else "RGB", size, color).save(buffer, image_format, **options)
+    buffer.seek(0)
+    return buffer
+
+@pytest.fixture
+def image_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'images.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def store(image_db, tmp_path):
+    # A session and static directory for the image store.
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    db = sessionmaker(bind=image_db)()
+    yield db, static_dir
+    db.close()
+
+def ref_counts(db):
+    return {image.filename: image.ref_count for image in db.query(StoredImage)}
+
+def test_process_image_variants(store):
+    db, static_dir = store
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    exif[0x0112] = 6  # Rotated 90 degrees: stored landscape, displayed portrait.
+    variants = process_image(db, encoded_image(exif=exif.tobytes()), str(static_dir))
+
+    assert set(variants) == {"thumb", "card", "full"}
+    assert (variants["full"]["width"], variants["full"]["height"]) == (1000, 2000)
+    assert (variants["card"]["width"], variants["card"]["height"]) == (480, 960)
+    assert variants["thumb"]["width"] == 200
+    for variant in variants.values():
+        for key, image_format in (("webp", "WEBP"), ("jpeg", "JPEG")):
+            path = static_dir / variant[key].removeprefix("/static/")
+            with Image.open(path) as stored:
+                assert stored.format == image_format
+                assert stored.width == variant["width"]
+                assert not stored.getexif()
+
+def test_process_image_is_content_addressed(store):
+    db, static_dir = store
+    first = process_image(db, encoded_image((300, 200)), str(static_dir))
+    second = process_image(db, encoded_image((300, 200)), str(static_dir))
+    assert first == second
+    # Small images are not upscaled, so card and full are the same file.
+    assert first["full"] == first["card"]
+    assert len(os.listdir(static_dir)) == 4
+    assert ref_counts(db) == {url.removeprefix("/static/"): 0 for url in variant_urls(first)}
+
+def test_process_image_flattens_transparency(store):
+    db, static_dir = store
+    variants = process_image(db, encoded_image((100, 100), "PNG", (200, 80, 40, 128)), str(static_dir))
+    with Image.open(static_dir / variants["full"]["webp"].removeprefix("/static/")) as stored:
+        assert "A" in stored.getbands()
+    with Image.open(static_dir / variants["full"]["jpeg"].removeprefix("/static/")) as stored:
+        assert stored.mode == "RGB"
+
+def test_process_image_rejects_non_images(store):
+    db, static_dir = store
+    with pytest.raises(InvalidImageError):
+        process_image(db, io.BytesIO(os.urandom(1024)), str(static_dir))
+    assert os.listdir(static_dir) == []
+
+def test_image_srcset():
+    variants = {
+        "thumb": {"width": 200, "height": 100, "webp": "/static/t.webp", "jpeg": "/static/t.jpg"},
+        "card": {"width": 300, "height": 150, "webp": "/static/f.webp", "jpeg": "/static/f.jpg"},
+        "full": {"width": 300, "height": 150, "webp": "/static/f.webp", "jpeg": "/static/f.jpg"},
+    }
+    images = image_srcset(variants)
+    assert images["srcset"] == {
+        "webp": "/static/t.webp 200w, /static/f.webp 300w",
+        "jpeg": "/static/t.jpg 200w, /static/f.jpg 300w",
+    }
+    assert images["card"] == variants["card"]
+    assert image_srcset(None) is None
+
+def test_backfill_and_release(image_db, store):
+    db, static_dir = store
+    (static_dir / "cake.jpg").write_bytes(encoded_image().getvalue())
+    db.add_all([
+        Recipe(name="עוגה", image_url="/static/cake.jpg"),
+        Recipe(name="עוגה שנייה", image_url="/static/cake.jpg"),
+        Recipe(name="סלט", image_url="/static/default-recipe.jpg"),
+    ])
+    db.commit()
+
+    assert backfill_image_variants(image_db, str(static_dir)) == 2
+    assert backfill_image_variants(image_db, str(static_dir)) == 0
+    first, second, salad = db.query(Recipe).order_by(Recipe.id).all()
+    assert first.image_variants == second.image_variants
+    assert first.image_url == first.image_variants["full"]["jpeg"]
+    assert (first.version, salad.image_variants) == (2, None)
+    assert (static_dir / "cake.jpg").exists()
+    # Both recipes reference the same six files.
+    assert set(ref_counts(db).values()) == {2}
+    assert len(ref_counts(db)) == 6
+
+    release_image(db, first)
+    db.commit()
+    assert set(ref_counts(db).values()) == {1}
+
+def test_process_recipe_image(image_db, store, tmp_path):
+    db, static_dir = store
+    recipe = Recipe(name="עוגה", image_url="/static/default-recipe.jpg")
+    db.add(recipe)
+    db.commit()
+
+    upload = tmp_path / "upload.jpg"
+    upload.write_bytes(encoded_image().getvalue())
+    variants = process_recipe_image(image_db, recipe.id, str(upload), str(static_dir))
+    db.refresh(recipe)
+    assert recipe.image_variants == variants
+    assert recipe.image_url == variants["full"]["jpeg"]
+    assert not upload.exists()
+
+    # A new image takes over the references; an undecodable upload changes nothing.
+    upload.write_bytes(encoded_image(color=(10, 20, 30)).getvalue())
+    replacement = process_recipe_image(image_db, recipe.id, str(upload), str(static_dir))
+    upload.write_bytes(b"\xff\xd8\xff" + os.urandom(100))
+    assert process_recipe_image(image_db, recipe.id, str(upload), str(static_dir)) is None
+    db.refresh(recipe)
+    assert recipe.image_variants == replacement
+    counts = ref_counts(db)
+    assert {counts[url.removeprefix("/static/")] for url in variant_urls(variants)} == {0}
+    assert {counts[url.removeprefix("/static/")] for url in variant_urls(replacement)} == {1}
@@ -0,0 +1,115 @@
+import os
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from models.base import Base
+from models.image_model import StoredImage
+from models.recipe_model import Recipe
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.image_store import (
+    acquire_images,
+    collect_garbage,
+    reconcile_image_references,
+    release_images,
+    store_image
+)
+
+def age(path, seconds):
+    # Pretend a file was written seconds ago.
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+class TestImageStore:
+    @pytest.fixture
+    def db_session(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+        engine.dispose()
+
+    @pytest.fixture
+    def static_dir(self, tmp_path):
+        path = tmp_path / "static"
+        path.mkdir()
+        return path
+
+    def expire(self, db_session):
+        # Move every row past the collector's grace period.
+        db_session.execute(update(StoredImage).values(updated_at=datetime.now(timezone.utc) - timedelta(days=1)))
+        db_session.commit()
+
+    def test_store_deduplicates(self, db_session, static_dir):
+        first = store_image(db_session, b"photo", "jpg", str(static_dir))
+        second = store_image(db_session, b"photo", "jpg", str(static_dir))
+        db_session.commit()
+
+        assert first == second
+        assert os.listdir(static_dir) == [first.removeprefix("/static/")]
+        image = db_session.query(StoredImage).one()
+        assert (len(image.digest), image.size, image.ref_count) == (64, 5, 0)
+
+    def test_reference_counts(self, db_session, static_dir):
+        url = store_image(db_session, b"photo", "jpg", str(static_dir))
+        acquire_images(db_session, [url, "/static/default-recipe.jpg"])
+        acquire_images(db_session, [url])
+        release_images(db_session, [url])
+        db_session.commit()
+        assert db_session.query(StoredImage.ref_count).scalar() == 1
+
+    def test_collects_unreferenced_after_grace(self, db_session, static_dir):
+        kept = store_image(db_session, b"kept", "jpg", str(static_dir))
+        dropped = store_image(db_session, b"dropped", "jpg", str(static_dir))
+        acquire_images(db_session, [kept])
+        db_session.commit()
+
+        # Too recent: an upload job may be about to reference it.
+        assert collect_garbage(db_session, str(static_dir), grace=3600)["stored"] == 0
+
+        self.expire(db_session)
+        assert collect_garbage(db_session, str(static_dir), grace=3600)["stored"] == 1
+        assert os.listdir(static_dir) == [kept.removeprefix("/static/")]
+        assert db_session.query(StoredImage.filename).scalar() == kept.removeprefix("/static/")
+
+    def test_collects_untracked_application_files(self, db_session, static_dir, tmp_path):
+        db_session.add(Recipe(name="עוגה", image_url="/static/cake_0123456789abcdef.jpg"))
+        db_session.commit()
+        names = [
+            "cake_0123456789abcdef.jpg",  # Legacy upload that is still shown.
+            "old_fedcba9876543210.png",  # Legacy upload nobody shows.
+            "0123456789abcdef0123456789abcdef.webp",  # Stored file without a row.
+            "abc.jpg.part",  # Interrupted upload.
+            "shakshuka.jpg",  # Bundled image.
+        ]
+        for name in names:
+            (static_dir / name).write_bytes(b"x")
+            age(static_dir / name, 7200)
+        (static_dir / "fresh_0123456789abcdef.jpg").write_bytes(b"x")
+        upload_dir = tmp_path / "uploads"
+        upload_dir.mkdir()
+        (upload_dir / "stale.jpg").write_bytes(b"x")
+        age(upload_dir / "stale.jpg", 3 * 24 * 3600)
+        (upload_dir / "pending.jpg").write_bytes(b"x")
+
+        removed = collect_garbage(db_session, str(static_dir), str(upload_dir), grace=3600)
+        assert removed == {"stored": 0, "untracked": 3, "staged": 1}
+        assert sorted(os.listdir(static_dir)) == ["cake_0123456789abcdef.jpg", "fresh_0123456789abcdef.jpg", "shakshuka.jpg"]
+        assert os.listdir(upload_dir) == ["pending.jpg"]
+
+    def test_reconcile(self, db_session, static_dir):
+        shared = store_image(db_session, b"shared", "jpg", str(static_dir))
+        variants = {"full": {"width": 1, "height": 1, "webp": shared, "jpeg": shared}}
+        db_session.add_all([Recipe(name="א", image_variants=variants), Recipe(name="ב", image_variants=variants)])
+        acquire_images(db_session, [shared])  # One reference was lost.
+        db_session.commit()
+        (static_dir / "0123456789abcdef0123456789abcdef.webp").write_bytes(b"untracked")
+        db_session.add(Recipe(name="ג", image_variants={"full": {"width": 1, "height": 1, "webp": "/static/0123456789abcdef0123456789abcdef.webp", "jpeg": shared}}))
+        db_session.commit()
+
+        assert reconcile_image_references(db_session, str(static_dir)) == 2
+        counts = {image.filename: image.ref_count for image in db_session.query(StoredImage)}
+        assert counts == {shared.removeprefix("/static/"): 3, "0123456789abcdef0123456789abcdef.webp": 1}
+        assert reconcile_image_references(db_session, str(static_dir)) == 0
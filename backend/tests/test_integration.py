@@ -2,29 +2,35 @@ import json
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from main import app, get_db
+from unittest.mock import patch
+from main import app, get_db, get_read_db, get_sync_db
 from models.base import Base
 from models.user_model import User
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+from services.ai_service import nutrition_client
+from services.job_queue import job_queue
+from services.nutrition_client import StubNutritionBackend, StubTranslationBackend
 
 # Create a persistent SQLite test database
 DATABASE_URL = "sqlite:///./test_db.sqlite"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# The handlers use async sessions (aiosqlite) on the same file.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_db.sqlite")
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Create all tables before tests
 Base.metadata.create_all(bind=engine)
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 client = TestClient(app)
 
 @pytest.fixture(scope="session", autouse=True)
@@ -34,8 +40,12 @@ def setup_db():
     yield
     Base.metadata.drop_all(bind=engine)
 
-def override_get_db():
+async def override_get_db():
     """Provide a test database session."""
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+def override_get_sync_db():
     session = TestingSessionLocal()
     try:
         yield session
@@ -43,6 +53,20 @@ def override_get_db():
         session.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_sync_db] = override_get_sync_db
+
+@pytest.fixture(scope="module", autouse=True)
+def offline_background_jobs():
+    """Nutrition jobs use local stub backends, and finish before the tests end."""
+    translator = StubTranslationBackend({"שוקולד": "chocolate", "קמח": "flour"})
+    backend = StubNutritionBackend({
+        "chocolate": {"calories": 546, "protein": 4.9, "carbs": 61, "fats": 31},
+        "flour": {"calories": 364, "protein": 10, "carbs": 76, "fats": 1},
+    })
+    with patch.object(nutrition_client, "translator", translator), patch.object(nutrition_client, "backend", backend):
+        yield
+        job_queue.shutdown(wait=True)
 
 @pytest.fixture(scope="function")
 def test_db():
@@ -128,6 +152,26 @@ class TestIntegration:
         assert get_response.status_code == 200, f"Failed to fetch recipe: {get_response.json()}"
         assert get_response.json()["name"] == "עוגת שוקולד"
 
+        # The listing's projections: summary cards, chosen fields, and invalid combinations
+        summary = client.get("/recipes/", params={"view": "summary"})
+        assert summary.status_code == 200 and set(summary.json()[0]) == {"id", "name", "image_url", "images", "rating"}
+        assert set(client.get("/recipes/", params={"fields": "id,name"}).json()[0]) == {"id", "name"}
+        assert client.get("/recipes/", params={"view": "bogus"}).status_code == 422
+        assert client.get("/recipes/", params={"view": "summary", "fields": "id,name"}).status_code == 400
+
+        # Cook it: a session over the recipe's timers, one step started and paused
+        session_response = client.post(f"/users/{user.id}/cooking-sessions", json={"recipe_id": recipe_id})
+        assert session_response.status_code == 200, f"Failed to start cooking: {session_response.json()}"
+        session_id = session_response.json()["id"]
+        assert [s["label"] for s in session_response.json()["steps"]] == ["ערבוב", "אפייה"]
+        steps_url = f"/users/{user.id}/cooking-sessions/{session_id}/steps"
+        assert client.post(f"{steps_url}/1/start").json()["steps"][0]["status"] == "running"
+        assert client.post(f"{steps_url}/1/pause").json()["steps"][0]["status"] == "paused"
+        assert client.post(f"{steps_url}/1/pause").status_code == 400
+        assert client.post(f"{steps_url}/9/start").status_code == 404
+        assert client.delete(f"/users/{user.id}/cooking-sessions/{session_id}").status_code == 200
+        assert client.get(f"/users/{user.id}/cooking-sessions/{session_id}").status_code == 404
+
         # Update the recipe
         update_data = {
             "name": "עוגת שוקולד מיוחדת",
@@ -162,3 +206,17 @@ class TestIntegration:
             headers=headers
         )
         assert comment_response.status_code == 200, f"Failed to add comment: {comment_response.json()}"
+
+        # Reply to it and read the thread back in tree order
+        comment_id = client.get(f"/recipes/{recipe_id}/comments").json()[0]["id"]
+        reply_response = client.post(
+            f"/recipes/{recipe_id}/comments/{comment_id}/reply",
+            json={**comment_data, "content": "תודה!"},
+            headers=headers
+        )
+        assert reply_response.status_code == 200, f"Failed to reply: {reply_response.json()}"
+        comments = client.get(f"/recipes/{recipe_id}/comments", params={"limit": 1, "replies": 0}).json()
+        assert [(c["id"], c["reply_count"]) for c in comments] == [(comment_id, 1)]
+        replies = client.get(f"/recipes/{recipe_id}/comments/{comment_id}/replies", params={"cursor": comments[0]["replies_cursor"]})
+        assert [r["content"] for r in replies.json()] == ["תודה!"]
+
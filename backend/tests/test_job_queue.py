@@ -0,0 +1,81 @@
+import pytest
+import threading
+from services.job_queue import FAILED, SUCCEEDED, SUPERSEDED, JobQueue, current_job
+
+class TestJobQueue:
+    @pytest.fixture
+    def queue(self):
+        queue = JobQueue(workers=2, max_attempts=3, backoff=0.01)
+        yield queue
+        queue.shutdown(wait=True)
+
+    def test_runs_job(self, queue):
+        job = queue.enqueue("add", lambda a, b: a + b, 2, 3)
+        queue.wait(job.id, timeout=5)
+        assert job.status == SUCCEEDED
+        assert job.result == 5
+        assert job.to_dict()["attempts"] == 1
+
+    def test_runs_coroutine_job(self, queue):
+        async def double(x):
+            return x * 2
+
+        job = queue.enqueue("double", double, 21)
+        queue.wait(job.id, timeout=5)
+        assert job.result == 42
+
+    def test_retries_with_backoff(self, queue):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("USDA unavailable")
+            return "ok"
+
+        job = queue.enqueue("flaky", flaky)
+        queue.wait(job.id, timeout=5)
+        assert job.status == SUCCEEDED
+        assert job.attempts == 3
+        assert job.error is None
+
+    def test_fails_after_max_attempts(self, queue):
+        def broken():
+            raise ValueError("boom")
+
+        job = queue.enqueue("broken", broken)
+        queue.wait(job.id, timeout=5)
+        assert job.status == FAILED
+        assert job.attempts == 3
+        assert job.error == "boom"
+
+    def test_newer_job_supersedes_pending_one(self, queue):
+        release = threading.Event()
+        seen = []
+
+        def slow():
+            release.wait(5)
+            seen.append(current_job().superseded)
+
+        first = queue.enqueue("slow", slow, key="nutrition:1")
+        second = queue.enqueue("slow", slow, key="nutrition:1")
+        release.set()
+        queue.wait(second.id, timeout=5)
+        queue.wait(first.id, timeout=5)
+
+        assert first.status == SUPERSEDED
+        assert second.status == SUCCEEDED
+        assert seen.count(False) == 1
+
+    def test_unknown_job(self, queue):
+        assert queue.get("missing") is None
+
+    def test_periodic_schedule(self, queue):
+        runs = threading.Semaphore(0)
+        queue.every("tick", 0.02, runs.release, first_delay=0)
+        assert all(runs.acquire(timeout=5) for _ in range(3))
+
+        queue.cancel_schedule("tick")
+        while runs.acquire(timeout=0.2):
+            pass
+        assert not runs.acquire(timeout=0.1)
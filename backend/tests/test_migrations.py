@@ -0,0 +1,115 @@
+import os
+import pytest
+from unittest.mock import Mock
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, select, text
+from db.migrations import upgrade_database, without_statement_timeout
+from models.base import Base
+from models.notification_model import Notification
+from models.recipe_model import Comment, CookingTimer, Ingredient, NutritionalInfo, Rating, Recipe, SharedRecipe
+from models.user_model import User
+# Every model, so the comparison below covers the whole schema.
+from models import image_model, nutrition_model, ranking_model, search_model  # noqa: F401
+
+# Filters the request handlers and services run on every page view.
+HOT_QUERIES = {
+    "recipe ingredients": select(Ingredient).where(Ingredient.recipe_id == 1),
+    "recipe nutrition": select(NutritionalInfo).where(NutritionalInfo.recipe_id == 1),
+    "recipe timers": select(CookingTimer).where(CookingTimer.recipe_id == 1).order_by(CookingTimer.step_number),
+    "recipe comments": select(Comment).where(Comment.recipe_id == 1),
+    "comment replies": select(Comment).where(Comment.parent_id == 1),
+    "comment threads": select(Comment).where(Comment.recipe_id == 1, Comment.depth == 0, Comment.path > "0000000001").order_by(Comment.path),
+    "thread replies": select(Comment).where(
+        Comment.recipe_id == 1, Comment.depth.between(1, 3), Comment.path > "0000000001", Comment.path < "0000000001:"
+    ).order_by(Comment.path),
+    "user vote": select(Rating).where(Rating.recipe_id == 1, Rating.user_id == 2),
+    "shared with user": select(SharedRecipe).where(SharedRecipe.user_id == 1),
+    "existing share": select(SharedRecipe).where(SharedRecipe.recipe_id == 1, SharedRecipe.user_id == 2),
+    "recipe shares": select(SharedRecipe).where(SharedRecipe.recipe_id == 1),
+    "user notifications": select(Notification).where(Notification.user_id == 1).order_by(Notification.created_at.desc()),
+    "read notifications": select(Notification.id).where(Notification.user_id == 1, Notification.is_read == True),
+    "notification page": select(Notification).where(Notification.user_id == 1).order_by(Notification.created_at.desc(), Notification.id.desc()),
+    "user recipes": select(Recipe).where(Recipe.creator_id == 1),
+    "user by username": select(User).where(User.username == "chef"),
+}
+
+def sequential_scans(connection, statement) -> list:
+    """Plan lines of statement that read a whole table."""
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        # Tiny test tables are cheaper to scan; only report scans no index could avoid.
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+        return [line for line in plan if "Seq Scan" in line]
+    plan = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [line for line in plan if line.startswith("SCAN ") and "INDEX" not in line]
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    # PLAN_DATABASE_URL runs the plan checks against an empty PostgreSQL database instead.
+    engine = create_engine(os.getenv("PLAN_DATABASE_URL", f"sqlite:///{tmp_path / 'migrated.db'}"))
+    upgrade_database(engine)
+    yield engine
+    engine.dispose()
+
+def schema_differences(engine) -> list:
+    with engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+def test_migrations_build_the_model_schema(migrated_engine):
+    assert schema_differences(migrated_engine) == []
+    upgrade_database(migrated_engine)  # Nothing left to apply.
+
+def test_create_all_databases_are_adopted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # As built before the hot-query indexes existed.
+        connection.execute(text("DROP INDEX ix_ingredients_recipe_id"))
+        connection.execute(text("DROP INDEX uq_shared_recipes_user_recipe"))
+        connection.execute(text("INSERT INTO shared_recipes (recipe_id, user_id) VALUES (1, 2), (1, 2), (3, 2)"))
+
+    upgrade_database(engine)
+    assert schema_differences(engine) == []
+    assert "ix_ingredients_recipe_id" in {index["name"] for index in inspect(engine).get_indexes("ingredients")}
+    with engine.connect() as connection:
+        # Duplicate shares are merged before the unique index is built.
+        assert connection.execute(text("SELECT id, recipe_id FROM shared_recipes ORDER BY id")).all() == [(1, 1), (3, 3)]
+
+def test_comment_paths_are_backfilled(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'comments.db'}")
+    upgrade_database(engine, "0002")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO comments (id, recipe_id, user_id, username, content, timestamp, parent_id) VALUES "
+            "(1, 1, 1, 'a', 'x', 't', NULL), (2, 1, 1, 'a', 'x', 't', 1), (3, 1, 1, 'a', 'x', 't', 2), "
+            "(4, 1, 1, 'a', 'x', 't', 1), (5, 1, 1, 'a', 'x', 't', 99)"
+        ))
+
+    upgrade_database(engine)
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT id, path, depth, reply_count FROM comments ORDER BY path")).all()
+    assert rows == [
+        (1, "0000000001", 0, 2),
+        (2, "00000000010000000002", 1, 1),
+        (3, "000000000100000000020000000003", 2, 0),
+        (4, "00000000010000000004", 1, 0),
+        (5, "0000000005", 0, 0),  # Its parent is gone.
+    ]
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_queries_use_indexes(migrated_engine, name):
+    with migrated_engine.begin() as connection:
+        assert sequential_scans(connection, HOT_QUERIES[name]) == []
+
+def test_sequential_scans_are_detected(migrated_engine):
+    with migrated_engine.begin() as connection:
+        assert sequential_scans(connection, select(Ingredient).where(Ingredient.unit == "g"))
+
+@pytest.mark.parametrize("dialect, statements", [("postgresql", ["SET LOCAL statement_timeout = 0"]), ("sqlite", [])])
+def test_migrations_lift_the_statement_timeout(dialect, statements):
+    connection = Mock()
+    connection.dialect.name = dialect
+    without_statement_timeout(connection)
+    assert [str(call.args[0]) for call in connection.execute.call_args_list] == statements
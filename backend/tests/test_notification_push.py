@@ -0,0 +1,104 @@
+import asyncio
+import json
+import queue
+import threading
+import pytest
+from services.notification_push import NotificationBroker, format_sse
+
+class FakeRedis:
+    """Just enough of the redis client for pub/sub on one channel."""
+
+    def __init__(self):
+        self.listeners = []
+
+    def publish(self, channel, data):
+        for listener in list(self.listeners):
+            listener.put({"type": "message", "channel": channel, "data": data})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        redis = self
+
+        class PubSub:
+            def __init__(self):
+                self.messages = queue.Queue()
+
+            def subscribe(self, channel):
+                redis.listeners.append(self.messages)
+
+            def get_message(self, timeout=0.0):
+                try:
+                    return self.messages.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+
+            def close(self):
+                if self.messages in redis.listeners:
+                    redis.listeners.remove(self.messages)
+
+        return PubSub()
+
+def test_format_sse():
+    assert format_sse("unread", {"unread": 2}) == 'event: unread\ndata: {"unread": 2}\n\n'
+
+@pytest.mark.asyncio
+async def test_events_reach_the_users_streams():
+    broker = NotificationBroker()
+    first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+    # Published from a worker thread, like the notification dispatcher.
+    thread = threading.Thread(target=broker.publish, args=(1, {"type": "unread", "unread": 3}))
+    thread.start()
+    thread.join()
+
+    assert await first.get(1) == {"type": "unread", "unread": 3}
+    assert await second.get(1) == {"type": "unread", "unread": 3}
+    assert await other.get(0.05) is None
+
+    first.close()
+    assert broker.subscriber_count(1) == 1
+    second.close()
+    other.close()
+    assert broker.subscriber_count() == 0
+
+@pytest.mark.asyncio
+async def test_slow_streams_keep_the_newest_events(monkeypatch):
+    monkeypatch.setattr("services.notification_push.NOTIFICATION_STREAM_QUEUE", 2)
+    broker = NotificationBroker()
+    subscription = broker.subscribe(1)
+    for unread in range(4):
+        broker.publish(1, {"type": "unread", "unread": unread})
+    await asyncio.sleep(0)
+    assert [(await subscription.get(1))["unread"] for _ in range(2)] == [2, 3]
+
+@pytest.mark.asyncio
+async def test_redis_reaches_every_worker():
+    redis = FakeRedis()
+    worker, other_worker = NotificationBroker(redis_client=redis), NotificationBroker(redis_client=redis)
+    subscription = other_worker.subscribe(7)
+    try:
+        for _ in range(100):  # The listener thread subscribes to the channel.
+            if redis.listeners:
+                break
+            await asyncio.sleep(0.01)
+        worker.publish(7, {"type": "unread", "unread": 1})
+        assert await subscription.get(2) == {"type": "unread", "unread": 1}
+    finally:
+        subscription.close()
+        other_worker.close()
+
+@pytest.mark.asyncio
+async def test_redis_outage_still_reaches_local_streams():
+    class DownRedis(FakeRedis):
+        def publish(self, channel, data):
+            raise ConnectionError("redis is down")
+
+        def pubsub(self, ignore_subscribe_messages=False):
+            raise ConnectionError("redis is down")
+
+    broker = NotificationBroker(redis_client=DownRedis())
+    subscription = broker.subscribe(1)
+    try:
+        broker.publish(1, {"type": "unread", "unread": 5})
+        assert json.dumps(await subscription.get(1)) == '{"type": "unread", "unread": 5}'
+    finally:
+        subscription.close()
+        broker.close()
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import select
+from models.notification_model import Notification
+from models.recipe_model import Recipe  # noqa: F401 - registers the models User relates to
+from models.user_model import User
+from services.notification_retention import (
+    ensure_partitions,
+    is_partitioned,
+    maintain_notifications_job,
+    next_month,
+    partition_ddl,
+    partition_month,
+    partition_name,
+    purge_notifications
+)
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+def test_partition_names_and_bounds():
+    assert next_month(datetime(2026, 12, 1)) == datetime(2027, 1, 1)
+    assert partition_name(datetime(2026, 2, 1)) == "notifications_p202602"
+    assert partition_month("notifications_p202602") == datetime(2026, 2, 1)
+    assert partition_month("notifications_default") is None
+    assert partition_ddl(datetime(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS notifications_p202612 PARTITION OF notifications "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+def test_expired_notifications_are_purged_in_batches(fresh_db):
+    for user_id in (1, 2):
+        fresh_db.add(User(id=user_id, first_name="a", last_name="b", username=f"u{user_id}", email=f"u{user_id}@x.com", password_hash="x"))
+    ages = [(1, 200, False), (1, 120, True), (1, 100, False), (2, 95, False), (1, 10, False), (2, 1, True)]
+    for user_id, days, is_read in ages:
+        fresh_db.add(Notification(user_id=user_id, message=f"{days}", is_read=is_read, created_at=NOW - timedelta(days=days)))
+    fresh_db.commit()
+    fresh_db.execute(User.__table__.update().where(User.id == 1).values(unread_notifications=3))
+    fresh_db.execute(User.__table__.update().where(User.id == 2).values(unread_notifications=1))
+    fresh_db.commit()
+
+    assert not is_partitioned(fresh_db)
+    assert purge_notifications(fresh_db, now=NOW, retention_days=90, batch_size=2) == 4
+    assert fresh_db.scalars(select(Notification.message).order_by(Notification.id)).all() == ["10", "1"]
+    # Only the unread notifications that went are taken off the counters.
+    assert fresh_db.execute(select(User.id, User.unread_notifications).order_by(User.id)).all() == [(1, 1), (2, 0)]
+    assert purge_notifications(fresh_db, now=NOW, retention_days=0) == 0
+
+class RecordingSession:
+    """Records the SQL that partition maintenance sends to PostgreSQL."""
+
+    def __init__(self, partitions, default_has_rows):
+        self.partitions = partitions
+        self.default_has_rows = default_has_rows
+        self.statements = []
+
+    def execute(self, statement):
+        sql = str(statement)
+        self.statements.append(sql)
+        # Only November has stray rows in the default partition.
+        return SimpleNamespace(
+            scalars=lambda: iter(self.partitions),
+            scalar=lambda: self.default_has_rows and "'2026-11-01'" in sql
+        )
+
+def test_partitions_take_their_rows_from_the_default_partition():
+    db = RecordingSession(["notifications_default", "notifications_p202610"], default_has_rows=True)
+    assert ensure_partitions(db, now=NOW, ahead=2) == ["notifications_p202611", "notifications_p202612"]
+    ddl = [sql for sql in db.statements if not sql.startswith("SELECT")]
+    month = "created_at >= '2026-11-01' AND created_at < '2026-12-01'"
+    assert ddl == [
+        "ALTER TABLE notifications DETACH PARTITION notifications_default",
+        partition_ddl(datetime(2026, 11, 1)),
+        f"INSERT INTO notifications_p202611 SELECT * FROM notifications_default WHERE {month}",
+        f"DELETE FROM notifications_default WHERE {month}",
+        "ALTER TABLE notifications ATTACH PARTITION notifications_default DEFAULT",
+        # No stray rows of December: created directly.
+        partition_ddl(datetime(2026, 12, 1)),
+    ]
+
+def test_purge_runs_when_partition_maintenance_fails(fresh_db, monkeypatch):
+    def fail(db):
+        raise RuntimeError("updated partition constraint for default partition would be violated")
+
+    monkeypatch.setattr("services.notification_retention.is_partitioned", lambda db: True)
+    monkeypatch.setattr("services.notification_retention.drop_expired_partitions", lambda db, cutoff: 0)
+    monkeypatch.setattr("services.notification_retention.ensure_partitions", fail)
+    fresh_db.add(Notification(user_id=None, message="old", is_read=True, created_at=datetime.utcnow() - timedelta(days=365)))
+    fresh_db.commit()
+
+    assert maintain_notifications_job(fresh_db.get_bind()) == 1
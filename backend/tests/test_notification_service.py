@@ -1,12 +1,21 @@
 import pytest
+from datetime import datetime, timedelta
 from unittest.mock import Mock
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from models.recipe_model import Recipe  # noqa: F401 - registers the models User relates to
+from models.user_model import User
 from services.notification_service import (
+    NOTIFICATION_COALESCE_WINDOW,
     create_notification,
+    dispatch_notifications,
+    enqueue_notification,
     get_user_notifications,
-    mark_notifications_as_read
+    encode_notification_cursor,
+    mark_notifications_as_read,
+    unread_counts
 )
-from models.notification_model import Notification
+from models.notification_model import Notification, NotificationEvent
 
 class TestNotificationService:
     @pytest.fixture
@@ -40,3 +49,118 @@ class TestNotificationService:
         
         mark_notifications_as_read(db_session, user_id)
         assert db_session.commit.called
+
+class TestNotificationOutbox:
+    def messages(self, fresh_db):
+        return sorted(tuple(row) for row in fresh_db.execute(select(Notification.user_id, Notification.message)))
+
+    def comment(self, fresh_db, actor, recipient=1):
+        enqueue_notification(
+            fresh_db, [recipient], "recipe_comment", actor=actor,
+            link="/recipes/7", group_key="recipe_comment:7", recipe="שקשוקה"
+        )
+
+    def test_events_wait_for_the_transaction_and_dispatcher(self, fresh_db):
+        enqueue_notification(fresh_db, [2], "recipe_shared", link="/recipes/7", recipe="שקשוקה")
+        fresh_db.commit()
+        assert fresh_db.scalars(select(Notification)).all() == []
+
+        assert dispatch_notifications(fresh_db) == 1
+        notification = fresh_db.scalars(select(Notification)).one()
+        assert (notification.user_id, notification.message, notification.link) == (2, "המתכון שקשוקה שותף איתך!", "/recipes/7")
+        assert fresh_db.scalars(select(NotificationEvent)).all() == []
+
+    def test_repeated_events_are_coalesced(self, fresh_db):
+        for actor in ["dana", "avi", "dana", "noa"]:
+            self.comment(fresh_db, actor)
+        self.comment(fresh_db, "avi", recipient=3)
+        fresh_db.commit()
+
+        # Grouped events wait for the rest of their burst.
+        assert dispatch_notifications(fresh_db) == 0
+        later = datetime.utcnow() + timedelta(seconds=NOTIFICATION_COALESCE_WINDOW + 1)
+        assert dispatch_notifications(fresh_db, now=later) == 2
+        assert self.messages(fresh_db) == [
+            (1, "💬 noa ועוד 2 הגיבו על המתכון שלך שקשוקה!"),
+            (3, "💬 avi הגיב על המתכון שלך שקשוקה!"),
+        ]
+
+    def test_bursts_larger_than_a_batch_stay_one_notification(self, fresh_db):
+        for actor in ["dana", "avi", "noa", "eli", "tal"]:
+            self.comment(fresh_db, actor)
+        self.comment(fresh_db, "avi", recipient=3)
+        fresh_db.commit()
+
+        later = datetime.utcnow() + timedelta(seconds=NOTIFICATION_COALESCE_WINDOW + 1)
+        assert dispatch_notifications(fresh_db, now=later, batch_size=2) == 2
+        assert self.messages(fresh_db) == [
+            (1, "💬 tal ועוד 4 הגיבו על המתכון שלך שקשוקה!"),
+            (3, "💬 avi הגיב על המתכון שלך שקשוקה!"),
+        ]
+        assert fresh_db.scalars(select(NotificationEvent)).all() == []
+
+    def test_fan_out_to_many_recipients(self, fresh_db):
+        enqueue_notification(fresh_db, [1, 2, 3, 2], "message", link="/recipes/7", message="עדכון")
+        assert enqueue_notification(fresh_db, [], "message", message="nobody") is None
+        fresh_db.commit()
+
+        assert dispatch_notifications(fresh_db) == 3
+        assert self.messages(fresh_db) == [(1, "עדכון"), (2, "עדכון"), (3, "עדכון")]
+
+    def test_unknown_kinds_are_rejected(self, fresh_db):
+        with pytest.raises(ValueError):
+            enqueue_notification(fresh_db, [1], "nope")
+
+    def test_unread_counters_are_maintained_and_pushed(self, fresh_db, monkeypatch):
+        pushed = []
+        monkeypatch.setattr("services.notification_service.notification_broker.publish", lambda user_id, event: pushed.append((user_id, event)))
+        for user_id in (1, 2):
+            fresh_db.add(User(id=user_id, first_name="a", last_name="b", username=f"u{user_id}", email=f"u{user_id}@x.com", password_hash="x"))
+        enqueue_notification(fresh_db, [1, 2], "message", message="עדכון")
+        enqueue_notification(fresh_db, [1], "recipe_shared", recipe="שקשוקה")
+        fresh_db.commit()
+
+        dispatch_notifications(fresh_db)
+        assert unread_counts(fresh_db, [1, 2]) == {1: 2, 2: 1}
+        assert sorted((user_id, event["unread"]) for user_id, event in pushed) == [(1, 2), (1, 2), (2, 1)]  # Counts after the batch.
+        assert {event["notification"]["message"] for _, event in pushed} == {"עדכון", "המתכון שקשוקה שותף איתך!"}
+
+        mark_notifications_as_read(fresh_db, 1)
+        assert unread_counts(fresh_db, [1, 2]) == {1: 0, 2: 1}
+        assert pushed[-1] == (1, {"type": "unread", "unread": 0})
+
+class TestNotificationReads:
+    @pytest.fixture
+    def db_session(self, fresh_db):
+        fresh_db.add(User(id=1, first_name="a", last_name="b", username="u1", email="u1@x.com", password_hash="x"))
+        start = datetime(2026, 1, 1)
+        # Two notifications share a timestamp, so pages must break ties by id.
+        for i, minutes in enumerate([0, 1, 1, 2, 3]):
+            fresh_db.add(Notification(user_id=1, message=f"n{i}", is_read=i < 2, created_at=start + timedelta(minutes=minutes)))
+        fresh_db.commit()
+        fresh_db.execute(User.__table__.update().values(unread_notifications=3))
+        return fresh_db
+
+    def page_through(self, db_session, **kwargs):
+        pages, cursor = [], None
+        while True:
+            page = get_user_notifications(db_session, 1, limit=2, cursor=cursor, **kwargs)
+            if not page:
+                return pages
+            pages.append([n.message for n in page])
+            cursor = encode_notification_cursor(page[-1])
+
+    def test_keyset_pages_newest_first(self, db_session):
+        assert self.page_through(db_session) == [["n4", "n3"], ["n2", "n1"], ["n0"]]
+        assert self.page_through(db_session, unread_only=True) == [["n4", "n3"], ["n2"]]
+        with pytest.raises(ValueError):
+            get_user_notifications(db_session, 1, cursor="bogus")
+
+    def test_bulk_mark_read(self, db_session):
+        ids = [n.id for n in get_user_notifications(db_session, 1, unread_only=True)]
+        # Already-read notifications are not counted again.
+        assert mark_notifications_as_read(db_session, 1, ids=ids[:1] + [1]) == 1
+        assert unread_counts(db_session, [1]) == {1: 2}
+        assert mark_notifications_as_read(db_session, 1) == 2
+        assert unread_counts(db_session, [1]) == {1: 0}
+        assert get_user_notifications(db_session, 1, unread_only=True) == []
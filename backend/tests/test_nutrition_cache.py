@@ -0,0 +1,82 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy.orm import sessionmaker
+from models.nutrition_model import NutritionLookup
+from services.nutrition_cache import MISSING, NutritionCache, normalize_ingredient_name
+from services.ai_service import NutritionNotFoundError, calculate_nutritional_info
+
+EGGS = {"calories": 143, "protein": 12.6, "carbs": 0.7, "fats": 9.5}
+
+class TestNutritionCache:
+    @pytest.fixture
+    def session_factory(self, fresh_db):
+        return sessionmaker(bind=fresh_db.get_bind())
+
+    def test_normalize_ingredient_name(self):
+        assert normalize_ingredient_name("  Butter   Unsalted ") == "butter unsalted"
+        assert normalize_ingredient_name("ביצים") == "ביצים"
+
+    def test_miss_then_memory_hit(self, session_factory):
+        cache = NutritionCache(session_factory)
+        assert cache.get("ביצים") is MISSING
+        cache.set("ביצים", EGGS)
+        assert cache.get(" ביצים ") == EGGS
+
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_persists_across_instances(self, session_factory):
+        NutritionCache(session_factory).set("מלח", {"calories": 0, "protein": 0, "carbs": 0, "fats": 0})
+
+        cache = NutritionCache(session_factory)
+        assert cache.get("מלח") == {"calories": 0, "protein": 0, "carbs": 0, "fats": 0}
+        assert cache.stats()["db_hits"] == 1
+
+    def test_negative_caching(self, session_factory):
+        cache = NutritionCache(session_factory)
+        cache.set("תבלין סודי", None)
+        assert cache.get("תבלין סודי") is None
+        assert NutritionCache(session_factory).get("תבלין סודי") is None
+
+    def test_expired_entries_are_misses(self, session_factory):
+        db = session_factory()
+        db.add(NutritionLookup(name="חמאה", found=True, calories=717, protein=0.9, carbs=0.1, fats=81,
+                               fetched_at=datetime.utcnow() - timedelta(days=2)))
+        db.commit()
+        db.close()
+
+        assert NutritionCache(session_factory, ttl=3600).get("חמאה") is MISSING
+        assert NutritionCache(session_factory, ttl=7 * 24 * 3600).get("חמאה")["calories"] == 717
+
+    def test_lru_eviction(self):
+        cache = NutritionCache(max_entries=2)
+        cache.set("a", EGGS)
+        cache.set("b", EGGS)
+        cache.get("a")
+        cache.set("c", EGGS)
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == EGGS
+
+    def test_calculate_nutritional_info_fetches_once(self, session_factory):
+        cache = NutritionCache(session_factory)
+        ingredients = [
+            {"name": "ביצים", "quantity": 2, "unit": "יחידות"},
+            {"name": "אבקת קסם", "quantity": 1, "unit": "כפית"},
+        ]
+
+        def fake_fetch(name, quantity, unit):
+            if name == "אבקת קסם":
+                raise NutritionNotFoundError("No nutritional data found")
+            return EGGS
+
+        with patch("services.ai_service.nutrition_cache", cache), \
+             patch("services.ai_service.fetch_nutritional_info", side_effect=fake_fetch) as mock_fetch:
+            first = calculate_nutritional_info(ingredients, 1)
+            second = calculate_nutritional_info(ingredients, 1)
+
+        assert first == second
+        assert first["calories"] == 143
+        assert mock_fetch.call_count == 2
@@ -0,0 +1,162 @@
+import asyncio
+import httpx
+import pytest
+import threading
+from services.job_queue import SUCCEEDED, JobQueue
+from services.nutrition_cache import NutritionCache
+from services.nutrition_client import (
+    AsyncNutritionClient,
+    NutritionNotFoundError,
+    StubNutritionBackend,
+    StubTranslationBackend,
+    USDABackend
+)
+
+FOODS = {
+    "eggs": {"calories": 143, "protein": 12.6, "carbs": 0.7, "fats": 9.5},
+    "butter": {"calories": 717, "protein": 0.9, "carbs": 0.1, "fats": 81},
+    "salt": {"calories": 0, "protein": 0, "carbs": 0, "fats": 0},
+}
+TRANSLATIONS = {"ביצים": "eggs", "חמאה": "butter", "מלח": "salt"}
+
+class SlowBackend(StubNutritionBackend):
+    """Stub backend that records how many lookups run at the same time."""
+
+    def __init__(self, foods, delay=0.01):
+        super().__init__(foods)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.pools = set()
+        self._lock = threading.Lock()  # Callers may be on several loops.
+
+    async def lookup(self, http, name):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.pools.add(id(http))
+        try:
+            await asyncio.sleep(self.delay)
+            return await super().lookup(http, name)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+class TestAsyncNutritionClient:
+    @pytest.mark.asyncio
+    async def test_calculate_with_stubs(self):
+        client = AsyncNutritionClient(StubTranslationBackend(TRANSLATIONS), StubNutritionBackend(FOODS))
+        ingredients = [
+            {"name": "ביצים", "quantity": 5, "unit": "יחידות"},
+            {"name": "חמאה", "quantity": 1, "unit": "כף"},
+            {"name": "אבקת קסם", "quantity": 1, "unit": "כפית"},
+        ]
+        result = await client.calculate(ingredients, 2)
+        await client.aclose()
+        assert result == {"calories": 430.0, "protein": 6.75, "carbs": 0.4, "fats": 45.25}
+
+    @pytest.mark.asyncio
+    async def test_fan_out_is_bounded(self):
+        foods = {f"food {i}": FOODS["eggs"] for i in range(12)}
+        backend = SlowBackend(foods)
+        client = AsyncNutritionClient(StubTranslationBackend(), backend, max_concurrency=3)
+        ingredients = [{"name": f"food {i}", "quantity": 1, "unit": "g"} for i in range(12)]
+
+        await client.calculate(ingredients, 1)
+        await client.aclose()
+        assert backend.calls == 12
+        assert backend.max_in_flight == 3
+
+    def test_concurrent_jobs_share_the_bound(self):
+        # Each job runs on its own event loop in a queue worker thread.
+        foods = {f"food {i}": FOODS["eggs"] for i in range(12)}
+        backend = SlowBackend(foods)
+        client = AsyncNutritionClient(StubTranslationBackend(), backend, max_concurrency=2)
+        ingredients = [{"name": f"food {i}", "quantity": 1, "unit": "g"} for i in range(12)]
+        queue = JobQueue(workers=4, max_attempts=1)
+        try:
+            jobs = [queue.enqueue("nutrition", client.calculate, ingredients, 1, strict=True) for _ in range(4)]
+            for job in jobs:
+                queue.wait(job.id, timeout=10)
+        finally:
+            queue.shutdown(wait=True)
+        assert [job.status for job in jobs] == [SUCCEEDED] * 4
+        assert backend.calls == 48
+        assert backend.max_in_flight == 2
+        assert len(backend.pools) == 1
+
+        asyncio.run(client.aclose())
+        assert client._http is None and client._thread is None
+
+    @pytest.mark.asyncio
+    async def test_timeout_skips_ingredient(self):
+        client = AsyncNutritionClient(StubTranslationBackend(), SlowBackend(FOODS, delay=1), timeout=0.05)
+        assert await client.fetch("eggs") is None
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_uses_cache(self):
+        cache = NutritionCache()
+        backend = SlowBackend(FOODS, delay=0)
+        client = AsyncNutritionClient(StubTranslationBackend(TRANSLATIONS), backend, cache=cache)
+        ingredients = [{"name": "מלח", "quantity": 1, "unit": "כפית"}, {"name": "לא קיים", "quantity": 1, "unit": "g"}]
+
+        await client.calculate(ingredients, 1)
+        await client.calculate(ingredients, 1)
+        await client.aclose()
+        assert backend.calls == 2
+        assert cache.get("לא קיים") is None
+
+    @pytest.mark.asyncio
+    async def test_cache_runs_off_the_event_loop(self):
+        class RecordingCache(NutritionCache):
+            """Records table reads and writes made on an event loop thread."""
+
+            def __init__(self):
+                super().__init__()
+                self.on_loop = []
+
+            def _record(self, key):
+                try:
+                    asyncio.get_running_loop()
+                    self.on_loop.append(key)
+                except RuntimeError:
+                    pass
+
+            def _load(self, key):
+                self._record(key)
+                return super()._load(key)
+
+            def _store(self, key, fetched_at, nutrition):
+                self._record(key)
+                return super()._store(key, fetched_at, nutrition)
+
+        cache = RecordingCache()
+        client = AsyncNutritionClient(StubTranslationBackend(TRANSLATIONS), StubNutritionBackend(FOODS), cache=cache)
+        await client.calculate([{"name": "מלח", "quantity": 1, "unit": "g"}, {"name": "לא קיים", "quantity": 1, "unit": "g"}], 1)
+        await client.aclose()
+        assert cache.on_loop == []
+
+    @pytest.mark.asyncio
+    async def test_usda_backend(self):
+        def handler(request):
+            if request.url.params["query"] == "eggs":
+                return httpx.Response(200, json={"foods": [{"foodNutrients": [
+                    {"nutrientName": "Energy", "value": 143},
+                    {"nutrientName": "Protein", "value": 12.6},
+                ]}]})
+            return httpx.Response(200, json={"foods": []})
+
+        client = AsyncNutritionClient(
+            StubTranslationBackend(TRANSLATIONS),
+            USDABackend(api_key="test", url="http://usda.local/search"),
+            transport=httpx.MockTransport(handler)
+        )
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            assert (await client.backend.lookup(http, "eggs"))["protein"] == 12.6
+            with pytest.raises(NutritionNotFoundError):
+                await client.backend.lookup(http, "unobtainium")
+        assert (await client.fetch("ביצים"))["calories"] == 143
+        await client.aclose()
@@ -0,0 +1,121 @@
+import random
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.pantry_service import (
+    WEIGHT_UNITS,
+    PantryIndex,
+    RecipePantry,
+    add_to_counter,
+    equal_to,
+    ingredient_tokens,
+    iter_bits,
+    subtract_counters
+)
+from services.recipe_import import import_recipes
+
+class TestBitsets:
+    def test_iter_bits(self):
+        assert list(iter_bits(0)) == []
+        assert list(iter_bits(1 << 3 | 1 << 9 | 1 << 1000)) == [3, 9, 1000]
+
+    def test_counters(self):
+        counts = {1: 0, 2: 0, 5: 0}
+        planes = []
+        for recipe_ids, amount in (({1, 2}, 4), ({2, 5}, 1), ({2}, 4), ({5}, 3)):
+            add_to_counter(planes, sum(1 << i for i in recipe_ids), amount)
+            for recipe_id in recipe_ids:
+                counts[recipe_id] += amount
+        universe = sum(1 << i for i in counts)
+        for recipe_id, count in counts.items():
+            assert equal_to(planes, count, universe) >> recipe_id & 1
+
+        totals = []
+        add_to_counter(totals, universe, 12)
+        missing = subtract_counters(totals, planes, universe)
+        assert [i for i in iter_bits(equal_to(missing, 3, universe))] == [2]
+        assert [i for i in iter_bits(equal_to(missing, 8, universe))] == [1, 5]
+
+class TestPantryIndex:
+    def test_ingredient_tokens(self):
+        assert ingredient_tokens("ביצים") == ingredient_tokens("ביצה") == ("ביצ",)
+        assert ingredient_tokens("שיני שום") == ("שיני", "שום")
+
+    def test_ranking_and_partial_names(self):
+        index = PantryIndex()
+        index.load([
+            (1, ["ביצים", "עגבניות", "שמן זית", "מלח"]),
+            (2, ["ביצה", "קמח", "סוכר לבן", "חמאה"]),
+            (3, ["אורז", "מים", "מלח"]),
+            (4, ["עגבניה", "מלפפון", "בצל", "מלח"]),
+        ])
+
+        results = index.match(["ביצים", "עגבנייה", "שמן"], max_missing=1)
+        # Only salt (a staple) is missing from the shakshuka.
+        assert [r["recipe_id"] for r in results] == [1]
+        assert results[0]["missing"] == ["מלח"]
+        assert results[0]["missing_weight"] == 0.25
+        assert results[0]["coverage"] == 0.9
+
+        # The other two miss two ingredients and a staple; ties are broken by id.
+        results = index.match(["ביצים", "עגבנייה", "שמן"], max_missing=2.25)
+        assert [r["recipe_id"] for r in results] == [1, 2, 4]
+        assert [r["missing_count"] for r in results] == [1, 3, 3]
+        assert index.match(["ביצים", "עגבנייה", "שמן"], max_missing=2.25, limit=1)[0]["recipe_id"] == 1
+        # Recipes that share nothing with the pantry are never suggested.
+        assert index.match(["שוקולד"], max_missing=5) == []
+
+    def test_incremental_updates(self):
+        index = PantryIndex()
+        index.load([(1, ["פסטה", "שמנת"])])
+        assert [r["recipe_id"] for r in index.match(["פסטה", "שמנת"], 0)] == [1]
+
+        index.add(2, ["פסטה", "שמנת", "מלח"])
+        index.add(1, ["פסטה", "פטריות"])
+        assert [r["recipe_id"] for r in index.match(["פסטה", "שמנת"], 0.25)] == [2]
+        index.remove(2)
+        assert index.match(["פסטה", "שמנת"], 0.25) == []
+        assert len(index) == 1
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        names = ["מלח", "שמן זית", "סוכר"] + [f"מרכיב {i}" for i in range(30)]
+        index = PantryIndex()
+        index.load([(recipe_id, rng.sample(names, rng.randint(1, 8))) for recipe_id in range(1, 400)])
+        for recipe_id in range(400, 500):
+            index.add(recipe_id, rng.sample(names, rng.randint(1, 8)))
+        for recipe_id in range(1, 500, 9):
+            index.remove(recipe_id)
+
+        for _ in range(20):
+            pantry = rng.sample(names, rng.randint(1, 12))
+            max_missing = rng.choice([0, 0.5, 1, 2])
+            covered = index.resolve(pantry)
+            expected = []
+            for recipe_id, keys in index.recipe_keys.items():
+                if not covered & set(keys):
+                    continue
+                total = sum(index.key_units[key] for key in keys)
+                missing = sum(index.key_units[key] for key in keys if key not in covered)
+                if missing <= max_missing * WEIGHT_UNITS:
+                    expected.append((missing, -total, recipe_id))
+            expected = [recipe_id for _, _, recipe_id in sorted(expected)[:25]]
+            assert [r["recipe_id"] for r in index.match(pantry, max_missing, limit=25)] == expected
+
+class TestRecipePantry:
+    def test_match_from_database(self, fresh_db):
+        pantry = RecipePantry()
+        import_recipes(fresh_db, enumerate([
+            {"name": "חביתה", "ingredients": [{"name": "ביצים", "quantity": 2}, {"name": "מלח", "quantity": 1}]},
+            {"name": "עוגה", "ingredients": [{"name": "ביצים", "quantity": 3}, {"name": "קמח", "quantity": 2}]},
+        ], start=1))
+
+        # The index is built from the Ingredient rows on first use.
+        assert [r["recipe_id"] for r in pantry.match(fresh_db, ["ביצה"], max_missing=1)] == [1, 2]
+
+        report = import_recipes(fresh_db, enumerate([
+            {"name": "ביצה קשה", "ingredients": [{"name": "ביצה", "quantity": 1}]},
+        ], start=1))
+        pantry.index_recipes(fresh_db, report.recipe_ids)
+        assert [r["recipe_id"] for r in pantry.match(fresh_db, ["ביצה"], max_missing=0)] == report.recipe_ids
+
+        pantry.remove_recipe(fresh_db, report.recipe_ids[0])
+        assert pantry.match(fresh_db, ["ביצה"], max_missing=0) == []
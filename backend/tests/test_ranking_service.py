@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from models.ranking_model import RecipeRanking
+from models.recipe_model import Comment, Recipe
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.ranking_service import (
+    RANKING_HALF_LIFE_DAYS,
+    backfill_rankings,
+    ranking_score,
+    rebuild_rankings,
+    refresh_ranking
+)
+from services.rating_service import apply_rating
+from services.recipe_import import import_recipes
+from services.recipe_service import encode_cursor, get_recipe_listing
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+class TestRankingScore:
+    def test_bayesian_average_needs_votes(self):
+        assert ranking_score(5, 1, 0, NOW) < ranking_score(4.8 * 500, 500, 0, NOW)
+        assert ranking_score(3, 1, 0, NOW) < ranking_score(0, 0, 0, NOW) < ranking_score(5, 1, 0, NOW)
+
+    def test_comments_and_recency(self):
+        assert ranking_score(40, 10, 8, NOW) > ranking_score(40, 10, 0, NOW)
+        assert ranking_score(40, 10, 0, NOW + timedelta(days=1)) > ranking_score(40, 10, 0, NOW)
+        # Half the quality, one half-life newer: a tie.
+        older = ranking_score(50, 10, 0, NOW)  # Bayesian average 4.25
+        newer = ranking_score(7.5, 10, 0, NOW + timedelta(days=RANKING_HALF_LIFE_DAYS))  # Bayesian average 2.125
+        assert newer == pytest.approx(older)
+
+class TestLeaderboard:
+    def import_recipes(self, fresh_db, count):
+        report = import_recipes(fresh_db, enumerate([{"name": f"מתכון {i}"} for i in range(count)], start=1))
+        return report.recipe_ids
+
+    def ranked_ids(self, fresh_db, **kwargs):
+        return [recipe.id for recipe in get_recipe_listing(fresh_db, sort_by="score", fields=["id"], **kwargs)]
+
+    def test_votes_and_comments_update_the_leaderboard(self, fresh_db):
+        one_vote, many_votes, commented = self.import_recipes(fresh_db, 3)
+        assert fresh_db.query(RecipeRanking).count() == 3
+
+        apply_rating(fresh_db, one_vote, 1, 5)
+        for user_id in range(1, 41):
+            apply_rating(fresh_db, many_votes, user_id, 5 if user_id % 5 else 4)
+        assert self.ranked_ids(fresh_db) == [many_votes, one_vote, commented]
+
+        for _ in range(3):
+            fresh_db.add(Comment(recipe_id=commented, user_id=1, username="u", content="!", timestamp=NOW.isoformat()))
+            fresh_db.commit()
+            refresh_ranking(fresh_db, commented, comment_delta=1)
+            fresh_db.commit()
+        assert fresh_db.get(RecipeRanking, commented).comment_count == 3
+        assert self.ranked_ids(fresh_db) == [many_votes, commented, one_vote]
+
+    def test_keyset_pages_read_the_score_index(self, fresh_db):
+        recipe_ids = self.import_recipes(fresh_db, 7)
+        for score, recipe_id in enumerate(recipe_ids):
+            apply_rating(fresh_db, recipe_id, 1, score % 5 + 1)
+        expected = self.ranked_ids(fresh_db)
+
+        seen, cursor = [], None
+        while True:
+            page = get_recipe_listing(fresh_db, sort_by="score", limit=3, cursor=cursor, fields=["id", "name"])
+            seen.extend(recipe.id for recipe in page)
+            if len(page) < 3:
+                break
+            cursor = encode_cursor(page[-1], "score")
+        assert seen == expected
+
+        plan = fresh_db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT recipe_id FROM recipe_rankings ORDER BY score DESC, recipe_id DESC LIMIT 10"
+        )).all()
+        assert any("ix_recipe_rankings_score" in row[-1] for row in plan)
+        assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+    def test_backfill_rebuild_and_delete(self, fresh_db):
+        fresh_db.add(Recipe(name="ישן", preparation_steps="", cooking_time=5, servings=1, categories="", rating_sum=9, rating_count=2))
+        fresh_db.commit()
+        assert backfill_rankings(fresh_db) == 1
+        assert backfill_rankings(fresh_db) == 0
+
+        ranking = fresh_db.query(RecipeRanking).one()
+        expected = ranking.score
+        fresh_db.execute(text("UPDATE recipe_rankings SET score = 0, comment_count = 5"))
+        fresh_db.commit()
+        assert rebuild_rankings(fresh_db) == 1
+        fresh_db.refresh(ranking)
+        assert (ranking.score, ranking.comment_count) == (pytest.approx(expected), 0)
+
+        fresh_db.delete(fresh_db.get(Recipe, ranking.recipe_id))
+        fresh_db.commit()
+        assert fresh_db.query(RecipeRanking).count() == 0
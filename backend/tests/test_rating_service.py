@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event, inspect, text
+from models.recipe_model import Rating, Recipe
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.rating_service import apply_rating, ensure_rating_schema, reconcile_ratings
+
+class TestRatingService:
+    @pytest.fixture
+    def recipe(self, fresh_db):
+        recipe = Recipe(name="שקשוקה", preparation_steps="", cooking_time=20, servings=2, categories="")
+        fresh_db.add(recipe)
+        fresh_db.commit()
+        return recipe
+
+    def test_new_and_changed_votes(self, fresh_db, recipe):
+        assert apply_rating(fresh_db, recipe.id, 1, 5) == {"rating": 5.0, "rating_count": 1}
+        assert apply_rating(fresh_db, recipe.id, 2, 2) == {"rating": 3.5, "rating_count": 2}
+        # Changing a vote applies the difference and keeps the count.
+        assert apply_rating(fresh_db, recipe.id, 2, 4) == {"rating": 4.5, "rating_count": 2}
+
+        assert fresh_db.query(Rating).filter(Rating.recipe_id == recipe.id).count() == 2
+        fresh_db.refresh(recipe)
+        assert (recipe.rating_sum, recipe.rating_count, recipe.rating) == (9, 2, 4.5)
+
+    def test_vote_does_not_read_other_votes(self, fresh_db, fresh_engine, recipe):
+        for user_id in range(1, 51):
+            apply_rating(fresh_db, recipe.id, user_id, 3)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(fresh_engine, "before_cursor_execute", listener)
+        try:
+            assert apply_rating(fresh_db, recipe.id, 51, 5)["rating_count"] == 51
+        finally:
+            event.remove(fresh_engine, "before_cursor_execute", listener)
+        assert not any("sum(" in statement.lower() or "count(" in statement.lower() for statement in statements)
+
+    def test_reconcile_repairs_drift(self, fresh_db, recipe):
+        apply_rating(fresh_db, recipe.id, 1, 4)
+        apply_rating(fresh_db, recipe.id, 2, 2)
+        fresh_db.execute(text("UPDATE recipes SET rating_sum = 40, rating_count = 7, rating = 1.0"))
+        fresh_db.commit()
+
+        assert reconcile_ratings(fresh_db) == 1
+        assert reconcile_ratings(fresh_db) == 0
+        fresh_db.refresh(recipe)
+        assert (recipe.rating_sum, recipe.rating_count, recipe.rating) == (6, 2, 3.0)
+
+    def test_ensure_rating_schema_upgrades_legacy_tables(self, fresh_engine):
+        with fresh_engine.begin() as connection:
+            connection.execute(text("CREATE TABLE recipes (id INTEGER PRIMARY KEY, name VARCHAR, rating FLOAT, rating_count INTEGER)"))
+            connection.execute(text("CREATE TABLE ratings (id INTEGER PRIMARY KEY, recipe_id INTEGER NOT NULL, user_id INTEGER NOT NULL, score INTEGER NOT NULL)"))
+            connection.execute(text("INSERT INTO recipes (id, name, rating, rating_count) VALUES (1, 'a', 0, 0)"))
+            # User 7 voted twice before votes were unique; the later vote wins.
+            connection.execute(text("INSERT INTO ratings (recipe_id, user_id, score) VALUES (1, 7, 1), (1, 7, 5), (1, 8, 3)"))
+
+        ensure_rating_schema(fresh_engine)
+        ensure_rating_schema(fresh_engine)
+
+        assert "uq_ratings_recipe_user" in {index["name"] for index in inspect(fresh_engine).get_indexes("ratings")}
+        with fresh_engine.connect() as connection:
+            assert connection.execute(text("SELECT rating_sum, rating_count, rating FROM recipes")).one() == (8, 2, 4.0)
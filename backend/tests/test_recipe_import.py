@@ -0,0 +1,92 @@
+import io
+import json
+from unittest.mock import patch
+from sqlalchemy.orm import sessionmaker
+from models.recipe_model import Recipe, Ingredient, NutritionalInfo, CookingTimer
+from services.recipe_import import import_recipe_file, import_recipes, iter_jsonl, main
+from services.seed_data import load_seed_data
+
+def recipe_row(name, **overrides):
+    row = {
+        "name": name,
+        "preparation_steps": "1. ערבב 2. אפה",
+        "cooking_time": 30,
+        "servings": 4,
+        "categories": "אפייה",
+        "tags": "חלבי",
+        "ingredients": [{"name": "קמח", "quantity": 2, "unit": "כוסות"}, {"name": "ביצים", "quantity": 3, "unit": "יחידות"}],
+        "timers": [{"step_number": 2, "duration": 1800, "label": "אפייה"}],
+        "nutrition": {"calories": 250, "protein": 8, "carbs": 40, "fats": 6},
+    }
+    row.update(overrides)
+    return row
+
+class TestRecipeImport:
+    def test_import_jsonl_in_batches(self, fresh_db):
+        lines = "\n".join(json.dumps(recipe_row(f"עוגה {i}")) for i in range(7))
+        report = import_recipes(fresh_db, iter_jsonl(io.StringIO(lines)), creator_id=1, batch_size=3)
+
+        assert report.to_dict() == {"imported": 7, "failed": 0, "errors": []}
+        assert fresh_db.query(Recipe).count() == 7
+        assert fresh_db.query(Ingredient).count() == 14
+        assert fresh_db.query(CookingTimer).count() == 7
+        assert fresh_db.query(NutritionalInfo).count() == 7
+
+        recipe = fresh_db.query(Recipe).filter(Recipe.name == "עוגה 4").one()
+        assert recipe.creator_id == 1
+        assert recipe.image_url == "/static/default-recipe.jpg"
+        assert [ing.name for ing in recipe.ingredients] == ["קמח", "ביצים"]
+        assert recipe.nutritional_info.calories == 250
+
+    def test_bad_rows_are_reported(self, fresh_db):
+        lines = "\n".join([
+            json.dumps(recipe_row("טוב")),
+            "{not json",
+            json.dumps(recipe_row("")),
+            json.dumps(recipe_row("כמות שלילית", ingredients=[{"name": "קמח", "quantity": -1, "unit": "g"}])),
+            "",
+            json.dumps(recipe_row("גם טוב", servings="4")),
+        ])
+        report = import_recipes(fresh_db, iter_jsonl(io.StringIO(lines)), batch_size=2)
+
+        assert len(report.recipe_ids) == 2
+        assert [error["line"] for error in report.errors] == [2, 3, 4]
+        assert fresh_db.query(Recipe).count() == 2
+
+    def test_database_errors_only_drop_the_failing_row(self, fresh_db):
+        rows = [(1, recipe_row("א")), (2, recipe_row("ב", tags=["not", "a", "string"])), (3, recipe_row("ג"))]
+        report = import_recipes(fresh_db, rows, batch_size=10)
+
+        assert len(report.recipe_ids) == 2
+        assert [error["line"] for error in report.errors] == [2]
+        assert {r.name for r in fresh_db.query(Recipe)} == {"א", "ג"}
+
+    def test_import_csv_file(self, fresh_db):
+        csv_text = (
+            "name,cooking_time,servings,categories,ingredients,timers\n"
+            "סלט,10,2,סלטים,\"[{\"\"name\"\": \"\"עגבניה\"\", \"\"quantity\"\": 2, \"\"unit\"\": \"\"יחידות\"\"}]\",\n"
+            ",10,2,סלטים,,\n"
+        )
+        report = import_recipe_file(fresh_db, io.BytesIO(csv_text.encode("utf-8")), "recipes.csv")
+
+        assert len(report.recipe_ids) == 1
+        assert [error["line"] for error in report.errors] == [3]
+        assert fresh_db.query(Ingredient).one().name == "עגבניה"
+
+    def test_cli(self, fresh_db, tmp_path):
+        path = tmp_path / "recipes.jsonl"
+        path.write_text(json.dumps(recipe_row("פסטה")) + "\n", encoding="utf-8")
+        factory = sessionmaker(bind=fresh_db.get_bind())
+
+        with patch("db.database.SessionLocal", factory), patch("db.database.init_db"):
+            assert main([str(path), "--creator-id", "5"]) == 0
+        assert fresh_db.query(Recipe).one().creator_id == 5
+
+    def test_seed_data_uses_importer(self, fresh_db):
+        with patch("services.seed_data.init_db"):
+            load_seed_data(fresh_db)
+
+        recipes = fresh_db.query(Recipe).all()
+        assert len(recipes) >= 5
+        assert all(r.image_url.startswith("/static/") and r.nutritional_info for r in recipes)
+        assert fresh_db.query(CookingTimer).count() > 0
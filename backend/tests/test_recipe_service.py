@@ -1,7 +1,18 @@
 import pytest
 from unittest.mock import Mock, patch
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from services.recipe_service import create_recipe, filter_recipes
+from services.recipe_service import (
+    SUMMARY_FIELDS,
+    compute_recipe_nutrition,
+    create_recipe,
+    encode_cursor,
+    filter_recipes,
+    get_recipe_listing,
+    parse_listing_fields,
+    save_recipe_nutrition,
+    serialize_recipe_listing
+)
 from models.recipe_model import Recipe, Ingredient, NutritionalInfo, CookingTimer
 
 class TestRecipeService:
@@ -59,3 +70,120 @@ class TestRecipeService:
         
         result = filter_recipes(db_session, category="אפייה")
         assert len(result) == 2
+
+    def test_filter_recipes_pagination(self, db_session):
+        # skip/limit are applied to the query
+        filter_recipes(db_session, skip=20, limit=10)
+        db_session.query.return_value.offset.assert_called_with(20)
+        db_session.query.return_value.offset.return_value.limit.assert_called_with(10)
+
+
+class TestRecipeListing:
+    def add_recipes(self, db_session, count):
+        # Insert recipes that each have ingredients, nutrition and timers
+        for i in range(count):
+            recipe = Recipe(name=f"מתכון {i}", preparation_steps="1. ערבב", cooking_time=10, servings=2, categories="אפייה", tags="מתוק", rating=float(i % 5))
+            recipe.ingredients = [Ingredient(name="קמח", quantity=1, unit="cup"), Ingredient(name="סוכר", quantity=2, unit="cup")]
+            recipe.nutritional_info = NutritionalInfo(calories=100, protein=1, carbs=20, fats=3)
+            recipe.cooking_timers = [CookingTimer(step_number=1, duration=60, label="ערבוב")]
+            db_session.add(recipe)
+        db_session.flush()
+        db_session.expire_all()
+
+    def capture_statements(self, db_session, fields=None):
+        statements = []
+        engine = db_session.get_bind()
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            recipes = get_recipe_listing(db_session, fields=fields)
+            payload = [serialize_recipe_listing(r, fields) for r in recipes]
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return statements, payload
+
+    def count_listing_statements(self, db_session):
+        statements, payload = self.capture_statements(db_session)
+        return len(statements), payload
+
+    def test_listing_statement_count_is_flat(self, db_session):
+        self.add_recipes(db_session, 2)
+        small_count, small_payload = self.count_listing_statements(db_session)
+
+        self.add_recipes(db_session, 20)
+        large_count, large_payload = self.count_listing_statements(db_session)
+
+        assert len(small_payload) == 2
+        assert len(large_payload) == 22
+        assert small_count == large_count == 3
+
+    def test_listing_payload(self, db_session):
+        self.add_recipes(db_session, 1)
+        _, payload = self.count_listing_statements(db_session)
+
+        recipe = payload[0]
+        assert [ing["name"] for ing in recipe["ingredients"]] == ["קמח", "סוכר"]
+        assert recipe["nutritional_info"]["calories"] == 100
+        assert recipe["timers"] == [{"step_number": 1, "duration": 60, "label": "ערבוב"}]
+
+    def test_keyset_pagination(self, db_session):
+        self.add_recipes(db_session, 7)
+        expected = [r.id for r in get_recipe_listing(db_session)]
+
+        seen = []
+        cursor = None
+        while True:
+            page = get_recipe_listing(db_session, limit=3, cursor=cursor, fields=SUMMARY_FIELDS)
+            seen.extend(r.id for r in page)
+            if len(page) < 3:
+                break
+            cursor = encode_cursor(page[-1])
+
+        assert seen == expected
+
+    def test_invalid_cursor(self, db_session):
+        with pytest.raises(ValueError):
+            get_recipe_listing(db_session, cursor="not-a-cursor")
+
+    def test_summary_never_reads_preparation_steps(self, db_session):
+        self.add_recipes(db_session, 3)
+        statements, payload = self.capture_statements(db_session, fields=SUMMARY_FIELDS)
+
+        assert len(statements) == 1
+        assert "preparation_steps" not in statements[0]
+        assert set(payload[0]) == {"id", "name", "image_url", "images", "rating"}
+
+    def test_parse_listing_fields(self):
+        assert parse_listing_fields("id, name") == ["id", "name"]
+        assert "timers" in parse_listing_fields(None)
+        with pytest.raises(ValueError):
+            parse_listing_fields("id,password_hash")
+
+
+class TestRecipeNutrition:
+    def test_save_recipe_nutrition_upserts(self, db_session):
+        recipe = Recipe(name="פשטידה", preparation_steps="1. אפה", cooking_time=30, servings=4, categories="אפייה")
+        db_session.add(recipe)
+        db_session.flush()
+
+        save_recipe_nutrition(db_session, recipe.id, {"calories": 100, "protein": 5, "carbs": 10, "fats": 2})
+        save_recipe_nutrition(db_session, recipe.id, {"calories": 120, "protein": 6, "carbs": 11, "fats": 3})
+
+        rows = db_session.query(NutritionalInfo).filter(NutritionalInfo.recipe_id == recipe.id).all()
+        assert len(rows) == 1
+        assert rows[0].calories == 120
+        assert save_recipe_nutrition(db_session, 999999, {"calories": 1, "protein": 1, "carbs": 1, "fats": 1}) is None
+
+    @pytest.mark.asyncio
+    async def test_compute_recipe_nutrition(self):
+        nutrition = {"calories": 50, "protein": 1, "carbs": 2, "fats": 3}
+        with patch("services.recipe_service.calculate_nutritional_info_async", return_value=nutrition) as mock_calc, \
+             patch("services.recipe_service.save_recipe_nutrition") as mock_save:
+            result = await compute_recipe_nutrition(Mock(), 7, [{"name": "קמח", "quantity": 1, "unit": "cup"}], 2)
+
+        assert result == nutrition
+        assert mock_calc.call_args.kwargs["strict"] is True
+        assert mock_save.call_args.args[1:] == (7, nutrition)
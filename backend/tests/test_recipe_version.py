@@ -0,0 +1,65 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import Mock
+from sqlalchemy import inspect, text
+from models.recipe_model import Recipe
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.rating_service import apply_rating
+from services.recipe_version import bump_recipe_version, ensure_recipe_version_schema, recipe_validators
+from services.response_cache import is_not_modified, validator_headers
+
+def conditional_request(**headers):
+    return Mock(headers={name.replace("_", "-"): value for name, value in headers.items()})
+
+class TestRecipeVersion:
+    @pytest.fixture
+    def recipe(self, fresh_db):
+        recipe = Recipe(name="שקשוקה", preparation_steps="", cooking_time=20, servings=2, categories="")
+        fresh_db.add(recipe)
+        fresh_db.commit()
+        return recipe
+
+    def test_validators_follow_version(self, fresh_db, recipe):
+        first = recipe_validators(fresh_db, recipe.id)
+        assert first["ETag"] == f'"recipe-{recipe.id}-v1"'
+        assert first["Last-Modified"].endswith(" GMT")
+        assert recipe_validators(fresh_db, recipe.id, "scale-4")["ETag"] == f'"recipe-{recipe.id}-v1-scale-4"'
+
+        bump_recipe_version(fresh_db, recipe.id)
+        fresh_db.commit()
+        assert recipe_validators(fresh_db, recipe.id)["ETag"] == f'"recipe-{recipe.id}-v2"'
+        assert recipe_validators(fresh_db, recipe.id + 1) is None
+
+    def test_rating_bumps_version(self, fresh_db, recipe):
+        apply_rating(fresh_db, recipe.id, 1, 5)
+        fresh_db.refresh(recipe)
+        assert recipe.version == 2
+
+    def test_is_not_modified(self):
+        headers = validator_headers('"recipe-1-v2"', datetime(2026, 5, 1, 12, 0, 30, 500000))
+        assert headers["Last-Modified"] == "Fri, 01 May 2026 12:00:30 GMT"
+
+        assert is_not_modified(conditional_request(if_none_match='"recipe-1-v2"'), headers)
+        assert not is_not_modified(conditional_request(if_none_match='"recipe-1-v1"'), headers)
+        assert is_not_modified(conditional_request(if_modified_since="Fri, 01 May 2026 12:00:30 GMT"), headers)
+        assert not is_not_modified(conditional_request(if_modified_since="Fri, 01 May 2026 12:00:29 GMT"), headers)
+        # If-None-Match takes precedence over If-Modified-Since.
+        assert not is_not_modified(
+            conditional_request(if_none_match='"recipe-1-v1"', if_modified_since="Fri, 01 May 2026 12:00:30 GMT"),
+            headers
+        )
+        assert not is_not_modified(conditional_request(if_modified_since="yesterday"), headers)
+
+    def test_schema_upgrade(self, fresh_engine):
+        with fresh_engine.begin() as connection:
+            connection.execute(text("CREATE TABLE recipes (id INTEGER PRIMARY KEY, name VARCHAR)"))
+            connection.execute(text("INSERT INTO recipes (id, name) VALUES (1, 'חביתה')"))
+
+        ensure_recipe_version_schema(fresh_engine)
+        ensure_recipe_version_schema(fresh_engine)
+
+        assert {"version", "updated_at"} <= {column["name"] for column in inspect(fresh_engine).get_columns("recipes")}
+        with fresh_engine.connect() as connection:
+            version, updated_at = connection.execute(text("SELECT version, updated_at FROM recipes")).one()
+        assert version == 1
+        assert updated_at is not None
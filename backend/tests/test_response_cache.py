@@ -0,0 +1,191 @@
+import pytest
+from unittest.mock import Mock
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from services.response_cache import LISTING_TAG, ResponseCache, etag_matches, recipe_tag
+
+class FakeRedis:
+    """Just enough of the redis client for the shared tier."""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def hmget(self, name, keys):
+        return [self.hashes.get(name, {}).get(key) for key in keys]
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def hincrby(self, name, key, amount):
+                self.calls.append(lambda: redis.hashes.setdefault(name, {}).update({key: str(int(redis.hashes.get(name, {}).get(key, 0)) + amount)}))
+
+            def hset(self, name, mapping):
+                self.calls.append(lambda: redis.hashes.setdefault(name, {}).update({key: str(value) for key, value in mapping.items()}))
+
+            def execute(self):
+                for call in self.calls:
+                    call()
+
+        return Pipeline()
+
+class TestResponseCache:
+    @pytest.fixture
+    def cache(self):
+        return ResponseCache(max_entries=10, ttl=60)
+
+    @pytest.fixture
+    def client(self, cache):
+        # A recipe endpoint whose payload comes from a mutable "database".
+        app = FastAPI()
+        recipes = {1: {"id": 1, "name": "שקשוקה"}}
+        build = Mock(side_effect=lambda recipe_id: (recipes[recipe_id], {"X-Version": "1"}))
+
+        @app.get("/recipes/{recipe_id}")
+        async def get_recipe(recipe_id: int, request: Request):
+            entry = cache.fetch(cache.key_for(request), [recipe_tag(recipe_id)], lambda: build(recipe_id))
+            return cache.respond(request, entry)
+
+        client = TestClient(app)
+        client.recipes = recipes
+        client.build = build
+        return client
+
+    def test_hit_after_miss(self, client, cache):
+        first = client.get("/recipes/1")
+        second = client.get("/recipes/1")
+
+        assert first.json() == second.json() == {"id": 1, "name": "שקשוקה"}
+        assert second.headers["X-Version"] == "1"
+        assert client.build.call_count == 1
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_query_parameters_are_part_of_the_key(self, client):
+        client.get("/recipes/1?b=2&a=1")
+        client.get("/recipes/1?a=1&b=2")
+        client.get("/recipes/1?a=2")
+        assert client.build.call_count == 2
+
+    def test_if_none_match_returns_304(self, client, cache):
+        etag = client.get("/recipes/1").headers["ETag"]
+
+        response = client.get("/recipes/1", headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert cache.stats()["not_modified"] == 1
+
+    def test_invalidation_serves_fresh_data(self, client, cache):
+        etag = client.get("/recipes/1").headers["ETag"]
+        client.recipes[1] = {"id": 1, "name": "שקשוקה ירוקה"}
+        cache.invalidate_recipe(1)
+
+        response = client.get("/recipes/1", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["name"] == "שקשוקה ירוקה"
+        assert response.headers["ETag"] != etag
+
+    def test_listing_invalidation_keeps_other_recipes(self, cache):
+        build = Mock(return_value=({"id": 2}, {}))
+        cache.fetch("/recipes/2?", [recipe_tag(2)], build)
+        cache.invalidate_recipe(1)
+        cache.fetch("/recipes/2?", [recipe_tag(2)], build)
+        assert build.call_count == 1
+
+        cache.fetch("/recipes/?", [LISTING_TAG], build)
+        cache.invalidate_recipe(2)
+        cache.fetch("/recipes/?", [LISTING_TAG], build)
+        assert build.call_count == 3
+
+    def test_clear_invalidates_everything(self, cache):
+        build = Mock(return_value=([], {}))
+        cache.fetch("/recipes/?", [LISTING_TAG], build)
+        cache.clear()
+        cache.fetch("/recipes/?", [LISTING_TAG], build)
+        assert build.call_count == 2
+
+    def test_errors_are_not_cached(self, cache):
+        build = Mock(side_effect=[ValueError("boom"), ({"id": 1}, {})])
+        with pytest.raises(ValueError):
+            cache.fetch("/recipes/1?", [recipe_tag(1)], build)
+        assert cache.fetch("/recipes/1?", [recipe_tag(1)], build).body == b'{"id":1}'
+
+    def test_lru_and_ttl_eviction(self, monkeypatch):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        build = Mock(return_value=({}, {}))
+        for key in ("a", "b", "a", "c"):
+            cache.fetch(key, [], build)
+        cache.fetch("a", [], build)
+        assert build.call_count == 3  # "b" was least recently used.
+
+        now = [0.0]
+        monkeypatch.setattr("services.response_cache.time.monotonic", lambda: now[0])
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.fetch("a", [], build)
+        now[0] = 61.0
+        cache.fetch("a", [], build)
+        assert build.call_count == 5
+
+    def test_redis_tier_is_shared_between_processes(self):
+        redis = FakeRedis()
+        first, second = ResponseCache(redis_client=redis), ResponseCache(redis_client=redis)
+        build = Mock(return_value=({"id": 1}, {"X-Next-Cursor": "abc"}))
+
+        entry = first.fetch("/recipes/1?", [recipe_tag(1)], build)
+        shared = second.fetch("/recipes/1?", [recipe_tag(1)], build)
+        assert build.call_count == 1
+        assert (shared.body, shared.etag, shared.headers) == (entry.body, entry.etag, entry.headers)
+        assert second.stats()["redis_hits"] == 1
+
+        # An invalidation in one process makes the other's local copy stale too.
+        second.invalidate_recipe(1)
+        first.fetch("/recipes/1?", [recipe_tag(1)], build)
+        assert build.call_count == 2
+
+    def test_fills_right_after_an_invalidation_are_not_cached(self, monkeypatch):
+        # They may have been read from a replica that has not seen the write yet.
+        now = [1000.0]
+        monkeypatch.setattr("services.response_cache.time.time", lambda: now[0])
+        redis = FakeRedis()
+        writer, reader = ResponseCache(redis_client=redis, settle=2), ResponseCache(redis_client=redis, settle=2)
+        build = Mock(return_value=({"id": 1}, {}))
+
+        writer.invalidate_recipe(1)
+        reader.fetch("/recipes/1?", [recipe_tag(1)], build)
+        reader.fetch("/recipes/1?", [recipe_tag(1)], build)
+        assert build.call_count == 2
+
+        now[0] += 3
+        reader.fetch("/recipes/1?", [recipe_tag(1)], build)
+        reader.fetch("/recipes/1?", [recipe_tag(1)], build)
+        assert build.call_count == 3
+
+    def test_redis_outage_bypasses_cache(self):
+        redis = Mock()
+        redis.hmget.side_effect = ConnectionError("redis down")
+        cache = ResponseCache(redis_client=redis)
+        build = Mock(return_value=({"id": 1}, {}))
+
+        cache.fetch("/recipes/1?", [recipe_tag(1)], build)
+        cache.fetch("/recipes/1?", [recipe_tag(1)], build)
+        assert build.call_count == 2
+
+    def test_etag_matches(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"abd"', '"abc"')
+        assert not etag_matches(None, '"abc"')
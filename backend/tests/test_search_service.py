@@ -0,0 +1,91 @@
+from collections import Counter
+from models.recipe_model import Recipe, Ingredient
+from models.search_model import RecipeSearchDocument
+from models.user_model import User  # noqa: F401 - registers the users table for create_all
+from services.search_service import InvertedIndex, RecipeSearch, term_variants, tokenize
+
+class TestTokenizer:
+    def test_tokenize_strips_niqqud_and_punctuation(self):
+        assert tokenize("שָׁלוֹם, עולם! Chocolate-Cake") == ["שלום", "עולם", "chocolate", "cake"]
+        assert tokenize(None) == []
+
+    def test_hebrew_prefix_variants(self):
+        assert term_variants("ובביצים") == ["ובביצים", "בביצים", "ביצים"]
+        assert term_variants("הקמח") == ["הקמח", "קמח"]
+        assert term_variants("לחם") == ["לחם", "חם"]
+        assert term_variants("בו") == ["בו"]
+        assert term_variants("pasta") == ["pasta"]
+
+class TestInvertedIndex:
+    def test_ranks_and_requires_every_word(self):
+        index = InvertedIndex()
+        index.add(1, Counter({"עוגת": 3, "שוקולד": 3}))
+        index.add(2, Counter({"עוגת": 3, "גבינה": 3}))
+        index.add(3, Counter({"שוקולד": 1, "מריר": 1, "קמח": 1, "סוכר": 1}))
+
+        assert [recipe_id for recipe_id, _ in index.search("שוקולד")] == [1, 3]
+        assert [recipe_id for recipe_id, _ in index.search("עוגת שוקולד")] == [1]
+        assert index.search("פיצה") == []
+
+    def test_incremental_updates(self):
+        index = InvertedIndex()
+        index.add(1, Counter({"פסטה": 3}))
+        index.add(1, Counter({"פיצה": 3}))
+        assert index.search("פסטה") == []
+        index.remove(1)
+        assert index.search("פיצה") == []
+        assert len(index) == 0
+
+class TestRecipeSearch:
+    def add_recipe(self, fresh_db, name, ingredients, steps=""):
+        recipe = Recipe(name=name, preparation_steps=steps, cooking_time=10, servings=2, categories="")
+        recipe.ingredients = [Ingredient(name=ingredient, quantity=1, unit="") for ingredient in ingredients]
+        fresh_db.add(recipe)
+        fresh_db.commit()
+        return recipe
+
+    def ids(self, results):
+        return [recipe_id for recipe_id, _ in results]
+
+    def test_search_name_ingredients_and_steps(self, fresh_db):
+        search = RecipeSearch()
+        shakshuka = self.add_recipe(fresh_db, "שקשוקה", ["עגבניות", "ביצים"], "מוסיפים את הביצים למחבת")
+        cake = self.add_recipe(fresh_db, "עוגת שוקולד", ["שוקולד מריר", "ביצים", "קמח"], "אופים בתנור")
+        salad = self.add_recipe(fresh_db, "סלט ירוק", ["חסה"], "קוצצים את הירקות")
+        for recipe in (shakshuka, cake, salad):
+            search.index_recipe(fresh_db, recipe)
+
+        assert self.ids(search.search(fresh_db, "שקשוקה")) == [shakshuka.id]
+        assert set(self.ids(search.search(fresh_db, "ביצים"))) == {shakshuka.id, cake.id}
+        assert self.ids(search.search(fresh_db, "ובתנור")) == [cake.id]
+        assert self.ids(search.search(fresh_db, "שוקולד ביצים")) == [cake.id]
+        assert search.search(fresh_db, "   ") == []
+
+    def test_name_matches_rank_above_step_matches(self, fresh_db):
+        search = RecipeSearch()
+        in_steps = self.add_recipe(fresh_db, "מרק", ["מים"], "מגישים עם פסטה")
+        in_name = self.add_recipe(fresh_db, "פסטה ברוטב", ["פסטה"], "מבשלים")
+        assert self.ids(search.search(fresh_db, "פסטה")) == [in_name.id, in_steps.id]
+
+    def test_backfill_and_incremental_maintenance(self, fresh_db):
+        search = RecipeSearch()
+        pasta = self.add_recipe(fresh_db, "פסטה", ["פסטה"])
+
+        # The first search builds the index and indexes recipes created before it existed.
+        assert self.ids(search.search(fresh_db, "פסטה")) == [pasta.id]
+        assert fresh_db.query(RecipeSearchDocument).count() == 1
+
+        pizza = self.add_recipe(fresh_db, "פיצה", ["בצק"])
+        search.index_recipe(fresh_db, pizza)
+        assert self.ids(search.search(fresh_db, "בצק")) == [pizza.id]
+
+        pizza.name = "פוקאצ'ה"
+        fresh_db.commit()
+        search.index_recipe(fresh_db, pizza)
+        assert search.search(fresh_db, "פיצה") == []
+
+        search.remove_recipe(fresh_db, pasta.id)
+        fresh_db.delete(pasta)
+        fresh_db.commit()
+        assert search.search(fresh_db, "פסטה") == []
+        assert fresh_db.query(RecipeSearchDocument).count() == 1
@@ -0,0 +1,73 @@
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.static_files import IMMUTABLE_CACHE_CONTROL, AssetFiles, accepted_encodings
+from starlette.datastructures import Headers
+
+HASHED_NAME = "0123456789abcdef0123456789abcdef.webp"
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / HASHED_NAME).write_bytes(b"RIFF" + bytes(range(256)) * 4)
+    (tmp_path / "default-recipe.jpg").write_bytes(b"\xff\xd8\xff" + bytes(100))
+    svg = b"<svg xmlns='http://www.w3.org/2000/svg'>" + b"<g/>" * 200 + b"</svg>"
+    (tmp_path / "logo.svg").write_bytes(svg)
+    (tmp_path / "logo.svg.gz").write_bytes(gzip.compress(svg))
+    return tmp_path
+
+def client_for(static_dir, **options):
+    app = FastAPI()
+    app.mount("/static", AssetFiles(directory=str(static_dir), **options), name="static")
+    return TestClient(app)
+
+def test_cache_control(static_dir):
+    client = client_for(static_dir, max_age=600)
+    assert client.get(f"/static/{HASHED_NAME}").headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    response = client.get("/static/default-recipe.jpg")
+    assert response.headers["cache-control"] == "public, max-age=600"
+    assert response.headers["content-type"] == "image/jpeg"
+    assert client.get("/static/missing.jpg").status_code == 404
+
+def test_range_and_conditional_requests(static_dir):
+    client = client_for(static_dir)
+    response = client.get(f"/static/{HASHED_NAME}", headers={"Range": "bytes=4-13"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(10))
+    assert response.headers["content-range"] == "bytes 4-13/1028"
+
+    etag = client.get(f"/static/{HASHED_NAME}").headers["etag"]
+    response = client.get(f"/static/{HASHED_NAME}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+def test_precompressed_variants(static_dir):
+    client = client_for(static_dir)
+    plain = client.get("/static/logo.svg", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+
+    compressed = client.get("/static/logo.svg", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["content-type"].startswith("image/svg+xml")
+    assert int(compressed.headers["content-length"]) < int(plain.headers["content-length"])
+    assert compressed.content == plain.content  # Decoded by the client.
+    assert compressed.headers["etag"] != plain.headers["etag"]
+
+    # Already compressed formats are never looked up.
+    assert "vary" not in client.get("/static/default-recipe.jpg", headers={"Accept-Encoding": "gzip"}).headers
+
+def test_accepted_encodings():
+    assert accepted_encodings(Headers({"accept-encoding": "gzip, BR;q=0.5, deflate;q=0"})) == {"gzip", "br"}
+    assert accepted_encodings(Headers({})) == set()
+
+def test_offload(static_dir):
+    response = client_for(static_dir, offload="x-accel-redirect", accel_prefix="/internal-static").get(f"/static/{HASHED_NAME}")
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == f"/internal-static/{HASHED_NAME}"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.content == b""
+
+    response = client_for(static_dir, offload="x-sendfile").get("/static/default-recipe.jpg")
+    assert response.headers["x-sendfile"] == str(static_dir / "default-recipe.jpg")
+    assert response.headers["content-type"] == "image/jpeg"
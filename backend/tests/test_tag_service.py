@@ -0,0 +1,76 @@
+from models.recipe_model import Recipe, Tag, recipe_tags
+from services.recipe_import import import_recipes
+from services.recipe_service import get_recipe_listing
+from services.tag_service import backfill_recipe_tags, facet_counts, split_labels, sync_recipe_tags
+
+class TestTagService:
+    def import_rows(self, fresh_db, *rows):
+        report = import_recipes(fresh_db, enumerate(rows, start=1))
+        assert not report.errors
+        return report.recipe_ids
+
+    def names(self, recipes):
+        return sorted(recipe.name for recipe in recipes)
+
+    def test_split_labels(self):
+        assert split_labels(" טבעוני,  ללא   גלוטן ,טבעוני,") == ["טבעוני", "ללא גלוטן"]
+        assert split_labels("Vegan") == ["vegan"]
+        assert split_labels(None) == []
+
+    def test_filters_match_whole_labels_and_intersect(self, fresh_db):
+        self.import_rows(
+            fresh_db,
+            {"name": "סלט", "categories": "סלטים", "tags": "טבעוני, ללא גלוטן"},
+            {"name": "פסטה", "categories": "ארוחת ערב", "tags": "טבעוני"},
+            {"name": "עוף", "categories": "ארוחת ערב", "tags": "בשרי, ללא גלוטן"},
+        )
+
+        assert self.names(get_recipe_listing(fresh_db, tag="טבעוני")) == ["סלט", "פסטה"]
+        assert self.names(get_recipe_listing(fresh_db, tag="טבעוני, ללא גלוטן")) == ["סלט"]
+        assert self.names(get_recipe_listing(fresh_db, category="ארוחת ערב", tag="ללא גלוטן")) == ["עוף"]
+        # Substrings of a label no longer match.
+        assert get_recipe_listing(fresh_db, category="ערב") == []
+        assert get_recipe_listing(fresh_db, tag="לא קיים") == []
+
+    def test_sync_recipe_tags_follows_edits(self, fresh_db):
+        recipe = Recipe(name="מרק", preparation_steps="", cooking_time=10, servings=2, categories="מרקים", tags="פרווה")
+        fresh_db.add(recipe)
+        sync_recipe_tags(fresh_db, recipe)
+        fresh_db.commit()
+        assert sorted((tag.kind, tag.name) for tag in recipe.labels) == [("category", "מרקים"), ("tag", "פרווה")]
+
+        recipe.tags = "בשרי"
+        sync_recipe_tags(fresh_db, recipe)
+        fresh_db.commit()
+        assert get_recipe_listing(fresh_db, tag="פרווה") == []
+        assert [r.id for r in get_recipe_listing(fresh_db, tag="בשרי")] == [recipe.id]
+        # Tags are shared, not duplicated per recipe.
+        assert fresh_db.query(Tag).count() == 3
+
+    def test_backfill_is_idempotent(self, fresh_db):
+        fresh_db.add_all([
+            Recipe(name="ישן", preparation_steps="", cooking_time=5, servings=1, categories="קינוחים", tags="חלבי"),
+            Recipe(name="ריק", preparation_steps="", cooking_time=5, servings=1, categories="", tags=None),
+        ])
+        fresh_db.commit()
+
+        assert backfill_recipe_tags(fresh_db, chunk_size=1) == 1
+        assert backfill_recipe_tags(fresh_db) == 0
+        assert fresh_db.query(recipe_tags).count() == 2
+        assert self.names(get_recipe_listing(fresh_db, category="קינוחים")) == ["ישן"]
+
+    def test_facet_counts(self, fresh_db):
+        self.import_rows(
+            fresh_db,
+            {"name": "סלט", "categories": "סלטים", "tags": "טבעוני, פרווה"},
+            {"name": "פסטה", "categories": "ארוחת ערב", "tags": "טבעוני"},
+            {"name": "עוף", "categories": "ארוחת ערב", "tags": "בשרי"},
+        )
+
+        facets = facet_counts(fresh_db)
+        assert facets["categories"] == [{"name": "ארוחת ערב", "count": 2}, {"name": "סלטים", "count": 1}]
+        assert facets["tags"][0] == {"name": "טבעוני", "count": 2}
+
+        narrowed = facet_counts(fresh_db, category="ארוחת ערב")
+        assert narrowed["categories"] == [{"name": "ארוחת ערב", "count": 2}]
+        assert sorted((f["name"], f["count"]) for f in narrowed["tags"]) == [("בשרי", 1), ("טבעוני", 1)]
@@ -1,29 +1,263 @@
+import time
 import pytest
-from unittest.mock import Mock, patch
-from services.timer_service import start_timer, get_timer
+from redis import WatchError
+from types import SimpleNamespace
+from services.timer_service import DONE, IDLE, PAUSED, RUNNING, MemoryTimerStore, RedisTimerStore, TimerEngine
+
+class FakeRedis:
+    """Just enough of the redis client for the timer store, including WATCH/MULTI."""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.sorted = {}
+        self.versions = {}  # key -> writes so far, for WATCH
+        self.after_watched_get = None  # Called once after a transaction reads a watched key.
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self._touch(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self._touch(key)
+
+    def sadd(self, name, member):
+        self.sets.setdefault(name, set()).add(member)
+
+    def srem(self, name, member):
+        self.sets.get(name, set()).discard(member)
+
+    def smembers(self, name):
+        return {member.encode() for member in self.sets.get(name, set())}
+
+    def expire(self, name, seconds):
+        pass
+
+    def zadd(self, name, mapping):
+        self.sorted.setdefault(name, {}).update(mapping)
+
+    def zrem(self, name, member):
+        member = member.decode() if isinstance(member, bytes) else member
+        return int(self.sorted.get(name, {}).pop(member, None) is not None)
+
+    def zrange(self, name, start, end, withscores=False):
+        items = sorted(self.sorted.get(name, {}).items(), key=lambda item: item[1])[start:end + 1]
+        return [(key.encode(), score) for key, score in items]
+
+    def zrangebyscore(self, name, low, high, start=0, num=None):
+        items = sorted((score, key) for key, score in self.sorted.get(name, {}).items() if score <= high)
+        return [key.encode() for _, key in items[start:start + num]]
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+                self.watched = {}
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.watched = {}
+
+            def watch(self, key):
+                self.watched[key] = redis.versions.get(key, 0)
+
+            def multi(self):
+                pass
+
+            def get(self, key):
+                value = redis.get(key)
+                if self.watched and redis.after_watched_get is not None:
+                    hook, redis.after_watched_get = redis.after_watched_get, None
+                    hook()
+                return value
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                calls, self.calls = self.calls, []
+                watched, self.watched = self.watched, {}
+                if any(redis.versions.get(key, 0) != version for key, version in watched.items()):
+                    raise WatchError()
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+        return Pipeline()
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+TIMERS = [
+    SimpleNamespace(step_number=2, label="Simmer", duration=600),
+    SimpleNamespace(step_number=1, label="Boil", duration=300),
+]
+
+class TestTimerEngine:
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    @pytest.fixture
+    def events(self):
+        return []
 
-class TestTimerService:
     @pytest.fixture
-    def mock_redis(self):
-        return Mock()
-
-    def test_start_timer(self, mock_redis):
-        with patch('services.timer_service.redis_client', mock_redis):
-            timer_id = "test_timer"
-            duration = 300
-            start_timer(timer_id, duration)
-            mock_redis.set.assert_called_with(timer_id, duration)
-            mock_redis.expire.assert_called_with(timer_id, duration)
-
-    def test_get_timer(self, mock_redis):
-        with patch('services.timer_service.redis_client', mock_redis):
-            timer_id = "test_timer"
-            mock_redis.get.return_value = b"150"
-            result = get_timer(timer_id)
-            assert result == {"time_left": "150"}
-
-    def test_get_nonexistent_timer(self, mock_redis):
-        with patch('services.timer_service.redis_client', mock_redis):
-            mock_redis.get.return_value = None
-            result = get_timer("nonexistent")
-            assert result == {"message": "Timer not found"}
+    def engine(self, clock, events):
+        return TimerEngine(MemoryTimerStore(), publish=lambda user_id, event: events.append((user_id, event)), clock=clock)
+
+    def test_session_lists_the_recipe_steps(self, engine):
+        session = engine.create_session(7, 3, TIMERS)
+        assert [step["step_number"] for step in session["steps"]] == [1, 2]
+        assert session["steps"][0] == {"step_number": 1, "label": "Boil", "duration": 300, "status": IDLE, "remaining": 300.0}
+        assert engine.user_sessions(7) == [session]
+        assert engine.user_sessions(8) == []
+
+    def test_remaining_time_through_pause_and_resume(self, engine, clock):
+        session_id = engine.create_session(7, 3, TIMERS)["id"]
+        engine.start_step(session_id, 1)
+        clock.now += 100
+        assert engine.get_session(session_id)["steps"][0]["remaining"] == 200.0
+
+        paused = engine.pause_step(session_id, 1)["steps"][0]
+        assert (paused["status"], paused["remaining"]) == (PAUSED, 200.0)
+        clock.now += 500  # Paused time does not count.
+        assert engine.get_session(session_id)["steps"][0]["remaining"] == 200.0
+        assert engine.fire_due() == 0
+
+        engine.resume_step(session_id, 1)
+        clock.now += 50
+        assert engine.get_session(session_id)["steps"][0]["remaining"] == 150.0
+
+        engine.reset_step(session_id, 1)
+        step = engine.get_session(session_id)["steps"][0]
+        assert (step["status"], step["remaining"]) == (IDLE, 300.0)
+
+    def test_expiry_is_pushed_to_the_user(self, engine, clock, events):
+        session_id = engine.create_session(7, 3, TIMERS)["id"]
+        engine.start_step(session_id, 2)
+        engine.start_step(session_id, 1)
+        clock.now += 299
+        assert engine.fire_due() == 0
+
+        clock.now += 1
+        assert engine.fire_due() == 1
+        assert events == [(7, {
+            "type": "timer", "event": "expired", "session_id": session_id, "recipe_id": 3, "step_number": 1, "label": "Boil",
+        })]
+        steps = engine.get_session(session_id)["steps"]
+        assert [(step["status"], step["remaining"]) for step in steps] == [(DONE, 0.0), (RUNNING, 300.0)]
+        with pytest.raises(ValueError):
+            engine.start_step(session_id, 1)
+
+    def test_rescheduled_timers_fire_once_at_their_new_end(self, engine, clock, events):
+        session_id = engine.create_session(7, 3, TIMERS)["id"]
+        engine.start_step(session_id, 1)
+        clock.now += 100
+        engine.pause_step(session_id, 1)
+        engine.resume_step(session_id, 1)  # Now ends at 1300, not 1200.
+        clock.now += 150
+        assert engine.fire_due() == 0
+        clock.now += 50
+        assert engine.fire_due() == 1
+        clock.now += 1000
+        assert engine.fire_due() == 0
+        assert len(events) == 1
+
+    def test_invalid_transitions(self, engine):
+        session_id = engine.create_session(7, 3, TIMERS)["id"]
+        with pytest.raises(ValueError):
+            engine.pause_step(session_id, 1)
+        with pytest.raises(ValueError):
+            engine.resume_step(session_id, 1)
+        engine.start_step(session_id, 1)
+        with pytest.raises(ValueError):
+            engine.start_step(session_id, 1)
+        with pytest.raises(KeyError):
+            engine.start_step(session_id, 9)
+        with pytest.raises(KeyError):
+            engine.get_session(session_id, user_id=8)
+
+    def test_ended_and_idle_sessions_go_away(self, engine, clock, events):
+        ended = engine.create_session(7, 3, TIMERS)["id"]
+        engine.start_step(ended, 1)
+        engine.end_session(ended, 7)
+        with pytest.raises(KeyError):
+            engine.get_session(ended)
+
+        idle = engine.create_session(7, 3, TIMERS)["id"]
+        clock.now += engine.session_ttl + 1
+        engine.fire_due()
+        with pytest.raises(KeyError):
+            engine.get_session(idle)
+        assert engine.user_sessions(7) == [] and events == []
+
+    def test_scheduler_thread_fires_on_time(self, events):
+        engine = TimerEngine(MemoryTimerStore(), publish=lambda user_id, event: events.append(event))
+        engine.start_scheduler()
+        try:
+            session_id = engine.create_session(7, 3, [SimpleNamespace(step_number=1, label="Toast", duration=0.05)])["id"]
+            engine.start_step(session_id, 1)
+            for _ in range(100):
+                if events:
+                    break
+                time.sleep(0.01)
+        finally:
+            engine.stop_scheduler()
+        assert [event["step_number"] for event in events] == [1]
+
+class TestRedisTimerStore:
+    def test_workers_share_sessions_and_fire_each_expiry_once(self):
+        redis, clock, events = FakeRedis(), Clock(), []
+        workers = [
+            TimerEngine(RedisTimerStore(redis), publish=lambda user_id, event: events.append(event), clock=clock)
+            for _ in range(2)
+        ]
+        session_id = workers[0].create_session(7, 3, TIMERS)["id"]
+        workers[1].start_step(session_id, 1, user_id=7)
+        assert [session["id"] for session in workers[0].user_sessions(7)] == [session_id]
+
+        clock.now += 300
+        assert workers[0].store.next_due() == 1300
+        assert workers[1].fire_due() + workers[0].fire_due() == 1
+        assert [event["step_number"] for event in events] == [1]
+        assert workers[0].get_session(session_id)["steps"][0]["status"] == DONE
+
+        workers[0].end_session(session_id)
+        assert workers[1].user_sessions(7) == []
+
+    def test_concurrent_changes_to_a_session_are_not_lost(self):
+        redis, clock, events = FakeRedis(), Clock(), []
+        scheduler, api = (
+            TimerEngine(RedisTimerStore(redis), publish=lambda user_id, event: events.append(event), clock=clock)
+            for _ in range(2)
+        )
+        session_id = api.create_session(7, 3, TIMERS)["id"]
+        api.start_step(session_id, 1)
+        clock.now += 300
+
+        # Another worker starts step 2 between the scheduler's read and write of the session.
+        redis.after_watched_get = lambda: api.start_step(session_id, 2)
+        assert scheduler.fire_due() == 1
+        steps = api.get_session(session_id)["steps"]
+        assert [step["status"] for step in steps] == [DONE, RUNNING]
+
+        clock.now += 600
+        assert scheduler.fire_due() == 1
+        assert [event["step_number"] for event in events] == [1, 2]
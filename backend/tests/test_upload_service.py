@@ -0,0 +1,56 @@
+import io
+import os
+import pytest
+from fastapi import HTTPException, UploadFile
+from services.upload_service import (
+    UnsupportedUploadError,
+    UploadTooLargeError,
+    save_upload,
+    sniff_image_type,
+    stream_to_file
+)
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 2048
+
+class TestUploadService:
+    def test_sniff_image_type(self):
+        assert sniff_image_type(JPEG) == "jpg"
+        assert sniff_image_type(b"\x89PNG\r\n\x1a\n....") == "png"
+        assert sniff_image_type(b"GIF89a....") == "gif"
+        assert sniff_image_type(b"RIFF\x10\x00\x00\x00WEBPVP8 ") == "webp"
+        assert sniff_image_type(b"<svg xmlns=") is None
+        assert sniff_image_type(b"") is None
+
+    def test_stream_to_file(self, tmp_path):
+        path, size = stream_to_file(io.BytesIO(JPEG), str(tmp_path))
+        assert size == len(JPEG)
+        assert path.endswith(".jpg")
+        assert open(path, "rb").read() == JPEG
+        assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+    def test_stream_to_file_rejects_without_leftovers(self, tmp_path):
+        with pytest.raises(UnsupportedUploadError):
+            stream_to_file(io.BytesIO(b"#!/bin/sh\n"), str(tmp_path))
+        with pytest.raises(UploadTooLargeError):
+            stream_to_file(io.BytesIO(JPEG), str(tmp_path), max_bytes=1024)
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_save_upload_errors(self, tmp_path):
+        with pytest.raises(HTTPException) as error:
+            await save_upload(UploadFile(io.BytesIO(JPEG), filename="a.jpg"), str(tmp_path), max_bytes=1024)
+        assert error.value.status_code == 413
+
+        # A declared size over the limit is rejected before anything is copied.
+        with pytest.raises(HTTPException) as error:
+            await save_upload(UploadFile(io.BytesIO(b""), size=4096, filename="a.jpg"), str(tmp_path), max_bytes=1024)
+        assert error.value.status_code == 413
+
+        with pytest.raises(HTTPException) as error:
+            await save_upload(UploadFile(io.BytesIO(b"not an image"), filename="a.jpg"), str(tmp_path))
+        assert error.value.status_code == 415
+
+    @pytest.mark.asyncio
+    async def test_save_upload_keeps_only_the_base_name(self, tmp_path):
+        path = await save_upload(UploadFile(io.BytesIO(JPEG), filename="../../evil.jpg"), str(tmp_path), "../../evil.jpg")
+        assert path == os.path.join(str(tmp_path), "evil.jpg")
@@ -17,13 +17,13 @@ export default function Navbar() {
 
   const [notifications, setNotifications] = useState([]);
   const [showDropdown, setShowDropdown] = useState(false);
-  const [hasUnread, setHasUnread] = useState(false);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [showTooltip, setShowTooltip] = useState(false);
 
-  // Fetch notifications from the server
+  // Fetch the latest notifications from the server
   const fetchNotifications = async () => {
     try {
-      const response = await fetch(`/api/users/${user.id}/notifications`, {
+      const response = await fetch(`/api/users/${user.id}/notifications?limit=20`, {
         headers: {
           Authorization: `Bearer ${localStorage.getItem("authToken")}`,
         },
@@ -37,22 +37,26 @@ export default function Navbar() {
       const data = await response.json();
       console.log("Notifications received from API:", data);
       setNotifications(data);
-      setHasUnread(data.some((n) => !n.isRead));
     } catch (error) {
       console.error("Error fetching notifications:", error);
     }
   };
 
-  // Poll for new notifications every 30 seconds
+  // Load notifications once, then follow new ones and the unread count over server-sent events
   useEffect(() => {
     if (user) {
-      const checkForNewNotifications = async () => {
-        await fetchNotifications();
-      };
+      fetchNotifications();
 
-      checkForNewNotifications();
-      const interval = setInterval(checkForNewNotifications, 30000);
-      return () => clearInterval(interval);
+      const source = new EventSource(`/api/users/${user.id}/notifications/stream`);
+      source.addEventListener("unread", (event) => {
+        setUnreadCount(JSON.parse(event.data).unread);
+      });
+      source.addEventListener("notification", (event) => {
+        const data = JSON.parse(event.data);
+        setNotifications((prev) => [data.notification, ...prev].slice(0, 20));
+        setUnreadCount(data.unread);
+      });
+      return () => source.close();
     }
   }, [user]);
 
@@ -60,7 +64,7 @@ export default function Navbar() {
   const markNotificationsAsRead = async () => {
     try {
       const response = await fetch(`/api/users/${user.id}/notifications/read`, {
-        method: "DELETE",
+        method: "POST",
         headers: {
           Authorization: `Bearer ${localStorage.getItem("authToken")}`,
         },
@@ -68,13 +72,14 @@ export default function Navbar() {
       if (!response.ok) {
         const errorData = await response.json();
         throw new Error(
-          errorData.detail || "Failed to delete read notifications"
+          errorData.detail || "Failed to mark notifications as read"
         );
       }
-      // Remove notifications that are marked as read from the state
-      setNotifications((prev) => prev.filter((n) => !n.isRead));
+      // Keep the notifications listed, now as read
+      setNotifications((prev) => prev.map((n) => ({ ...n, is_read: true })));
+      setUnreadCount(0);
     } catch (error) {
-      console.error("Error deleting read notifications:", error);
+      console.error("Error marking notifications as read:", error);
     }
   };
 
@@ -170,9 +175,9 @@ export default function Navbar() {
                   alt="Notifications"
                   className="notification-icon"
                 />
-                {hasUnread && (
+                {unreadCount > 0 && (
                   <span className="notification-badge">
-                    {notifications.length}
+                    {unreadCount}
                   </span>
                 )}
               </button>